@@ -1,18 +1,23 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from contextlib import asynccontextmanager
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
 import pandas as pd
-import joblib
+import asyncio
+import hashlib
 import os
 import sys
+import time
 import traceback
 import logging
 
-# Setup detailed logging
-logging.basicConfig(level=logging.DEBUG)
+# Log level from FPL_LOG_LEVEL (default INFO); FPL_LOG_PLAYERS=1 adds per-player optimizer output
+logging.basicConfig(level=os.environ.get('FPL_LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
+LOG_PLAYERS = os.environ.get('FPL_LOG_PLAYERS', '').lower() in ('1', 'true', 'yes')
 
 # Get the absolute path to the backend directory
 backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -26,7 +31,17 @@ sys.path.insert(0, api_dir)
 
 # Import local modules
 from data_collector import SimpleFPLCollector
-from optimizer import FPLOptimizer
+from data_store import DataStore
+from optimizer import FPLOptimizer, SOLVED
+from features import next_gameweek
+from planner import FIXTURE_COLUMNS, TransferPlanner
+from predictor import SimplePredictor
+from refresh import RefreshScheduler, ServingState, refresh_pipeline
+from snapshot import ServingSnapshot, snapshot_key as make_snapshot_key
+from result_cache import OptimizationCache
+from encoding import Compressor, dumps
+from metrics import REGISTRY, STAGE_SECONDS, stage
+from solver_pool import SnapshotUnavailable, SolverPool, SolverPoolSaturated
 
 # Define models directly in main.py
 class Player(BaseModel):
@@ -36,11 +51,44 @@ class Player(BaseModel):
     team: str
     price: float
     predicted_points: float
+    is_starter: Optional[bool] = None
+    is_captain: Optional[bool] = None
+    is_vice_captain: Optional[bool] = None
+    bench_order: Optional[int] = None
 
 class OptimizationRequest(BaseModel):
     budget: float = 100.0
     exclude_players: List[int] = []
     formation_preference: Optional[str] = None
+    k: int = Field(1, ge=1, le=20)
+    min_distance: int = Field(1, ge=1, le=15)
+    # Rank squads by simulated points: 'std' scores mean - risk_lambda * std, 'quantile' the risk_quantile
+    risk_mode: Optional[Literal['std', 'quantile']] = None
+    risk_lambda: float = Field(0.5, ge=0)
+    risk_quantile: float = Field(0.2, gt=0, lt=1)
+    risk_candidates: int = Field(5, ge=1, le=50)
+
+class FrontierRequest(BaseModel):
+    min_budget: float = Field(95.0, gt=0)
+    max_budget: float = Field(105.0, gt=0)
+    step: float = Field(0.5, gt=0)
+    exclude_players: List[int] = []
+    formation_preference: Optional[str] = None
+
+class FrontierPoint(BaseModel):
+    budget: float
+    total_predicted_points: Optional[float] = None
+    total_cost: Optional[float] = None
+    squad: Optional[int] = None
+
+class RiskSummary(BaseModel):
+    mode: str
+    score: float
+    mean: float
+    std: float
+    quantiles: Dict[str, float]
+    n_scenarios: int
+    candidate_rank: int
 
 class TeamResponse(BaseModel):
     status: str
@@ -48,130 +96,214 @@ class TeamResponse(BaseModel):
     total_cost: float
     total_predicted_points: float
     remaining_budget: float
+    bench_predicted_points: Optional[float] = None
+    formation: Optional[str] = None
+    captain_id: Optional[int] = None
+    vice_captain_id: Optional[int] = None
+    solve_time: Optional[float] = None
+    rank: Optional[int] = None
+    risk: Optional[RiskSummary] = None
+    alternatives: Optional[List['TeamResponse']] = None
+
+class FrontierResponse(BaseModel):
+    status: str
+    points: List[FrontierPoint]
+    squads: List[TeamResponse]
+    grid_points: int
+    solves: int
+    truncated: bool
+    total_solve_time: float
+
+class TransferPlanRequest(BaseModel):
+    current_squad: List[int]
+    bank: float = 0.0
+    free_transfers: int = Field(1, ge=0, le=5)
+    horizon: int = Field(4, ge=1, le=8)
+    hit_cost: float = Field(4.0, ge=0, le=20)
+    time_limit: Optional[float] = Field(None, gt=0, le=120)
 
 # Global variables
-predictor = None
 optimizer = None
-current_players = None
-current_predictions = None
+solver_pool = SolverPool.from_env()
+# The ServingState requests are answered from; replaced whole by publish_data(), never modified
+serving = None
+startup_started = time.perf_counter()
+startup_seconds = None
+first_request_logged = False
+SNAPSHOT_PATH = os.path.join(backend_dir, '..', 'models', 'serving_snapshot.joblib')
+FRONTIER_MAX_POINTS = int(os.environ.get('FPL_FRONTIER_MAX_POINTS', 401))
+BATCH_MAX_SCENARIOS = int(os.environ.get('FPL_BATCH_MAX_SCENARIOS', 500))
+compressor = Compressor(min_size=int(os.environ.get('FPL_COMPRESS_MIN_BYTES', 1024)))
+optimization_cache = OptimizationCache(
+    max_entries=int(os.environ.get('FPL_CACHE_SIZE', 256)),
+    ttl_seconds=float(os.environ.get('FPL_CACHE_TTL', 900)),
+)
+HTTP_REQUESTS = REGISTRY.counter('fpl_http_requests_total', "HTTP requests by route and status", ('method', 'route', 'status'))
+HTTP_SECONDS = REGISTRY.histogram('fpl_http_request_seconds', "HTTP request latency by route", ('method', 'route'))
+
+PLAYER_FIELDS = list(Player.model_fields)
+
+def team_response(result: dict) -> dict:
+    """Validate one optimizer result and convert it to the TeamResponse layout.
+
+    Builds plain dicts rather than Pydantic models; the optimizer output is
+    already typed, so validating it again per player only cost time.
+    """
+    logger.info(f"✅ Found {len(result['players'])} players in optimal team")
+    
+    # Debug: Print first player data structure
+    if LOG_PLAYERS and result['players']:
+        logger.info(f"🔍 Sample player data: {result['players'][0]}")
+    
+    # Enhanced player data conversion with validation
+    players_data = []
+    for i, player_data in enumerate(result['players']):
+        try:
+            if LOG_PLAYERS:
+                logger.debug(f"Processing player {i+1}: {player_data}")
+            
+            # Enhanced type conversion with validation
+            player_data['team'] = str(player_data['team'])
+            player_data['price'] = float(player_data['price'])
+            player_data['predicted_points'] = max(0.0, float(player_data['predicted_points']))
+            
+            # Validate required fields
+            required_fields = ['id', 'name', 'position', 'team', 'price', 'predicted_points']
+            for field in required_fields:
+                if field not in player_data:
+                    raise ValueError(f"Missing required field: {field}")
+            
+            players_data.append({field: player_data.get(field) for field in PLAYER_FIELDS})
+            
+        except Exception as e:
+            logger.error(f"❌ Error creating Player object for player {i+1}: {e}")
+            logger.error(f"Player data: {player_data}")
+            raise
+    
+    return {
+        'status': result['status'],
+        'players': players_data,
+        'total_cost': float(result['total_cost']),
+        'total_predicted_points': float(result['total_predicted_points']),
+        'remaining_budget': float(result['remaining_budget']),
+        'bench_predicted_points': result.get('bench_predicted_points'),
+        'formation': result.get('formation'),
+        'captain_id': result.get('captain_id'),
+        'vice_captain_id': result.get('vice_captain_id'),
+        'solve_time': result.get('solve_time'),
+        'rank': result.get('rank'),
+        'risk': result.get('risk'),
+        'alternatives': None,
+    }
+
+def split_param(value: Optional[str]) -> Optional[List[str]]:
+    """Comma-separated query parameter as a list, None when absent"""
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
+
+def publish_data(state: ServingState, prepared_pool: tuple = None) -> int:
+    """Serve a new state from the next request on, returning its data version.
+
+    Runs on the event loop thread without awaiting, so no request sees the
+    solver workers and the state of different versions. prepared_pool are
+    workers already started on state.arrays (SolverPool.prepare_snapshot).
+    """
+    global serving
+    
+    state.data_version = (serving.data_version if serving else 0) + 1
+    solver_pool.activate(prepared_pool or solver_pool.prepare_snapshot(state.arrays, optimizer, wait=False))
+    serving = state
+    optimization_cache.clear()
+    logger.info(f"✅ Loaded {len(state.arrays)} players into {solver_pool.workers} solver workers "
+                f"(data version {state.data_version})")
+    return state.data_version
+
+def refresh_args() -> tuple:
+    """refresh_pipeline arguments after the job id: it carries over the feature buffers of the predictor serving"""
+    return serving.predictor, optimizer, SNAPSHOT_PATH
+
+def prepare_refresh(state: ServingState) -> tuple:
+    """Start solver workers on a refreshed state before it is published"""
+    return state, solver_pool.prepare_snapshot(state.arrays, optimizer)
+
+refresh_scheduler = RefreshScheduler.from_env(refresh_pipeline, refresh_args, prepare_refresh,
+                                              lambda prepared: publish_data(*prepared))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Enhanced lifespan event handler with fixture difficulty"""
     # Startup
-    global predictor, optimizer, current_players, current_predictions
+    global optimizer, startup_started, startup_seconds
     
+    startup_started = time.perf_counter()
     logger.info("🚀 Starting Enhanced FPL Optimizer API...")
     
-    # Load or collect player data
+    store = DataStore()
+    
+    # Load or collect player data; /api/players serves every column, so players are read in full
     try:
-        players_path = os.path.join(backend_dir, '..', 'data', 'players.csv')
-        current_players = pd.read_csv(players_path)
-        logger.info(f"✅ Loaded {len(current_players)} players")
+        players = store.read('players')
+        logger.info(f"✅ Loaded {len(players)} players")
     except FileNotFoundError:
         logger.info("📥 Collecting fresh player data...")
-        data_dir = os.path.join(backend_dir, '..', 'data')
         models_dir = os.path.join(backend_dir, '..', 'models')
-        os.makedirs(data_dir, exist_ok=True)
         os.makedirs(models_dir, exist_ok=True)
         
         collector = SimpleFPLCollector()
-        current_players = collector.get_all_data()
-        gameweeks = collector.get_player_history(max_players=300)  # More data
-        fixtures = collector.get_fixtures()
+        players = collector.get_all_data()
+        collector.get_player_history(max_players=300)  # More data
+        collector.get_fixtures()
     
-    # Load or train enhanced model
+    # Fixtures feed the transfer planner whether or not the snapshot is reused
     try:
-        model_path = os.path.join(backend_dir, '..', 'models', 'enhanced_predictor.pkl')
-        predictor = joblib.load(model_path)
-        logger.info("✅ Loaded enhanced trained model")
-        
-        # Verify model has required attributes
-        if not hasattr(predictor, 'models') or not predictor.models:
-            raise FileNotFoundError("Model missing position-specific models")
-            
+        fixtures = store.read('fixtures', columns=FIXTURE_COLUMNS)
     except FileNotFoundError:
-        logger.info("🤖 Training enhanced position-specific model...")
-        
-        # Import the enhanced predictor
-        try:
-            from predictor import EnhancedPredictor
-        except ImportError:
-            # Fallback to simple predictor if enhanced not available
-            logger.warning("Enhanced predictor not found, using simple predictor")
-            from predictor import SimplePredictor
-
-        predictor = SimplePredictor()
-        
-        # Load required data
+        logger.info("📥 Collecting fixture data...")
+        fixtures = SimpleFPLCollector().get_fixtures()
+    
+    # Reuse the model, features and predictions built from identical inputs on a previous boot
+    snapshot_key = make_snapshot_key(store)
+    snapshot = ServingSnapshot.load(SNAPSHOT_PATH, snapshot_key)
+    if snapshot is not None:
+        logger.info(f"⚡ Loaded serving snapshot {snapshot_key[:12]} ({len(snapshot.predictions)} predictions)")
+    else:
+        logger.info(f"🤖 No serving snapshot for inputs {snapshot_key[:12]}, training position-specific model...")
         try:
-            gameweeks_path = os.path.join(backend_dir, '..', 'data', 'gameweeks.csv')
-            gameweeks = pd.read_csv(gameweeks_path)
-            
-            fixtures_path = os.path.join(backend_dir, '..', 'data', 'fixtures.csv')
-            if os.path.exists(fixtures_path):
-                fixtures = pd.read_csv(fixtures_path)
-            else:
-                logger.info("📥 Collecting fixture data...")
-                collector = SimpleFPLCollector()
-                fixtures = collector.get_fixtures()
-                
+            gameweeks = store.read('gameweeks', columns=SimplePredictor.GAMEWEEK_COLUMNS)
         except FileNotFoundError:
             logger.info("📥 Collecting missing data...")
-            collector = SimpleFPLCollector()
-            gameweeks = collector.get_player_history(max_players=300)
-            fixtures = collector.get_fixtures()
+            gameweeks = SimpleFPLCollector().get_player_history(max_players=300)
         
-        # Create enhanced features and train
-        logger.info("🔧 Creating enhanced features...")
-        features = predictor.create_features(current_players, gameweeks, fixtures)
-        
-        if not features.empty:
-            logger.info("🎯 Training position-specific models...")
-            predictor.train(features)
-        else:
-            logger.error("❌ No features created, cannot train model")
-            raise ValueError("Failed to create training features")
+        # Create enhanced features, train and predict
+        snapshot = ServingSnapshot.build(snapshot_key, players, gameweeks, fixtures)
+        snapshot.save(SNAPSHOT_PATH)
+        logger.info(f"✅ Built and saved serving snapshot in {snapshot.build_seconds:.2f}s")
+    
+    if not snapshot.predictions:
+        logger.error("❌ Could not generate predictions")
     
     # Initialize optimizer
     optimizer = FPLOptimizer()
     
-    # Generate predictions with enhanced model
-    try:
-        gameweeks_path = os.path.join(backend_dir, '..', 'data', 'gameweeks.csv')
-        gameweeks = pd.read_csv(gameweeks_path)
-        
-        fixtures_path = os.path.join(backend_dir, '..', 'data', 'fixtures.csv')
-        if os.path.exists(fixtures_path):
-            fixtures = pd.read_csv(fixtures_path)
-        else:
-            collector = SimpleFPLCollector()
-            fixtures = collector.get_fixtures()
-            
-    except FileNotFoundError:
-        logger.info("📥 Collecting data for predictions...")
-        collector = SimpleFPLCollector()
-        gameweeks = collector.get_player_history(max_players=300)
-        fixtures = collector.get_fixtures()
+    publish_data(ServingState(players, fixtures, snapshot, optimizer))
+    refresh_scheduler.start()
     
-    # Generate current predictions
-    logger.info("🔮 Generating enhanced predictions...")
-    features = predictor.create_features(current_players, gameweeks, fixtures)
-    
-    if not features.empty and 'id' in features.columns:
-        predictions_array = predictor.predict(features)
-        current_predictions = dict(zip(features['id'], predictions_array))
-        logger.info(f"✅ Generated {len(current_predictions)} predictions")
-    else:
-        logger.error("❌ Could not generate predictions")
-        current_predictions = {}
-    
-    logger.info("🎉 Enhanced FPL Optimizer API ready!")
+    startup_seconds = time.perf_counter() - startup_started
+    logger.info(f"🎉 Enhanced FPL Optimizer API ready in {startup_seconds * 1000:.0f}ms!")
     
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down Enhanced FPL Optimizer API...")
+    refresh_scheduler.shutdown()
+    solver_pool.shutdown()
 
 app = FastAPI(
     title="Enhanced FPL Optimizer API",
@@ -194,130 +326,264 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+@app.middleware("http")
+async def log_time_to_first_request(request, call_next):
+    """Log how long after startup began the first request was answered"""
+    global first_request_logged
+    response = await call_next(request)
+    if not first_request_logged:
+        first_request_logged = True
+        logger.info(f"⏱️ Time to first request: {(time.perf_counter() - startup_started) * 1000:.0f}ms "
+                    f"({request.method} {request.url.path})")
+    return response
+
+@app.middleware("http")
+async def compress_response(request, call_next):
+    """gzip/brotli for large JSON bodies, negotiated from Accept-Encoding"""
+    response = await call_next(request)
+    length = int(response.headers.get("content-length", 0))
+    # Streamed responses carry no content-length and pass through untouched
+    if (length < compressor.min_size or "content-encoding" in response.headers
+            or not response.headers.get("content-type", "").startswith("application/json")):
+        return response
+    response.headers.add_vary_header("Accept-Encoding")
+    encoding = compressor.negotiate(request.headers.get("accept-encoding"))
+    if encoding is None:
+        return response
+    
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = response.headers.get("etag")
+    headers = response.headers.mutablecopy()
+    del headers["content-length"]
+    headers["content-encoding"] = encoding
+    if etag and not etag.startswith("W/"):
+        # Same content, different bytes: the validator becomes weak
+        headers["etag"] = f"W/{etag}"
+    with stage('http', 'compress'):
+        compressed = compressor.compress(body, encoding, etag)
+    return Response(compressed, status_code=response.status_code, headers=headers)
+
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    """Request count and latency per route template (outermost, so compression is included)"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    HTTP_SECONDS.observe(time.perf_counter() - started, method=request.method, route=path)
+    HTTP_REQUESTS.inc(method=request.method, route=path, status=response.status_code)
+    return response
+
 @app.get("/api/health")
 async def health_check():
     """Enhanced health check endpoint"""
-    model_status = "loaded" if predictor and hasattr(predictor, 'models') else "not loaded"
-    predictions_count = len(current_predictions) if current_predictions else 0
+    state = serving
+    model_status = "loaded" if state and getattr(state.predictor, 'models', None) else "not loaded"
+    predictions_count = len(state.predictions) if state else 0
     
     return {
         "status": "healthy", 
         "message": "Enhanced FPL Optimizer API is running",
         "model_status": model_status,
         "predictions_available": predictions_count,
+        "data_version": state.data_version if state else 0,
+        "optimization_cache": optimization_cache.stats(),
+        "solver_pool": solver_pool.stats(),
+        "serving_snapshot": state.snapshot.info() if state else None,
+        "serving_table": state.table.info() if state else None,
+        "refresh": {key: value for key, value in refresh_scheduler.stats().items() if key != 'jobs'},
+        "startup_seconds": round(startup_seconds, 3) if startup_seconds is not None else None,
         "version": "2.1.0"
     }
 
+@app.get("/api/metrics")
+async def metrics():
+    """Counters and histograms in the Prometheus text format"""
+    # Counts kept by the pool and caches are copied in at scrape time
+    pool = solver_pool.stats()
+    REGISTRY.gauge('fpl_solver_pool_in_flight', "Solves running or queued").set(pool['in_flight'])
+    solves = REGISTRY.counter('fpl_solver_pool_solves_total', "Pool solves by outcome", ('outcome',))
+    for outcome in ('completed', 'rejected', 'timed_out'):
+        solves.set(pool[outcome], outcome=outcome)
+    cache = optimization_cache.stats()
+    lookups = REGISTRY.counter('fpl_optimization_cache_lookups_total', "Optimization cache lookups", ('result',))
+    lookups.set(cache['hits'], result='hit')
+    lookups.set(cache['misses'], result='miss')
+    REGISTRY.gauge('fpl_optimization_cache_entries', "Cached optimization results").set(cache['entries'])
+    REGISTRY.gauge('fpl_data_version', "Data version served, bumped on every refresh").set(
+        serving.data_version if serving else 0)
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/players")
-async def get_players():
-    """Get all players with enhanced predictions"""
-    if current_players is None:
+async def get_players(
+    request: Request,
+    fields: Optional[str] = None,
+    position: Optional[str] = None,
+    team: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sort: str = "-predicted_points",
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    """Players with predictions, filtered, sorted and paginated.
+
+    fields: comma-separated columns, or "all" (default: a summary view)
+    position / team: comma-separated position names / team ids
+    min_price / max_price: price range in millions
+    sort: column name, "-" prefixed for descending
+    cursor: next_cursor from the previous page
+    """
+    if serving is None:
         raise HTTPException(status_code=500, detail="Player data not loaded")
+    table = serving.table
     
-    players_with_predictions = current_players.copy()
-    players_with_predictions['predicted_points'] = players_with_predictions['id'].map(
-        lambda x: current_predictions.get(x, 0)
-    )
-    
-    # Add enhanced value calculation
-    players_with_predictions['value'] = (
-        players_with_predictions['predicted_points'] / 
-        (players_with_predictions['now_cost'] / 10)
-    ).round(2)
+    # The body depends only on the data version and the query
+    query = sorted(request.query_params.multi_items())
+    etag = f'"{table.version}-{hashlib.sha1(repr(query).encode()).hexdigest()[:12]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
     
-    # Add prediction confidence (higher for players with more data)
-    players_with_predictions['prediction_confidence'] = players_with_predictions['total_points'].apply(
-        lambda x: min(1.0, x / 50.0)  # Scale confidence based on total points
-    ).round(2)
+    try:
+        teams = [int(t) for t in split_param(team)] if team else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="team must be comma-separated team ids")
+    try:
+        body = table.players_page(
+            fields=split_param(fields),
+            positions=split_param(position),
+            teams=teams,
+            min_price=min_price,
+            max_price=max_price,
+            sort=sort,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(body, media_type="application/json", headers=headers)
+
+async def solve_in_pool(pipeline: str, method, *args, **kwargs) -> dict:
+    """Await a solver pool method, mapping saturation to 429, timeouts to 504 and replaced data to 409, and recording stage timings"""
+    pool_started = time.perf_counter()
+    try:
+        result = await method(*args, **kwargs)
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=409, detail=f"{e}; resubmit")
+    except SolverPoolSaturated as e:
+        logger.warning(f"⚠️ {e}")
+        raise HTTPException(
+            status_code=429,
+            detail={"message": "Optimizer is busy, retry shortly", "queue_depth": e.queue_depth, "max_pending": e.max_pending},
+            headers={"Retry-After": "1"},
+        )
+    except asyncio.TimeoutError:
+        logger.error(f"❌ Optimization exceeded {solver_pool.solve_timeout}s")
+        raise HTTPException(status_code=504, detail=f"Optimization timed out after {solver_pool.solve_timeout}s")
     
-    return players_with_predictions.to_dict('records')
+    # Stage timings come back from the worker; the rest of the round trip is queueing and IPC
+    pool_seconds = time.perf_counter() - pool_started
+    worker_timings = result.get('timings', {})
+    for name, seconds in worker_timings.items():
+        STAGE_SECONDS.observe(seconds, pipeline=pipeline, stage=name)
+    STAGE_SECONDS.observe(max(pool_seconds - sum(worker_timings.values()), 0.0), pipeline=pipeline, stage='pool')
+    return result
 
-@app.post("/api/optimize", response_model=TeamResponse)
-async def optimize_team(request: OptimizationRequest):
-    """Enhanced team optimization with detailed logging"""
+async def run_optimization(request: OptimizationRequest, state: ServingState = None) -> bytes:
+    """Encoded TeamResponse for one request against state (the published one by default); raises HTTPException like the endpoint"""
     try:
         logger.info(f"🔍 Received optimization request: budget={request.budget}, exclude={request.exclude_players}")
+        validate_started = time.perf_counter()
         
-        if optimizer is None or current_predictions is None:
+        # One read of the published state: a refresh swapping in the next one does not affect this request
+        state = state or serving
+        if state is None:
             logger.error("❌ Optimizer or predictions not initialized")
             raise HTTPException(status_code=500, detail="Optimizer not initialized")
         
-        logger.info(f"✅ Have {len(current_predictions)} player predictions")
-        logger.info(f"✅ Current players shape: {current_players.shape}")
+        try:
+            optimizer.parse_formation(request.formation_preference)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Filter predictions based on exclude list
-        filtered_predictions = {
-            pid: score for pid, score in current_predictions.items() 
-            if pid not in request.exclude_players
-        }
+        cache_key = optimization_cache.make_key(
+            state.data_version, request.budget, request.exclude_players, request.formation_preference,
+            k=request.k, min_distance=request.min_distance, risk=(
+                request.risk_mode, request.risk_lambda, request.risk_quantile, request.risk_candidates
+            ) if request.risk_mode else None
+        )
+        cached = optimization_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ Served optimization from cache (data version {state.data_version})")
+            return cached
+        
+        logger.info(f"✅ Have {len(state.predictions)} player predictions")
+        logger.info(f"✅ Current players shape: {state.players.shape}")
         
-        logger.info(f"✅ Filtered to {len(filtered_predictions)} eligible players")
+        # Filter predictions based on exclude list
+        excluded = pd.Index(state.arrays.ids).isin(request.exclude_players)
+        logger.info(f"✅ Filtered to {int((~excluded).sum())} eligible players")
         
         # Add prediction quality check
-        valid_predictions = {k: v for k, v in filtered_predictions.items() if v > 0}
-        if len(valid_predictions) < 50:
-            logger.warning(f"⚠️ Only {len(valid_predictions)} players have positive predictions")
+        valid_predictions = int(((state.arrays.points > 0) & ~excluded).sum())
+        if valid_predictions < 50:
+            logger.warning(f"⚠️ Only {valid_predictions} players have positive predictions")
+        STAGE_SECONDS.observe(time.perf_counter() - validate_started, pipeline='optimize', stage='validate')
         
-        # Run optimization
-        result = optimizer.optimize_team(current_players, filtered_predictions)
+        # Run optimization in the solver pool so a slow solve never blocks the event loop
+        if request.risk_mode:
+            result = await solve_in_pool('optimize', solver_pool.solve_risk_adjusted, request.k, request.budget,
+                                         request.exclude_players, request.formation_preference, request.min_distance,
+                                         request.risk_mode, request.risk_lambda, request.risk_quantile,
+                                         request.risk_candidates, arrays=state.arrays)
+        elif request.k == 1:
+            result = await solve_in_pool('optimize', solver_pool.solve, request.budget, request.exclude_players,
+                                         request.formation_preference, arrays=state.arrays)
+        else:
+            result = await solve_in_pool('optimize', solver_pool.solve_top_k, request.k, request.budget,
+                                         request.exclude_players, request.formation_preference, request.min_distance,
+                                         arrays=state.arrays)
         
         logger.info(f"🔍 Optimization status: {result.get('status', 'Unknown')}")
+        if result.get('pruned'):
+            logger.info(f"✂️ Pruned {result['pruned']} dominated players before solving")
         
-        if result['status'] != 'Optimal':
+        if result['status'] not in SOLVED:
             logger.error(f"❌ Optimization failed: {result}")
             raise HTTPException(status_code=400, detail=f"Optimization failed: {result}")
         
-        logger.info(f"✅ Found {len(result['players'])} players in optimal team")
-        
-        # Debug: Print first player data structure
-        if result['players']:
-            logger.info(f"🔍 Sample player data: {result['players'][0]}")
-        
-        # Enhanced player data conversion with validation
-        players_data = []
-        for i, player_data in enumerate(result['players']):
-            try:
-                logger.debug(f"Processing player {i+1}: {player_data}")
-                
-                # Enhanced type conversion with validation
-                player_data['team'] = str(player_data['team'])
-                player_data['price'] = float(player_data['price'])
-                player_data['predicted_points'] = max(0.0, float(player_data['predicted_points']))
-                
-                # Validate required fields
-                required_fields = ['id', 'name', 'position', 'team', 'price', 'predicted_points']
-                for field in required_fields:
-                    if field not in player_data:
-                        raise ValueError(f"Missing required field: {field}")
-                
-                players_data.append(Player(**player_data))
-                
-            except Exception as e:
-                logger.error(f"❌ Error creating Player object for player {i+1}: {e}")
-                logger.error(f"Player data: {player_data}")
-                raise
-        
-        # Enhanced response with validation
-        response = TeamResponse(
-            status=result['status'],
-            players=players_data,
-            total_cost=float(result['total_cost']),
-            total_predicted_points=float(result['total_predicted_points']),
-            remaining_budget=float(result['remaining_budget'])
-        )
+        serialize_started = time.perf_counter()
+        if request.k == 1 and not request.risk_mode:
+            response = team_response(result)
+        else:
+            # The best squad is the response; the rest follow in rank order
+            teams = [team_response(solution) for solution in result['solutions']]
+            response = teams[0]
+            response['alternatives'] = teams[1:]
+            logger.info(f"🔀 Ranked {len(teams)}/{request.k} squads in {result['total_solve_time']}s "
+                        f"(min distance {request.min_distance})")
+            if request.risk_mode:
+                logger.info(f"🎲 Re-ranked {result['candidates']} candidates by {request.risk_mode} risk score "
+                            f"in {result['timings']['simulate']:.3f}s")
         
-        logger.info(f"✅ Successfully created enhanced response with {len(response.players)} players")
+        logger.info(f"✅ Successfully created enhanced response with {len(response['players'])} players")
         
         # Log team composition for validation
         positions = {}
-        for player in response.players:
-            positions[player.position] = positions.get(player.position, 0) + 1
+        for player in response['players']:
+            positions[player['position']] = positions.get(player['position'], 0) + 1
         
-        logger.info(f"📊 Team composition: {positions}")
+        logger.info(f"📊 Team composition: {positions}, starting {response['formation']}, captain {response['captain_id']}")
         
-        return response
+        # Cache the encoded body, so a hit skips serialization too
+        body = dumps(response)
+        STAGE_SECONDS.observe(time.perf_counter() - serialize_started, pipeline='optimize', stage='serialize')
+        optimization_cache.put(cache_key, body)
+        return body
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -329,103 +595,189 @@ async def optimize_team(request: OptimizationRequest):
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Optimization failed: {str(e)}")
 
-@app.get("/api/analytics/position-stats")
-async def get_position_analytics():
-    """Enhanced analytics with position-specific insights"""
-    if current_players is None or current_predictions is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+@app.post("/api/optimize", response_model=TeamResponse)
+async def optimize_team(request: OptimizationRequest):
+    """Enhanced team optimization with detailed logging"""
+    return Response(await run_optimization(request), media_type="application/json")
+
+@app.post("/api/optimize/batch")
+async def optimize_batch(requests: List[OptimizationRequest]):
+    """Solve many scenarios against the current snapshot, streaming NDJSON as each one finishes.
+
+    Every line is {"index", "status_code", "result"} on success or
+    {"index", "status_code", "detail"} on failure, in completion order; the
+    last line is {"summary": {...}}. Scenarios run concurrently in the
+    solver pool, at most two per worker at a time so single requests still
+    find room in the queue. All of them are answered from the data version
+    current when the batch arrived: its solver workers are pinned and keep
+    running for the batch if a refresh publishes a newer one meanwhile.
+    """
+    if not requests:
+        raise HTTPException(status_code=400, detail="No scenarios given")
+    if len(requests) > BATCH_MAX_SCENARIOS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_SCENARIOS} scenarios per batch")
+    # Every scenario is answered from this state, even if a refresh is published mid-batch
+    state = serving
+    if state is None:
+        raise HTTPException(status_code=500, detail="Optimizer not initialized")
     
-    analytics_data = current_players.copy()
-    analytics_data['predicted_points'] = analytics_data['id'].map(
-        lambda x: current_predictions.get(x, 0)
+    logger.info(f"📦 Batch of {len(requests)} scenarios on data version {state.data_version}")
+    # Released when the stream ends, or by the response's background task if it never starts
+    release = solver_pool.pin(state.arrays)
+    semaphore = asyncio.Semaphore(2 * max(solver_pool.workers, 1))
+    
+    async def scenario(index: int, request: OptimizationRequest):
+        async with semaphore:
+            try:
+                body = await run_optimization(request, state)
+            except HTTPException as e:
+                return False, dumps({"index": index, "status_code": e.status_code, "detail": e.detail}) + b"\n"
+        return True, b'{"index":%d,"status_code":200,"result":%s}\n' % (index, body)
+    
+    async def stream():
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(scenario(i, request)) for i, request in enumerate(requests)]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                ok, line = await next_done
+                succeeded += ok
+                yield line
+        finally:
+            # Client went away: stop queueing the scenarios that have not started
+            for task in tasks:
+                task.cancel()
+            release()
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, pipeline='optimize_batch', stage='total')
+        logger.info(f"📦 Batch done: {succeeded}/{len(requests)} solved in {elapsed:.2f}s")
+        yield dumps({"summary": {"scenarios": len(requests), "succeeded": succeeded,
+                                 "failed": len(requests) - succeeded, "elapsed": round(elapsed, 4)}}) + b"\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson", background=BackgroundTask(release))
+
+@app.post("/api/optimize/frontier", response_model=FrontierResponse)
+async def optimize_frontier(request: FrontierRequest):
+    """Best predicted points at every budget in a range, for the budget slider.
+
+    Walks the grid from max_budget down and solves once per distinct squad:
+    a squad optimal at budget B that costs c is optimal for all of [c, B].
+    """
+    state = serving
+    if state is None:
+        raise HTTPException(status_code=500, detail="Optimizer not initialized")
+    if request.min_budget > request.max_budget:
+        raise HTTPException(status_code=400, detail="min_budget must not exceed max_budget")
+    grid_points = int((request.max_budget - request.min_budget) / request.step + 1e-9) + 1
+    if grid_points > FRONTIER_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {FRONTIER_MAX_POINTS} budgets per frontier, got {grid_points}")
+    try:
+        optimizer.parse_formation(request.formation_preference)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    cache_key = optimization_cache.make_key(
+        state.data_version, request.max_budget, request.exclude_players, request.formation_preference,
+        frontier=(float(request.min_budget), float(request.step))
     )
-    analytics_data['price'] = analytics_data['now_cost'] / 10
+    cached = optimization_cache.get(cache_key)
+    if cached is not None:
+        return Response(cached, media_type="application/json")
     
-    # Enhanced position statistics
-    position_stats = analytics_data.groupby('position_name').agg({
-        'predicted_points': ['mean', 'max', 'std', 'count'],
-        'price': ['mean', 'max', 'min'],
-        'total_points': ['mean', 'max'],
-        'form': 'mean',
-        'selected_by_percent': 'mean'
-    }).round(2)
+    result = await solve_in_pool('frontier', solver_pool.solve_frontier, request.min_budget, request.max_budget,
+                                 request.step, request.exclude_players, request.formation_preference,
+                                 arrays=state.arrays)
+    logger.info(f"📈 Frontier over {result['grid_points']} budgets from {result['solves']} solves "
+                f"in {result['total_solve_time']}s")
     
-    position_stats.columns = ['_'.join(col).strip() for col in position_stats.columns]
+    serialize_started = time.perf_counter()
+    body = dumps({
+        "status": result['status'],
+        "points": result['points'],
+        "squads": [team_response(squad) for squad in result['squads']],
+        "grid_points": result['grid_points'],
+        "solves": result['solves'],
+        "truncated": result['truncated'],
+        "total_solve_time": result['total_solve_time'],
+    })
+    STAGE_SECONDS.observe(time.perf_counter() - serialize_started, pipeline='frontier', stage='serialize')
+    optimization_cache.put(cache_key, body)
+    return Response(body, media_type="application/json")
+
+@app.post("/api/plan-transfers")
+async def plan_transfers(request: TransferPlanRequest):
+    """Multi-gameweek transfer plan for an existing squad"""
+    state = serving
+    if state is None:
+        raise HTTPException(status_code=500, detail="Optimizer not initialized")
+    
+    start_gameweek = next_gameweek(state.fixtures)
+    points = TransferPlanner(optimizer).gameweek_points(state.arrays, state.fixtures, start_gameweek, request.horizon)
+    logger.info(f"🗓️ Planning GW{start_gameweek}-{start_gameweek + request.horizon - 1} for squad {request.current_squad}")
     
-    # Add value metrics
-    result = position_stats.reset_index()
-    result['avg_value'] = (result['predicted_points_mean'] / result['price_mean']).round(2)
+    try:
+        # The multi-period MILP is far bigger than a squad solve: it runs in the solver pool, under its backpressure
+        result = await solve_in_pool('plan', solver_pool.plan_transfers, points, request.current_squad,
+                                     request.hit_cost, request.bank, request.free_transfers, start_gameweek,
+                                     request.time_limit, arrays=state.arrays)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return result.to_dict('records')
+    logger.info(f"✅ Transfer plan {result['status']} in {result['solve_time']}s over {result['candidates']} candidates")
+    if result['status'] == 'Failed':
+        raise HTTPException(status_code=400, detail=f"Transfer planning failed: {result}")
+    return result
+
+@app.get("/api/analytics/position-stats")
+async def get_position_analytics():
+    """Enhanced analytics with position-specific insights"""
+    if serving is None:
+        raise HTTPException(status_code=500, detail="Data not loaded")
+    
+    return Response(serving.table.position_stats_json, media_type="application/json")
 
 @app.get("/api/top-players/{position}")
 async def get_top_players(position: str, limit: int = 10):
     """Enhanced top players with prediction insights"""
-    if current_players is None or current_predictions is None:
+    if serving is None:
         raise HTTPException(status_code=500, detail="Data not loaded")
     
-    # Filter by position
-    position_players = current_players[current_players['position_name'] == position.upper()].copy()
-    
-    # Add predictions and enhanced metrics
-    position_players['predicted_points'] = position_players['id'].map(
-        lambda x: current_predictions.get(x, 0)
-    )
-    
-    position_players['value'] = (
-        position_players['predicted_points'] / (position_players['now_cost'] / 10)
-    ).round(2)
-    
-    position_players['form_score'] = (
-        position_players['form'].astype(float) * 0.3 + 
-        position_players['predicted_points'] * 0.7
-    ).round(2)
-    
-    # Get top players by predicted points
-    top_players = position_players.nlargest(limit, 'predicted_points')
-    
-    return top_players[[
-        'id', 'web_name', 'team', 'now_cost', 'total_points', 
-        'predicted_points', 'value', 'form', 'form_score'
-    ]].to_dict('records')
+    return Response(serving.table.top_players_json(position, limit), media_type="application/json")
 
-@app.post("/api/refresh-data")
+@app.post("/api/refresh-data", status_code=202)
 async def refresh_data():
-    """Enhanced data refresh with fixture updates"""
-    try:
-        logger.info("🔄 Refreshing FPL data...")
-        
-        collector = SimpleFPLCollector()
-        global current_players, current_predictions
-        
-        # Refresh all data sources
-        current_players = collector.get_all_data()
-        gameweeks = collector.get_player_history(max_players=300)
-        fixtures = collector.get_fixtures()
-        
-        # Regenerate enhanced predictions
-        if predictor:
-            features = predictor.create_features(current_players, gameweeks, fixtures)
-            predictions_array = predictor.predict(features)
-            current_predictions = dict(zip(features['id'], predictions_array))
-            
-            logger.info(f"✅ Refreshed {len(current_predictions)} predictions")
-        
-        return {
-            "message": "Enhanced data refreshed successfully",
-            "players_updated": len(current_players),
-            "predictions_updated": len(current_predictions)
-        }
-        
-    except Exception as e:
-        logger.error(f"❌ Data refresh failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    """Start a data refresh in the background, or report the one already running.
+    
+    Players, fixtures and new gameweek histories are fetched and predictions
+    rebuilt in a worker while the current data keeps being served; the new
+    data version replaces it in one swap when the job succeeds. Follow the
+    job at /api/refresh-data/{id}.
+    """
+    if serving is None:
+        raise HTTPException(status_code=500, detail="Data not loaded")
+    job = refresh_scheduler.trigger('manual')
+    logger.info(f"🔄 Refresh job {job.id} {job.state} (serving data version {serving.data_version})")
+    return {"message": f"Refresh job {job.id} {job.state}", "job": job.info()}
+
+@app.get("/api/refresh-data")
+async def refresh_status():
+    """Running, last successful and recent refresh jobs"""
+    return refresh_scheduler.stats()
+
+@app.get("/api/refresh-data/{job_id}")
+async def refresh_job(job_id: int):
+    """Status, stage and progress of one refresh job"""
+    job = refresh_scheduler.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown refresh job {job_id}")
+    return job.info()
 
 @app.get("/api/model-info")
 async def get_model_info():
     """Get information about the trained model"""
-    if predictor is None:
+    if serving is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
+    predictor = serving.predictor
     
     model_info = {
         "model_type": "Enhanced Position-Specific Random Forest",
@@ -434,13 +786,20 @@ async def get_model_info():
         "position_models": {}
     }
     
+    metrics = getattr(predictor, 'training_metrics', None) or {}
+    if metrics:
+        model_info["training"] = {key: metrics[key] for key in ('train_seconds', 'rows', 'workers', 'memory_limit_mb')}
     if hasattr(predictor, 'models'):
         position_names = {1: 'GKP', 2: 'DEF', 3: 'MID', 4: 'FWD'}
         for pos_num, model in predictor.models.items():
             pos_name = position_names.get(pos_num, f"Position_{pos_num}")
+            pos_metrics = metrics.get('positions', {}).get(pos_name, {})
             model_info["position_models"][pos_name] = {
                 "n_estimators": model.n_estimators if hasattr(model, 'n_estimators') else "Unknown",
-                "trained": True
+                "trained": True,
+                "pooled": pos_metrics.get('pooled', False),
+                "cv_mae": pos_metrics.get('cv_mae'),
+                "baseline_mae": pos_metrics.get('baseline_mae'),
             }
     
     return model_info
@@ -0,0 +1,89 @@
+"""What-if sweep: 100 scenarios as one streamed /api/optimize/batch call vs 100 sequential /api/optimize calls
+
+Scenarios are the budgets 95.0-105.0 in 0.5 steps plus, at 100.0, each of
+the most expensive players excluded in turn. The server runs with the
+result cache disabled, so both paths solve every scenario. Checks that
+both paths agree on every squad's predicted points.
+
+Usage: python benchmarks/bench_batch_optimize.py [--scenarios 100] [--workers N] [--url http://127.0.0.1:8000]
+"""
+import argparse
+import json
+import os
+import time
+
+import requests
+
+from load_test_read_endpoints import start_server
+from synthetic import real_players
+
+
+def scenarios(n):
+    budgets = [{'budget': 95.0 + 0.5 * i} for i in range(21)]
+    players, _ = real_players()
+    premium = players.nlargest(max(n - len(budgets), 0), 'now_cost')['id'].tolist()
+    return (budgets + [{'budget': 100.0, 'exclude_players': [player_id]} for player_id in premium])[:n]
+
+
+def sequential(url, batch):
+    session = requests.Session()
+    points = []
+    for request in batch:
+        response = session.post(f"{url}/api/optimize", json=request, timeout=60)
+        points.append(response.json()['total_predicted_points'] if response.ok else None)
+    return points
+
+
+def batched(url, batch):
+    points, first = [None] * len(batch), None
+    start = time.perf_counter()
+    with requests.post(f"{url}/api/optimize/batch", json=batch, stream=True, timeout=600) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            item = json.loads(line)
+            if 'summary' in item:
+                continue
+            first = first or time.perf_counter() - start
+            if item['status_code'] == 200:
+                points[item['index']] = item['result']['total_predicted_points']
+    return points, first
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenarios', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--url')
+    args = parser.parse_args()
+
+    batch = scenarios(args.scenarios)
+    process, url = (None, args.url) if args.url else start_server(
+        FPL_SOLVER_WORKERS=str(args.workers), FPL_CACHE_SIZE='0', FPL_LOG_LEVEL='WARNING')
+    try:
+        # One warm-up solve per worker
+        for _ in range(args.workers):
+            requests.post(f"{url}/api/optimize", json={'budget': 100.0}, timeout=60)
+        print(f"{len(batch)} scenarios, {args.workers} solver workers, {os.cpu_count()} cores")
+
+        start = time.perf_counter()
+        sequential_points = sequential(url, batch)
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched_points, first = batched(url, batch)
+        batched_time = time.perf_counter() - start
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"{'sequential':<10} {sequential_time:7.2f}s  {len(batch) / sequential_time:6.1f} scenarios/s")
+    print(f"{'batched':<10} {batched_time:7.2f}s  {len(batch) / batched_time:6.1f} scenarios/s  "
+          f"first result after {first * 1000:.0f}ms  speed-up {sequential_time / batched_time:.2f}x")
+    mismatches = sum(a != b for a, b in zip(sequential_points, batched_points))
+    print(f"solved {sum(p is not None for p in batched_points)}/{len(batch)}, "
+          f"{mismatches} scenarios differ in predicted points")
+
+
+if __name__ == '__main__':
+    main()
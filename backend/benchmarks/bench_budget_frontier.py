@@ -0,0 +1,72 @@
+"""Budget slider: one solve per budget vs the parametric frontier walk
+
+For each budget range, solves every grid point independently on a persistent
+SquadModel (what the slider did, one /api/optimize call per position) and
+then computes the same curve with SquadModel.solve_frontier. Each budget's
+lineup objective (starters + captain + weighted bench) is compared between
+the two.
+
+Usage: python benchmarks/bench_budget_frontier.py [--solver highs] [--synthetic 1500]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import real_players, synthetic_players
+from optimizer import FPLOptimizer, SquadModel
+
+RANGES = [(95.0, 105.0, 0.5), (80.0, 105.0, 0.5), (80.0, 105.0, 0.1)]
+
+
+def lineup_objective(optimizer, result):
+    """What the MILP maximizes, recomputed from the returned players"""
+    total = 0.0
+    for player in result['players']:
+        points = player['predicted_points']
+        if player.get('is_starter'):
+            total += points * (2 if player.get('is_captain') else 1)
+        elif player.get('bench_order'):
+            total += optimizer.bench_weights[player['bench_order'] - 1] * points
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--solver', choices=['highs', 'cbc'], default=None)
+    parser.add_argument('--synthetic', type=int, default=0, help="use N synthetic players instead of players.csv")
+    args = parser.parse_args()
+
+    players, predictions = synthetic_players(args.synthetic) if args.synthetic else real_players()
+    optimizer = FPLOptimizer()
+    arrays = optimizer.prepare(players, predictions)
+    print(f"{len(arrays)} players")
+    print(f"{'range':<18} {'budgets':>7} {'per-budget':>11} {'solves':>7} {'frontier':>9} {'speed-up':>9}  max objective gap")
+
+    for low, high, step in RANGES:
+        budgets = np.round(np.arange(high, low - 1e-9, -step), 4)
+
+        model = SquadModel(optimizer, arrays, args.solver)
+        start = time.perf_counter()
+        independent = {float(b): model.solve(float(b)) for b in budgets}
+        independent_time = time.perf_counter() - start
+
+        model = SquadModel(optimizer, arrays, args.solver)
+        start = time.perf_counter()
+        frontier = model.solve_frontier(low, high, step)
+        frontier_time = time.perf_counter() - start
+
+        gaps = []
+        for point in frontier['points']:
+            expected = independent[point['budget']]
+            if point['squad'] is None or expected['status'] != 'Optimal':
+                gaps.append(0.0 if (point['squad'] is None) == (expected['status'] != 'Optimal') else np.inf)
+                continue
+            squad = frontier['squads'][point['squad']]
+            gaps.append(abs(lineup_objective(optimizer, squad) - lineup_objective(optimizer, expected)))
+        print(f"{f'{low}-{high} by {step}':<18} {len(budgets):>7} {independent_time:10.2f}s {frontier['solves']:>7} "
+              f"{frontier_time:8.2f}s {independent_time / frontier_time:8.1f}x  {max(gaps):.4f}")
+
+
+if __name__ == '__main__':
+    main()
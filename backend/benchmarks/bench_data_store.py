@@ -0,0 +1,109 @@
+"""Startup data loading: the old CSV reads vs the Parquet DataStore
+
+Each path runs in a fresh interpreter so resident memory is measured cleanly:
+
+  - csv:     what lifespan did, players.csv in full plus gameweeks.csv and
+             fixtures.csv twice each (training, then predictions)
+  - parquet: DataStore reads, players in full and only the gameweek and
+             fixture columns the predictor and planner use
+
+--season-rounds N replaces gameweeks.csv with a synthetic N-round season for
+every player, closer to the size of a late-season refresh.
+
+Usage: python benchmarks/bench_data_store.py [--season-rounds 38] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic import DATA_DIR
+
+
+def rss_kib() -> int:
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS'))
+
+
+def load(path: str, data_dir: str):
+    if path == 'csv':
+        players = pd.read_csv(f"{data_dir}/players.csv")
+        tables = [players]
+        for _ in range(2):
+            tables += [pd.read_csv(f"{data_dir}/gameweeks.csv"), pd.read_csv(f"{data_dir}/fixtures.csv")]
+        return tables
+    from data_store import DataStore
+    from planner import FIXTURE_COLUMNS
+    from predictor import SimplePredictor
+    store = DataStore(data_dir)
+    return [store.read('players'), store.read('gameweeks', SimplePredictor.GAMEWEEK_COLUMNS),
+            store.read('fixtures', FIXTURE_COLUMNS)]
+
+
+def child(path: str, data_dir: str):
+    """Runs in the subprocess: one timed load, then report time and memory as JSON"""
+    import data_store, planner, predictor  # noqa: F401 - imports are not part of the load
+    before = rss_kib()
+    start = time.perf_counter()
+    tables = load(path, data_dir)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'seconds': elapsed, 'rss_kib': rss_kib() - before,
+                      'frame_kib': sum(t.memory_usage(deep=True).sum() for t in tables) / 1024}))
+
+
+def run(path: str, data_dir: str) -> dict:
+    out = subprocess.run([sys.executable, __file__, '--child', path, data_dir],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--season-rounds', type=int, default=38)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    data_dir = tempfile.mkdtemp(prefix='fpl_store_')
+    try:
+        for table in ('players', 'fixtures', 'gameweeks'):
+            shutil.copy(os.path.join(DATA_DIR, f"{table}.csv"), data_dir)
+        if args.season_rounds:
+            from stub_fpl_server import season_histories
+            players = pd.read_csv(f"{data_dir}/players.csv")
+            fixtures = pd.read_csv(f"{data_dir}/fixtures.csv")
+            fixtures['finished'] = fixtures['event'] <= args.season_rounds
+            template = pd.read_csv(f"{data_dir}/gameweeks.csv").drop(columns=['player_id']).iloc[0].to_dict()
+            histories = season_histories(players, fixtures, template)
+            rows = [{**row, 'player_id': pid} for pid, history in histories.items() for row in history]
+            pd.DataFrame(rows).to_csv(f"{data_dir}/gameweeks.csv", index=False)
+
+        sizes = {name: os.path.getsize(f"{data_dir}/{name}") / 1024 for name in sorted(os.listdir(data_dir))}
+        start = time.perf_counter()
+        run('parquet', data_dir)  # first read migrates the CSVs
+        migration = time.perf_counter() - start
+        sizes.update({name: os.path.getsize(f"{data_dir}/{name}") / 1024
+                      for name in sorted(os.listdir(data_dir)) if name.endswith('.parquet')})
+
+        print(f"gameweek rows: {len(pd.read_csv(f'{data_dir}/gameweeks.csv'))}, "
+              f"one-time migration (incl. interpreter start) {migration:.2f}s")
+        print('files: ' + ', '.join(f"{name} {kib:.0f}KiB" for name, kib in sizes.items()))
+        for path in ('csv', 'parquet'):
+            results = [run(path, data_dir) for _ in range(args.repeat)]
+            best = min(results, key=lambda r: r['seconds'])
+            print(f"{path:<8} load {best['seconds'] * 1000:7.1f}ms  rss +{best['rss_kib'] / 1024:6.1f}MiB  "
+                  f"frames {best['frame_kib'] / 1024:6.1f}MiB")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Dominance pruning: how many players it removes and what that does to solve time
+
+For players.csv and synthetic pools, counts the players FPLOptimizer.dominated()
+drops per position, then replays the same request stream through persistent
+SquadModels with and without pruning, per backend, checking that every
+request's lineup objective is unchanged.
+
+Usage: python benchmarks/bench_dominance_pruning.py [--requests 20] [--synthetic 700 1500] [--time-limit 10]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import real_players, synthetic_players
+from bench_budget_frontier import lineup_objective
+from bench_optimize_latency import request_stream
+from optimizer import POSITIONS, SOLVED, FPLOptimizer, SquadModel, available_solvers
+
+
+def run(model, requests, time_limit):
+    latencies, objectives, pruned = [], [], []
+    for budget, excluded in requests:
+        start = time.perf_counter()
+        result = model.solve(budget, excluded, time_limit=time_limit)
+        latencies.append(time.perf_counter() - start)
+        objectives.append(lineup_objective(model.optimizer, result) if result['status'] in SOLVED else None)
+        pruned.append(result['pruned'])
+    return np.array(latencies) * 1000, objectives, pruned
+
+
+def bench(label, players, predictions, args):
+    optimizer = FPLOptimizer()
+    arrays = optimizer.prepare(players, predictions)
+    start = time.perf_counter()
+    dominated = optimizer.dominated(arrays)
+    prune_ms = (time.perf_counter() - start) * 1000
+    per_position = ', '.join(f"{pos} {int(dominated[arrays.position_index[pos]].sum())}/{len(arrays.position_index[pos])}"
+                             for pos in POSITIONS)
+    print(f"\n{label}: {len(arrays)} players, {int(dominated.sum())} dominated ({per_position}) in {prune_ms:.1f}ms")
+
+    requests = request_stream(players, predictions, args.requests)
+    print(f"{'backend':<8} {'full p50':>10} {'full p95':>10} {'pruned p50':>11} {'pruned p95':>11} "
+          f"{'pruned':>7} {'timeouts':>13} {'max objective diff':>19}")
+    for solver in [s for s in ('highs', 'cbc', 'bnb') if s in available_solvers()]:
+        full_ms, full, _ = run(SquadModel(FPLOptimizer(prune_dominated=False), arrays, solver), requests, args.time_limit)
+        pruned_ms, pruned, counts = run(SquadModel(FPLOptimizer(), arrays, solver), requests, args.time_limit)
+        diffs = [abs(a - b) for a, b in zip(full, pruned) if a is not None and b is not None]
+        print(f"{solver:<8} {np.percentile(full_ms, 50):8.1f}ms {np.percentile(full_ms, 95):8.1f}ms "
+              f"{np.percentile(pruned_ms, 50):9.1f}ms {np.percentile(pruned_ms, 95):9.1f}ms {np.mean(counts):7.0f} "
+              f"{full.count(None):>6}/{pruned.count(None):<6} {max(diffs, default=float('nan')):19.6f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--synthetic', type=int, nargs='*', default=[700, 1500])
+    parser.add_argument('--time-limit', type=float, default=10.0)
+    args = parser.parse_args()
+
+    bench('players.csv', *real_players(), args)
+    for n in args.synthetic:
+        bench(f'synthetic {n}', *synthetic_players(n), args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Player-history collection: sequential requests.get vs the concurrent collector
+
+Runs against benchmarks/stub_fpl_server.py with injected latency and a share of
+503s, in a temporary data directory where every player counts as active:
+
+  - sequential: the old loop, one requests.get per player, failures dropped
+  - concurrent: SimpleFPLCollector.get_player_history at several worker counts
+  - resume: a run whose retries are exhausted keeps its checkpoint, and the
+    rerun only fetches the players that failed
+
+Usage: python benchmarks/bench_history_collection.py [--players 500] [--latency 0.1] [--error-rate 0.02]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+import requests
+
+from stub_fpl_server import StubFPLServer
+from synthetic import DATA_DIR
+from data_collector import SimpleFPLCollector
+
+
+def sequential(base_url, player_ids):
+    collected = 0
+    for player_id in player_ids:
+        try:
+            data = requests.get(f"{base_url}element-summary/{player_id}/").json()
+            collected += bool(data['history'])
+        except Exception:
+            continue
+    return collected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 8, 16, 32])
+    parser.add_argument('--rate', type=float, default=200.0, help="token-bucket requests per second")
+    args = parser.parse_args()
+
+    server = StubFPLServer(latency=args.latency, error_rate=args.error_rate)
+    base_url = server.start()
+    data_dir = tempfile.mkdtemp(prefix='fpl_bench_')
+    players = pd.read_csv(os.path.join(DATA_DIR, 'players.csv'))
+    players['minutes'] = 90
+    players.to_csv(os.path.join(data_dir, 'players.csv'), index=False)
+    player_ids = players.nlargest(args.players, 'total_points')['id'].tolist()
+    print(f"{len(player_ids)} players, stub latency {args.latency * 1000:.0f}ms, error rate {args.error_rate:.0%}")
+
+    try:
+        start = time.perf_counter()
+        collected = sequential(base_url, player_ids)
+        print(f"{'sequential':<16} {time.perf_counter() - start:7.2f}s  {collected} players collected")
+
+        for workers in args.workers:
+            # Every run starts without cached responses
+            shutil.rmtree(os.path.join(data_dir, 'http_cache'), ignore_errors=True)
+            collector = SimpleFPLCollector(base_url, workers, args.rate, data_dir=data_dir)
+            start = time.perf_counter()
+            history = collector.get_player_history(max_players=args.players)
+            elapsed = time.perf_counter() - start
+            print(f"{f'{workers} workers':<16} {elapsed:7.2f}s  {history['player_id'].nunique()} players collected, "
+                  f"{collector.fetcher.retries} retries")
+
+        # Interrupted run: a burst of failures with no retries leaves a checkpoint behind
+        server.error_rate = 0.3
+        shutil.rmtree(os.path.join(data_dir, 'http_cache'), ignore_errors=True)
+        collector = SimpleFPLCollector(base_url, max(args.workers), args.rate, data_dir=data_dir)
+        collector.fetcher.max_retries = 0
+        collector.get_player_history(max_players=args.players)
+        server.error_rate = args.error_rate
+        before = server.requests
+        start = time.perf_counter()
+        history = SimpleFPLCollector(base_url, max(args.workers), args.rate, data_dir=data_dir) \
+            .get_player_history(max_players=args.players)
+        print(f"{'resume':<16} {time.perf_counter() - start:7.2f}s  {history['player_id'].nunique()} players collected, "
+              f"{server.requests - before} requests")
+    finally:
+        server.stop()
+        shutil.rmtree(data_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Collector traffic with the conditional-GET HTTP cache
+
+Runs the collector's full refresh (players, teams, element types, fixtures
+and 100 player histories) against benchmarks/stub_fpl_server.py three times:
+with an empty cache, again within the TTL, and once more after the TTL has
+expired so every entry is revalidated with a conditional request.
+
+Usage: python benchmarks/bench_http_cache.py [--players 100] [--latency 0.05]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from stub_fpl_server import StubFPLServer
+from synthetic import DATA_DIR
+from data_collector import SimpleFPLCollector
+
+
+def refresh(collector, players):
+    collector.get_all_data()
+    collector.get_team_mapping()
+    collector.get_element_types()
+    collector.get_fixtures()
+    collector.get_player_history(max_players=players)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = StubFPLServer(latency=args.latency)
+    base_url = server.start()
+    data_dir = tempfile.mkdtemp(prefix='fpl_bench_')
+    players = pd.read_csv(os.path.join(DATA_DIR, 'players.csv'))
+    players.to_csv(os.path.join(data_dir, 'players.csv'), index=False)
+
+    rows = []
+    try:
+        for label, ttl in [('cold cache', 300), ('within TTL', 300), ('TTL expired', 0)]:
+            collector = SimpleFPLCollector(base_url, 16, 200, data_dir=data_dir)
+            collector.cache.ttl_seconds = ttl
+            requests_before, bytes_before = server.requests, server.bytes_sent
+            start = time.perf_counter()
+            refresh(collector, args.players)
+            rows.append((label, time.perf_counter() - start, server.requests - requests_before,
+                         server.bytes_sent - bytes_before, collector.cache.stats()))
+    finally:
+        server.stop()
+        shutil.rmtree(data_dir)
+
+    print(f"\n{'run':<12} {'time':>7} {'requests':>9} {'sent':>10}  per endpoint (fresh/revalidated/miss, KiB downloaded)")
+    for label, elapsed, requests, sent, stats in rows:
+        endpoints = ', '.join(f"{name} {s['fresh']}/{s['revalidated']}/{s['miss']} {s['bytes_downloaded'] / 1024:.0f}"
+                              for name, s in stats.items())
+        print(f"{label:<12} {elapsed:6.2f}s {requests:>9} {sent / 1024:8.0f}KiB  {endpoints}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Refresh cost: full history re-download vs incremental ingestion
+
+Against benchmarks/stub_fpl_server.py with a season finished through
+--round, collects a full store once, then times each refresh scenario with
+both paths:
+
+  - nothing new:      no fixture has finished since the last refresh
+  - partial gameweek: the first few fixtures of the next round have finished
+  - full gameweek:    the whole next round has finished
+
+The collector runs at its default concurrency and rate limit, as on the API.
+
+Usage: python benchmarks/bench_incremental_ingest.py [--players 300] [--round 20] [--latency 0.1]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from stub_fpl_server import StubFPLServer
+from synthetic import DATA_DIR
+from data_collector import SimpleFPLCollector
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=300)
+    parser.add_argument('--round', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.1)
+    args = parser.parse_args()
+
+    server = StubFPLServer(latency=args.latency, finished_round=args.round)
+    base_url = server.start()
+    full_dir, incremental_dir = tempfile.mkdtemp(prefix='fpl_full_'), tempfile.mkdtemp(prefix='fpl_incr_')
+    players = pd.read_csv(os.path.join(DATA_DIR, 'players.csv'))
+    players['minutes'] = 90
+    for data_dir in (full_dir, incremental_dir):
+        players.to_csv(os.path.join(data_dir, 'players.csv'), index=False)
+
+    def collector(data_dir):
+        c = SimpleFPLCollector(base_url, data_dir=data_dir)
+        # Always revalidate, so the cache never hides what the stub changed
+        c.cache.ttl_seconds = 0
+        return c
+
+    try:
+        start = time.perf_counter()
+        collector(incremental_dir).get_player_history(max_players=args.players)
+        print(f"initial full collection {time.perf_counter() - start:6.2f}s\n")
+
+        scenarios = [('nothing new', args.round, 0), ('partial gameweek', args.round, 3),
+                     ('full gameweek', args.round + 1, 0)]
+        rows = []
+        for label, finished_round, extra in scenarios:
+            server.set_finished_round(finished_round, extra)
+
+            before = server.requests
+            start = time.perf_counter()
+            collector(full_dir).get_fixtures()
+            full = collector(full_dir).get_player_history(max_players=args.players)
+            full_time, full_requests = time.perf_counter() - start, server.requests - before
+
+            before = server.requests
+            start = time.perf_counter()
+            incremental = collector(incremental_dir).update_player_history(max_players=args.players)
+            incr_time, incr_requests = time.perf_counter() - start, server.requests - before
+
+            key = ['player_id', 'fixture']
+            same = full.sort_values(key, ignore_index=True)[key].equals(incremental.sort_values(key, ignore_index=True)[key])
+            rows.append((label, full_time, full_requests, incr_time, incr_requests, len(incremental), same))
+    finally:
+        server.stop()
+        shutil.rmtree(full_dir)
+        shutil.rmtree(incremental_dir)
+
+    print(f"\n{'scenario':<18} {'full':>8} {'reqs':>5} {'incremental':>12} {'reqs':>5} {'rows':>7}  matches full")
+    for label, full_time, full_requests, incr_time, incr_requests, n_rows, same in rows:
+        print(f"{label:<18} {full_time:7.2f}s {full_requests:>5} {incr_time:11.2f}s {incr_requests:>5} {n_rows:>7}  {same}")
+
+
+if __name__ == '__main__':
+    main()
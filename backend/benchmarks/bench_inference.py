@@ -0,0 +1,92 @@
+"""Predictor inference: sklearn through a DataFrame vs compiled array forests
+
+Fits a forest per position on one synthetic season, then predicts 700
+players (a real refresh) and 100k synthetic rows four ways: the old path
+(a feature DataFrame handed to each sklearn forest), sklearn on the float32
+matrix, the numpy walk over the compiled forests alone, and
+CompiledPredictor, which hands positions with more than MAX_COMPILED_ROWS
+rows to sklearn. The matrix is preallocated and refilled in place. Reports
+the median time of each and the largest difference from sklearn.
+
+Usage: python benchmarks/bench_inference.py [--rows 700 100000] [--repeat 5] [--trees 100]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import synthetic_seasons
+from predictor import SimplePredictor
+from inference import CompiledPredictor, MAX_COMPILED_ROWS
+from training import PARAM_GRID, make_model
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[700, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--trees', type=int, default=100)
+    args = parser.parse_args()
+
+    players, gameweeks, fixtures = synthetic_seasons(700, 1)
+    predictor = SimplePredictor()
+    training = predictor.training_features(players, gameweeks, fixtures)
+    predictor.feature_cols = ['now_cost', 'element_type',
+                              *[c for c in training.columns if c.endswith(('_3', '_5', '_10')) or c in (
+                                  'appearances', 'fixtures', 'difficulty')]]
+    params = {**PARAM_GRID[-1], 'n_estimators': args.trees}
+    X_train = predictor.feature_matrix(training)
+    predictor.models = {
+        element_type: make_model(params).fit(X_train[rows], training['target'].to_numpy()[rows])
+        for element_type in (1, 2, 3, 4)
+        for rows in [training['element_type'].to_numpy() == element_type]
+    }
+    compile_ms, compiled = timed(lambda: CompiledPredictor(predictor.models), 1)
+    walk_only = CompiledPredictor(predictor.models, max_compiled_rows=10 ** 9)
+    size = sum(forest.nbytes for forest in {id(f): f for f in compiled.forests.values()}.values())
+    print(f"{len(predictor.models)} forests x {args.trees} trees, compiled in {compile_ms:.0f}ms to {size / 2 ** 20:.1f}MiB\n")
+
+    print(f"{'rows':>8} {'DataFrame+sklearn':>18} {'matrix+sklearn':>15} {'numpy walk':>11} "
+          f"{f'dispatch@{MAX_COMPILED_ROWS}':>14} {'speed-up':>9} {'max diff':>9}")
+    rng = np.random.default_rng(0)
+    for n_rows in args.rows:
+        frame = training.iloc[rng.integers(0, len(training), size=n_rows)].reset_index(drop=True)
+        positions = frame['element_type'].to_numpy()
+        X = predictor.feature_matrix(frame)
+
+        def dataframe_path():
+            preds = np.zeros(n_rows)
+            for element_type, model in predictor.models.items():
+                rows = (frame['element_type'] == element_type).to_numpy()
+                preds[rows] = model.predict(frame.loc[rows, predictor.feature_cols].fillna(0).to_numpy(dtype=np.float32))
+            return preds
+
+        def matrix_path():
+            preds = np.zeros(n_rows)
+            for element_type, model in predictor.models.items():
+                rows = positions == element_type
+                preds[rows] = model.predict(X[rows])
+            return preds
+
+        frame_ms, expected = timed(dataframe_path, args.repeat)
+        matrix_ms, _ = timed(matrix_path, args.repeat)
+        out = np.zeros(n_rows)
+        walk_ms, walked = timed(lambda: walk_only.predict(predictor.feature_matrix(frame, X), positions, out.copy()),
+                                args.repeat)
+        compiled_ms, got = timed(lambda: compiled.predict(predictor.feature_matrix(frame, X), positions, out), args.repeat)
+        diff = max(np.abs(got - expected).max(), np.abs(walked - expected).max())
+        print(f"{n_rows:>8} {frame_ms:16.1f}ms {matrix_ms:13.1f}ms {walk_ms:9.1f}ms {compiled_ms:12.1f}ms "
+              f"{frame_ms / compiled_ms:8.1f}x {diff:9.1e}")
+
+
+if __name__ == '__main__':
+    main()
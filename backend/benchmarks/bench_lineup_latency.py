@@ -0,0 +1,67 @@
+"""Latency cost of picking the XI, bench order and captain inside the squad MILP
+
+Replays one request stream (budgets, exclusions and formation preferences)
+through a squad-only SquadModel and through the lineup model, and checks the
+lineup model's p95 against a latency budget. Exits non-zero when it is over.
+
+Usage: python benchmarks/bench_lineup_latency.py [--requests 100] [--p95-budget-ms 1000] [--synthetic 700]
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from bench_optimize_latency import request_stream
+from synthetic import real_players, synthetic_players
+from optimizer import FPLOptimizer, SquadModel, highspy
+
+FORMATIONS = [None, None, '3-4-3', '3-5-2', '4-4-2', '4-3-3', '5-3-2']
+
+
+def run(label, model, requests, formations):
+    latencies = []
+    for (budget, excluded), formation in zip(requests, formations):
+        start = time.perf_counter()
+        result = model.solve(budget, excluded, formation_preference=formation)
+        latencies.append(time.perf_counter() - start)
+        assert result['status'] == 'Optimal', result['status']
+    ms = np.array(latencies) * 1000
+    p95 = np.percentile(ms, 95)
+    print(f"{label:<22} p50 {np.percentile(ms, 50):7.1f}ms  p95 {p95:7.1f}ms  max {ms.max():7.1f}ms")
+    return p95
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--p95-budget-ms', type=float, default=1000.0)
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help="use N synthetic players instead of data/players.csv")
+    args = parser.parse_args()
+
+    players, predictions = synthetic_players(args.synthetic) if args.synthetic else real_players()
+    requests = request_stream(players, predictions, args.requests)
+    formations = np.random.default_rng(1).choice(len(FORMATIONS), size=len(requests))
+    formations = [FORMATIONS[i] for i in formations]
+    print(f"{len(predictions)} players, {len(requests)} requests, p95 budget {args.p95_budget_ms:.0f}ms")
+
+    solvers = ['cbc'] + (['highs'] if highspy is not None else [])
+    p95 = {}
+    for solver in solvers:
+        squad_only = FPLOptimizer(pick_lineup=False)
+        run(f'{solver} squad only', SquadModel(squad_only, squad_only.prepare(players, predictions), solver),
+            requests, [None] * len(requests))
+        lineup = FPLOptimizer()
+        p95[solver] = run(f'{solver} squad + lineup', SquadModel(lineup, lineup.prepare(players, predictions), solver),
+                          requests, formations)
+
+    # SquadModel defaults to the last backend listed, so that is the one the API serves with
+    served = solvers[-1]
+    verdict = 'PASS' if p95[served] <= args.p95_budget_ms else 'FAIL'
+    print(f"{verdict}: {served} lineup p95 {p95[served]:.1f}ms vs budget {args.p95_budget_ms:.0f}ms")
+    sys.exit(verdict != 'PASS')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Model build vs CBC solve time for FPLOptimizer at several pool sizes
+
+Usage: python benchmarks/bench_model_build.py [--sizes 700 5000 50000] [--repeat 3]
+"""
+import argparse
+import time
+
+import numpy as np
+import pulp
+
+from synthetic import synthetic_players
+from optimizer import FPLOptimizer
+
+
+def legacy_build(optimizer, players_df, predictions):
+    """The original per-player DataFrame scan, kept here for comparison"""
+    available_players = players_df[players_df['id'].isin(predictions.keys())].copy()
+    available_players['predicted_points'] = available_players['id'].map(predictions)
+    available_players['price'] = available_players['now_cost'] / 10
+
+    prob = pulp.LpProblem("FPL_Team", pulp.LpMaximize)
+    player_vars = {}
+    for idx, row in available_players.iterrows():
+        player_vars[row['id']] = pulp.LpVariable(f"player_{row['id']}", cat='Binary')
+    prob += pulp.lpSum([
+        available_players[available_players['id'] == pid]['predicted_points'].iloc[0] * var
+        for pid, var in player_vars.items()
+    ])
+    prob += pulp.lpSum([
+        available_players[available_players['id'] == pid]['price'].iloc[0] * var
+        for pid, var in player_vars.items()
+    ]) <= optimizer.budget
+    for position, count in optimizer.formation.items():
+        position_players = available_players[available_players['position_name'] == position]['id'].tolist()
+        prob += pulp.lpSum([player_vars[pid] for pid in position_players if pid in player_vars]) == count
+    for team in available_players['team'].unique():
+        team_players = available_players[available_players['team'] == team]['id'].tolist()
+        prob += pulp.lpSum([player_vars[pid] for pid in team_players if pid in player_vars]) <= optimizer.max_per_team
+    return prob
+
+
+def timed(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[700, 5000, 50000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-max', type=int, default=5000,
+                        help="skip the O(n^2) legacy build above this many players")
+    args = parser.parse_args()
+
+    optimizer = FPLOptimizer()
+    print(f"{'players':>8} {'legacy build':>13} {'arrays':>9} {'build':>9} {'solve':>9} {'extract':>9}")
+    for n in args.sizes:
+        players, predictions = synthetic_players(n)
+
+        if n <= args.legacy_max:
+            legacy, _ = timed(lambda: legacy_build(optimizer, players, predictions), 1)
+            legacy = f"{legacy * 1000:11.1f}ms"
+        else:
+            legacy = f"{'skipped':>13}"
+
+        prep, arrays = timed(lambda: optimizer.prepare(players, predictions), args.repeat)
+        build, (prob, player_vars) = timed(lambda: optimizer.build_model(arrays), args.repeat)
+
+        start = time.perf_counter()
+        optimizer.solve_model(prob)
+        solve = time.perf_counter() - start
+
+        def extract():
+            values = np.array([var.value() or 0 for var in player_vars])
+            return optimizer.extract_solution(arrays, values, pulp.LpStatus[prob.status])
+        extract_time, result = timed(extract, args.repeat)
+
+        print(f"{n:>8} {legacy} {prep * 1000:7.1f}ms {build * 1000:7.1f}ms "
+              f"{solve * 1000:7.1f}ms {extract_time * 1000:7.1f}ms   "
+              f"({result['status']}, {result['total_predicted_points']} pts)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""/api/optimize latency: cold rebuild + CBC per request vs the persistent SquadModel
+
+Replays the same stream of requests (budget and exclusions vary) through the
+old per-request path and through SquadModel, and prints p50/p95 latency.
+
+Usage: python benchmarks/bench_optimize_latency.py [--requests 200] [--synthetic 700]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import real_players, synthetic_players
+from optimizer import FPLOptimizer, SquadModel, highspy
+
+
+def request_stream(players, predictions, n, seed=0):
+    """Budgets around 100.0 and a few excluded premium players per request"""
+    rng = np.random.default_rng(seed)
+    premiums = sorted(predictions, key=predictions.get, reverse=True)[:30]
+    requests = []
+    for _ in range(n):
+        budget = float(rng.choice(np.arange(95.0, 105.5, 0.5)))
+        excluded = rng.choice(premiums, size=rng.integers(0, 4), replace=False).tolist()
+        requests.append((budget, excluded))
+    return requests
+
+
+def cold(optimizer, players, predictions, budget, excluded):
+    """What /api/optimize did before: filter the dict, rebuild, spawn CBC"""
+    filtered = {pid: score for pid, score in predictions.items() if pid not in excluded}
+    optimizer.budget = budget
+    return optimizer.optimize_team(players, filtered, solver='cbc')
+
+
+def run(label, fn, requests):
+    latencies = []
+    for budget, excluded in requests:
+        start = time.perf_counter()
+        result = fn(budget, excluded)
+        latencies.append(time.perf_counter() - start)
+        assert result['status'] == 'Optimal', result['status']
+    ms = np.array(latencies) * 1000
+    print(f"{label:<24} p50 {np.percentile(ms, 50):7.1f}ms  p95 {np.percentile(ms, 95):7.1f}ms  "
+          f"mean {ms.mean():7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help="use N synthetic players instead of data/players.csv")
+    args = parser.parse_args()
+
+    players, predictions = synthetic_players(args.synthetic) if args.synthetic else real_players()
+    requests = request_stream(players, predictions, args.requests)
+    print(f"{len(predictions)} players, {len(requests)} requests")
+
+    run('cold (rebuild + CBC)', lambda b, e: cold(FPLOptimizer(), players, predictions, b, e), requests)
+
+    optimizer = FPLOptimizer()
+    arrays = optimizer.prepare(players, predictions)
+    start = time.perf_counter()
+    model = SquadModel(optimizer, arrays, solver='cbc')
+    print(f"{'':<24} (cbc model built once in {(time.perf_counter() - start) * 1000:.1f}ms)")
+    run('persistent cbc', model.solve, requests)
+
+    if highspy is not None:
+        start = time.perf_counter()
+        model = SquadModel(optimizer, arrays, solver='highs')
+        print(f"{'':<24} (highs model built once in {(time.perf_counter() - start) * 1000:.1f}ms)")
+        run('persistent highs', model.solve, requests)
+    else:
+        print("highspy not installed, skipping in-process HiGHS")
+
+
+if __name__ == '__main__':
+    main()
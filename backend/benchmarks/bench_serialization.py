@@ -0,0 +1,185 @@
+"""Per-endpoint serialization cost: pandas/Pydantic/jsonable_encoder vs the orjson byte path
+
+On the real players.csv, times what each read endpoint and /api/optimize do
+to turn data into response bytes:
+
+  - before: the handler's DataFrame work, to_dict('records'), FastAPI's
+    jsonable_encoder and json.dumps (/api/players used to fail on NaN; here
+    it is encoded with allow_nan so its cost can still be measured), and
+    for /api/optimize a Pydantic Player per squad member, response_model
+    validation and the same encoder
+  - after: ServingTable slices and orjson-encoded dicts, with the one-off
+    table build reported separately
+
+Then compares gzip and brotli on the largest bodies.
+
+Usage: python benchmarks/bench_serialization.py [--repeat 50] [--k 5]
+"""
+import argparse
+import gzip
+import json
+import time
+from typing import List, Optional
+
+import brotli
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from synthetic import real_players
+from encoding import Compressor, dumps
+from optimizer import FPLOptimizer, SquadModel
+from serving_table import ServingTable
+
+
+class Player(BaseModel):
+    id: int
+    name: str
+    position: str
+    team: str
+    price: float
+    predicted_points: float
+    is_starter: Optional[bool] = None
+    is_captain: Optional[bool] = None
+    is_vice_captain: Optional[bool] = None
+    bench_order: Optional[int] = None
+
+
+class TeamResponse(BaseModel):
+    status: str
+    players: List[Player]
+    total_cost: float
+    total_predicted_points: float
+    remaining_budget: float
+    bench_predicted_points: Optional[float] = None
+    formation: Optional[str] = None
+    captain_id: Optional[int] = None
+    vice_captain_id: Optional[int] = None
+    solve_time: Optional[float] = None
+    rank: Optional[int] = None
+    alternatives: Optional[List['TeamResponse']] = None
+
+
+def encode_legacy(content) -> bytes:
+    """What FastAPI did with a returned dict/list: jsonable_encoder, then JSONResponse.render"""
+    return json.dumps(jsonable_encoder(content), allow_nan=True, separators=(',', ':')).encode()
+
+
+def legacy_players(players, predictions):
+    df = players.copy()
+    df['predicted_points'] = df['id'].map(lambda x: predictions.get(x, 0))
+    df['value'] = (df['predicted_points'] / (df['now_cost'] / 10)).round(2)
+    df['prediction_confidence'] = df['total_points'].apply(lambda x: min(1.0, x / 50.0)).round(2)
+    return encode_legacy(df.to_dict('records'))
+
+
+def legacy_position_stats(players, predictions):
+    df = players.copy()
+    df['predicted_points'] = df['id'].map(lambda x: predictions.get(x, 0))
+    df['price'] = df['now_cost'] / 10
+    stats = df.groupby('position_name').agg({
+        'predicted_points': ['mean', 'max', 'std', 'count'],
+        'price': ['mean', 'max', 'min'],
+        'total_points': ['mean', 'max'],
+        'form': 'mean',
+        'selected_by_percent': 'mean'
+    }).round(2)
+    stats.columns = ['_'.join(col).strip() for col in stats.columns]
+    result = stats.reset_index()
+    result['avg_value'] = (result['predicted_points_mean'] / result['price_mean']).round(2)
+    return encode_legacy(result.to_dict('records'))
+
+
+def legacy_top_players(players, predictions, position='MID', limit=10):
+    df = players[players['position_name'] == position].copy()
+    df['predicted_points'] = df['id'].map(lambda x: predictions.get(x, 0))
+    df['value'] = (df['predicted_points'] / (df['now_cost'] / 10)).round(2)
+    df['form_score'] = (df['form'].astype(float) * 0.3 + df['predicted_points'] * 0.7).round(2)
+    top = df.nlargest(limit, 'predicted_points')
+    return encode_legacy(top[['id', 'web_name', 'team', 'now_cost', 'total_points',
+                              'predicted_points', 'value', 'form', 'form_score']].to_dict('records'))
+
+
+def team_fields(result):
+    return {key: result.get(key) for key in ['status', 'total_cost', 'total_predicted_points', 'remaining_budget',
+                                             'bench_predicted_points', 'formation', 'captain_id',
+                                             'vice_captain_id', 'solve_time', 'rank']}
+
+
+def legacy_optimize(solutions):
+    teams = []
+    for result in solutions:
+        players = [Player(**{**p, 'team': str(p['team'])}) for p in result['players']]
+        teams.append(TeamResponse(players=players, **team_fields(result)))
+    response = teams[0]
+    response.alternatives = teams[1:]
+    # response_model validation, then the generic encoder
+    return encode_legacy(TeamResponse.model_validate(response.model_dump()))
+
+
+def orjson_optimize(solutions):
+    fields = list(Player.model_fields)
+    teams = [{**team_fields(result), 'players': [{f: p.get(f) for f in fields} | {'team': str(p['team'])}
+                                                 for p in result['players']],
+              'alternatives': None} for result in solutions]
+    teams[0]['alternatives'] = teams[1:]
+    return dumps(teams[0])
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = fn()
+    return (time.perf_counter() - start) / repeat * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--k', type=int, default=5, help="squads in the /api/optimize response")
+    args = parser.parse_args()
+
+    players, predictions = real_players()
+    start = time.perf_counter()
+    table = ServingTable(players, predictions, 'bench')
+    print(f"{len(players)} players x {len(players.columns)} columns, "
+          f"ServingTable build {(time.perf_counter() - start) * 1000:.1f}ms (once per data version)\n")
+
+    optimizer = FPLOptimizer()
+    solutions = SquadModel(optimizer, optimizer.prepare(players, predictions)).solve_top_k(args.k, 100.0, [])['solutions']
+
+    cases = [
+        ('/api/players (all)', lambda: legacy_players(players, predictions),
+         lambda: table.players_page(fields=['all'], limit=1000)),
+        ('/api/players (default)', None, lambda: table.players_page()),
+        ('/api/analytics/position-stats', lambda: legacy_position_stats(players, predictions),
+         lambda: table.position_stats_json),
+        ('/api/top-players/MID', lambda: legacy_top_players(players, predictions),
+         lambda: table.top_players_json('MID', 10)),
+        (f'/api/optimize (k={args.k})', lambda: legacy_optimize(solutions), lambda: orjson_optimize(solutions)),
+    ]
+    print(f"{'endpoint':<32} {'before':>10} {'bytes':>9} {'after':>10} {'bytes':>9} {'speedup':>8}")
+    bodies = {}
+    for name, before, after in cases:
+        after_ms, after_bytes = timed(after, args.repeat)
+        bodies[name] = after()
+        if before is None:
+            print(f"{name:<32} {'-':>10} {'-':>9} {after_ms:8.3f}ms {after_bytes:9d}")
+            continue
+        before_ms, before_bytes = timed(before, args.repeat)
+        print(f"{name:<32} {before_ms:8.3f}ms {before_bytes:9d} {after_ms:8.3f}ms {after_bytes:9d} "
+              f"{before_ms / after_ms:7.0f}x")
+
+    compressor = Compressor()
+    print(f"\n{'body':<32} {'encoding':<10} {'bytes':>9} {'ratio':>7} {'time':>10}")
+    for name in ['/api/players (all)', '/api/players (default)', f'/api/optimize (k={args.k})']:
+        body = bodies[name]
+        for label, fn in [('gzip-6', lambda b: gzip.compress(b, compresslevel=6, mtime=0)),
+                          (f'br-{compressor.brotli_quality}', lambda b: brotli.compress(b, quality=compressor.brotli_quality)),
+                          ('br-11', lambda b: brotli.compress(b, quality=11))]:
+            ms, size = timed(lambda: fn(body), max(1, args.repeat // 10))
+            print(f"{name:<32} {label:<10} {size:9d} {len(body) / size:6.1f}x {ms:8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
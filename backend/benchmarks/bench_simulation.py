@@ -0,0 +1,94 @@
+"""Monte Carlo squad simulation: scenarios per second and the cost of risk-aware ranking
+
+Times Simulator.simulate on the optimal squad for a range of scenario counts,
+batch evaluation of many squads under common random numbers, and
+SquadModel.solve_risk_adjusted, comparing its squads' risk scores with the
+score of the squad that is optimal for predicted points. Outcome parameters are fit from a synthetic season, with a share
+of players flagged doubtful so availability matters.
+
+Usage: python benchmarks/bench_simulation.py [--scenarios 10000 100000 1000000] [--squads 1000] [--batch-scenarios 10000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import synthetic_seasons
+from optimizer import FPLOptimizer, SquadModel
+from simulation import Simulator, fit_outcomes, risk_score
+
+
+def timed(fn, repeat=3):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def random_lineups(simulator, base, n, rng):
+    """Lineups made from base by swapping each outfield starter for a same-position player with probability 0.2"""
+    codes = simulator.codes
+    by_code = {code: np.flatnonzero(codes == code) for code in (1, 2, 3)}
+    lineups = np.repeat(base[None, :], n, axis=0)
+    for column in range(1, 11):
+        swap = rng.random(n) < 0.2
+        pool = by_code[codes[base[column]]]
+        lineups[swap, column] = rng.choice(pool, size=int(swap.sum()))
+    return lineups
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=700)
+    parser.add_argument('--scenarios', type=int, nargs='*', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--squads', type=int, default=1000)
+    parser.add_argument('--batch-scenarios', type=int, default=10_000)
+    parser.add_argument('--candidates', type=int, default=5)
+    args = parser.parse_args()
+
+    players, gameweeks, _ = synthetic_seasons(args.players)
+    rng = np.random.default_rng(0)
+    players['status'] = np.where(rng.random(len(players)) < 0.1, 'd', 'a')
+    players['chance_of_playing_next_round'] = np.where(players['status'] == 'd', 50.0, np.nan)
+    points = np.clip(players['now_cost'] / 20 + rng.normal(0, 1.5, size=len(players)), 0.5, 12)
+    predictions = dict(zip(players['id'].tolist(), points.tolist()))
+
+    start = time.perf_counter()
+    outcomes = fit_outcomes(players, gameweeks)
+    print(f"Fit outcomes for {len(outcomes)} players from {len(gameweeks)} gameweek rows in "
+          f"{(time.perf_counter() - start) * 1000:.1f}ms (dispersion "
+          f"{', '.join(f'{d:.2f}' for d in sorted(outcomes['dispersion'].unique()))})")
+
+    optimizer = FPLOptimizer()
+    arrays = optimizer.prepare(players, predictions, outcomes)
+    model = SquadModel(optimizer, arrays)
+    best = model.solve(100.0)
+    simulator = Simulator(arrays)
+    print(f"\nOptimal squad: {best['total_predicted_points']} predicted points")
+    print(f"{'scenarios':>10} {'seconds':>9} {'scenarios/s':>12} {'mean':>7} {'std':>6} {'p10':>5} {'p90':>5}")
+    for n in args.scenarios:
+        seconds, stats = timed(lambda: simulator.simulate(best, n))
+        print(f"{n:>10} {seconds:9.3f} {n / seconds:12,.0f} {stats['mean']:7.2f} {stats['std']:6.2f} "
+              f"{stats['quantiles']['p10']:5.0f} {stats['quantiles']['p90']:5.0f}")
+
+    lineups = random_lineups(simulator, simulator.lineup(best), args.squads, rng)
+    seconds, stats = timed(lambda: simulator.evaluate(lineups, args.batch_scenarios), repeat=1)
+    print(f"\nBatch: {args.squads} squads x {args.batch_scenarios} scenarios in {seconds:.2f}s "
+          f"({args.squads * args.batch_scenarios / seconds:,.0f} squad-scenarios/s, "
+          f"{len(np.unique(lineups))} distinct players)")
+
+    baseline = simulator.evaluate(simulator.lineup(best)[None, :], 20_000, (0.1, 0.2, 0.5, 0.9))
+    print()
+    for mode in ('std', 'quantile'):
+        seconds, result = timed(lambda: model.solve_risk_adjusted(3, 100.0, risk_mode=mode,
+                                                                  candidates=args.candidates), repeat=1)
+        print(f"points-optimal squad {mode} score {risk_score(baseline, mode)[0]:.2f}")
+        picks = ', '.join(f"#{s['risk']['candidate_rank']} score {s['risk']['score']:.2f} "
+                          f"({s['total_predicted_points']} predicted)" for s in result['solutions'])
+        print(f"solve_risk_adjusted {mode:<8} {seconds:.2f}s (simulate {result['timings']['simulate']:.3f}s): {picks}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Solver backends: latency and optimality gap on the same request stream
+
+Replays /api/optimize-style requests (budget and a few excluded premiums
+vary) through a persistent SquadModel per backend. HiGHS is the reference:
+each backend's lineup objective is compared with the HiGHS optimum of the
+same request. Local search runs at several time budgets to show the
+anytime trade-off. Solves that hit --time-limit count as timeouts.
+
+Usage: python benchmarks/bench_solver_backends.py [--requests 20] [--synthetic 700] [--time-limit 10]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import real_players, synthetic_players
+from bench_budget_frontier import lineup_objective
+from bench_optimize_latency import request_stream
+from optimizer import FPLOptimizer, SOLVED, SquadModel, available_solvers
+
+LOCAL_BUDGETS = (0.05, 0.2, 1.0)
+
+
+def run(model, requests, time_limit):
+    latencies, objectives = [], []
+    for budget, excluded in requests:
+        start = time.perf_counter()
+        result = model.solve(budget, excluded, time_limit=time_limit)
+        latencies.append(time.perf_counter() - start)
+        objectives.append(lineup_objective(model.optimizer, result) if result['status'] in SOLVED else None)
+    return np.array(latencies) * 1000, objectives
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--synthetic', type=int, default=0, help="use N synthetic players instead of players.csv")
+    parser.add_argument('--time-limit', type=float, default=10.0, help="per-solve limit for the exact backends")
+    args = parser.parse_args()
+
+    players, predictions = synthetic_players(args.synthetic) if args.synthetic else real_players()
+    optimizer = FPLOptimizer()
+    arrays = optimizer.prepare(players, predictions)
+    requests = request_stream(players, predictions, args.requests)
+    available = available_solvers()
+    print(f"{len(arrays)} players, {len(requests)} requests, backends available: {', '.join(available)}\n")
+
+    _, reference = run(SquadModel(optimizer, arrays, 'highs'), requests, None)
+    backends = [(solver, SquadModel(optimizer, arrays, solver), args.time_limit)
+                for solver in ('highs', 'cbc', 'bnb') if solver in available]
+    backends += [(f'local {seconds}s', SquadModel(optimizer, arrays, 'local', latency_target=seconds), None)
+                 for seconds in LOCAL_BUDGETS]
+
+    print(f"{'backend':<12} {'p50':>9} {'p95':>9} {'max':>9} {'optimal':>8} {'timeouts':>8} {'mean gap':>9} {'max gap':>8}")
+    for label, model, time_limit in backends:
+        ms, objectives = run(model, requests, time_limit)
+        gaps = [max(best - found, 0.0) / best * 100 for best, found in zip(reference, objectives) if found is not None]
+        optimal = sum(gap <= 1e-6 for gap in gaps)
+        timeouts = objectives.count(None)
+        print(f"{label:<12} {np.percentile(ms, 50):7.1f}ms {np.percentile(ms, 95):7.1f}ms {ms.max():7.1f}ms "
+              f"{optimal:>4}/{len(requests):<3} {timeouts:>8} "
+              f"{np.mean(gaps) if gaps else float('nan'):8.3f}% {max(gaps, default=float('nan')):7.3f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Top-K alternatives: incremental no-good cuts on one model vs K cold solves
+
+The cold path is what a client does today: K separate /api/optimize calls,
+each rebuilding the problem (with the previous squads cut off) and starting
+CBC from scratch. The incremental path is SquadModel.solve_top_k on a model
+built once. Prints the solve time of every solution on both paths.
+
+Usage: python benchmarks/bench_top_k.py [--k 10] [--min-distance 1] [--synthetic 700]
+"""
+import argparse
+import time
+
+import numpy as np
+import pulp
+
+from synthetic import real_players, synthetic_players
+from optimizer import FPLOptimizer, SquadModel, highspy
+
+
+def cold_top_k(optimizer, arrays, k, min_distance):
+    squad_size = sum(optimizer.formation.values())
+    squads, times, points = [], [], []
+    for _ in range(k):
+        start = time.perf_counter()
+        prob, variables = optimizer.build_model(arrays)
+        for r, squad in enumerate(squads):
+            prob += pulp.LpConstraint(pulp.LpAffineExpression((variables[i], 1) for i in squad),
+                                      pulp.LpConstraintLE, f"nogood_{r}", squad_size - min_distance)
+        optimizer.solve_model(prob)
+        times.append(time.perf_counter() - start)
+        if prob.status != pulp.LpStatusOptimal:
+            break
+        values = np.array([var.value() or 0 for var in variables])
+        squads.append(np.flatnonzero(values[:len(arrays)] > 0.5).tolist())
+        points.append(optimizer.extract_solution(arrays, values, 'Optimal')['total_predicted_points'])
+    return times, points
+
+
+def report(label, times, points):
+    ms = np.array(times) * 1000
+    print(f"{label:<22} total {ms.sum():8.1f}ms  first {ms[0]:7.1f}ms  rest mean {ms[1:].mean() if len(ms) > 1 else 0:7.1f}ms")
+    print(f"{'':<22} per solution: {' '.join(f'{t:.0f}' for t in ms)}")
+    print(f"{'':<22} points:       {' '.join(f'{p:.1f}' for p in points)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--min-distance', type=int, default=1)
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help="use N synthetic players instead of data/players.csv")
+    args = parser.parse_args()
+
+    players, predictions = synthetic_players(args.synthetic) if args.synthetic else real_players()
+    optimizer = FPLOptimizer()
+    arrays = optimizer.prepare(players, predictions)
+    print(f"{len(arrays)} players, k={args.k}, min distance {args.min_distance}")
+
+    report('cold (rebuild + CBC)', *cold_top_k(optimizer, arrays, args.k, args.min_distance))
+    for solver in ['cbc'] + (['highs'] if highspy is not None else []):
+        model = SquadModel(optimizer, arrays, solver)
+        result = model.solve_top_k(args.k, min_distance=args.min_distance)
+        report(f'incremental {solver}', [s['solve_time'] for s in result['solutions']],
+               [s['total_predicted_points'] for s in result['solutions']])
+
+
+if __name__ == '__main__':
+    main()
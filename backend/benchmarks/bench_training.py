@@ -0,0 +1,54 @@
+"""Position-model training: wall-clock, workers and memory under the ceiling
+
+Builds per-round features for synthetic seasons and fits the four
+position models with PositionTrainer at each worker count and memory
+ceiling, reporting wall-clock time, the workers and max_samples the
+ceiling allowed, the estimated peak the fit adds and the peak RSS of the
+processes that ran it, and walk-forward CV MAE against predicting the
+training mean.
+
+Usage: python benchmarks/bench_training.py [--players 700] [--seasons 1 3] [--workers 1 4] [--memory-mb 1024 16]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import synthetic_seasons
+from predictor import SimplePredictor
+from training import PositionTrainer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=700)
+    parser.add_argument('--seasons', type=int, nargs='+', default=[1, 3])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--memory-mb', type=float, nargs='+', default=[1024.0, 16.0])
+    args = parser.parse_args()
+
+    print(f"{'seasons':>7} {'rows':>7} {'workers':>8} {'ceiling':>8} {'wall':>8} {'max_samples':>12} "
+          f"{'est peak':>9} {'fit rss':>9} {'cv mae':>7} {'baseline':>8}")
+    for seasons in args.seasons:
+        players, gameweeks, fixtures = synthetic_seasons(args.players, seasons)
+        predictor = SimplePredictor()
+        features = predictor.training_features(players, gameweeks, fixtures)
+        feature_cols = ['now_cost', 'element_type', *[c for c in features.columns
+                                                      if c not in ('player_id', 'round', 'points', 'target',
+                                                                   'now_cost', 'element_type')]]
+        for memory_mb in args.memory_mb:
+            for workers in args.workers:
+                trainer = PositionTrainer(workers=workers, memory_limit_mb=memory_mb)
+                start = time.perf_counter()
+                _, metrics = trainer.fit(features, feature_cols)
+                wall = time.perf_counter() - start
+                positions = metrics['positions'].values()
+                print(f"{seasons:>7} {len(features):>7} {metrics['workers']:>3}/{workers:<4} {memory_mb:6.0f}MB "
+                      f"{wall:7.1f}s {min(p['max_samples'] for p in positions):12.3f} "
+                      f"{metrics['estimated_peak_mb']:7.1f}MB {max(p.get('fit_rss_mb', 0) for p in positions):7.1f}MB "
+                      f"{np.mean([p['cv_mae'] for p in positions]):7.3f} "
+                      f"{np.mean([p['baseline_mae'] for p in positions]):8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Transfer planner solve time as the horizon grows from 1 to 8 gameweeks
+
+Starts from the optimal 98.0 squad on players.csv with 2.0 in the bank and
+plans against fixture-scaled predictions from data/fixtures.csv.
+
+Usage: python benchmarks/bench_transfer_planner.py [--horizons 1 2 3 4 5 6 7 8] [--time-limit 60]
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from synthetic import DATA_DIR, real_players
+from optimizer import FPLOptimizer, SquadModel
+from features import next_gameweek
+from planner import TransferPlanner
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--horizons', type=int, nargs='+', default=list(range(1, 9)))
+    parser.add_argument('--candidates', type=int, default=30, help="candidates per position")
+    parser.add_argument('--free-transfers', type=int, default=1)
+    parser.add_argument('--time-limit', type=float, default=60.0)
+    args = parser.parse_args()
+
+    players, predictions = real_players()
+    fixtures = pd.read_csv(os.path.join(DATA_DIR, 'fixtures.csv'))
+    optimizer = FPLOptimizer()
+    arrays = optimizer.prepare(players, predictions)
+    squad = [p['id'] for p in SquadModel(optimizer, arrays).solve(98.0)['players']]
+    planner = TransferPlanner(optimizer, candidates_per_position=args.candidates, time_limit=args.time_limit)
+    start_gameweek = next_gameweek(fixtures)
+
+    print(f"{'horizon':>7} {'cands':>6} {'vars':>6} {'rows':>6} {'build+solve':>12} {'solve':>9} "
+          f"{'status':>9} {'transfers':>9} {'hits':>5} {'net pts':>8}")
+    for horizon in args.horizons:
+        points = planner.gameweek_points(arrays, fixtures, start_gameweek, horizon)
+        start = time.perf_counter()
+        plan = planner.plan(arrays, points, squad, bank=2.0, free_transfers=args.free_transfers,
+                            start_gameweek=start_gameweek)
+        total = time.perf_counter() - start
+        transfers = sum(len(gw['transfers_in']) for gw in plan.get('gameweeks', []))
+        hits = sum(gw['hits'] for gw in plan.get('gameweeks', []))
+        print(f"{horizon:>7} {plan['candidates']:>6} {plan['variables']:>6} {plan['constraints']:>6} "
+              f"{total * 1000:10.0f}ms {plan['solve_time'] * 1000:7.0f}ms {plan['status']:>9} "
+              f"{transfers:>9} {hits:>5} {plan.get('net_points', 0):8.1f}")
+
+
+if __name__ == '__main__':
+    main()
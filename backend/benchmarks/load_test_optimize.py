@@ -0,0 +1,112 @@
+"""Throughput of the solver pool as the number of worker processes grows
+
+Pool mode (default) drives SolverPool directly with distinct requests, so the
+result cache is out of the picture. --url mode fires concurrent POSTs at a
+running server instead and also counts 429/504 responses.
+
+Usage:
+    python benchmarks/load_test_optimize.py [--workers 1 2 4] [--requests 200]
+    python benchmarks/load_test_optimize.py --url http://127.0.0.1:8000 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from synthetic import real_players, synthetic_players
+from bench_optimize_latency import request_stream
+from optimizer import FPLOptimizer
+from solver_pool import SolverPool
+
+
+async def drive_pool(pool, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(budget, excluded):
+        async with semaphore:
+            start = time.perf_counter()
+            await pool.solve(budget, excluded)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(b, e) for b, e in requests))
+    return time.perf_counter() - start, np.array(latencies) * 1000
+
+
+async def pool_mode(args):
+    players, predictions = synthetic_players(args.synthetic) if args.synthetic else real_players()
+    arrays = FPLOptimizer().prepare(players, predictions)
+    requests = request_stream(players, predictions, args.requests)
+    baseline = None
+
+    print(f"{len(arrays)} players, {len(requests)} requests, {os.cpu_count()} cores")
+    print(f"{'workers':>7} {'req/s':>8} {'speed-up':>9} {'p50':>9} {'p95':>9}")
+    for workers in args.workers:
+        pool = SolverPool(workers=workers, max_queue=len(requests))
+        pool.load_snapshot(arrays)
+        # Wait until every worker has initialised its model
+        await asyncio.gather(*(pool.solve(100.0, []) for _ in range(max(workers, 1))))
+
+        elapsed, ms = await drive_pool(pool, requests, concurrency=2 * max(workers, 1))
+        pool.shutdown()
+        throughput = len(requests) / elapsed
+        baseline = baseline or throughput
+        print(f"{workers:>7} {throughput:8.1f} {throughput / baseline:8.2f}x "
+              f"{np.percentile(ms, 50):7.1f}ms {np.percentile(ms, 95):7.1f}ms")
+
+
+def http_mode(args):
+    players, predictions = real_players()
+    requests = request_stream(players, predictions, args.requests, seed=int(time.time()))
+    statuses = Counter()
+    latencies = []
+
+    def post(item):
+        budget, excluded = item
+        body = json.dumps({'budget': budget, 'exclude_players': [int(p) for p in excluded]}).encode()
+        req = urllib.request.Request(f"{args.url}/api/optimize", data=body,
+                                     headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                statuses[resp.status] += 1
+        except urllib.error.HTTPError as e:
+            statuses[e.code] += 1
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(post, requests))
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1000
+    print(f"{len(requests)} requests, concurrency {args.concurrency}: {len(requests) / elapsed:.1f} req/s, "
+          f"p50 {np.percentile(ms, 50):.1f}ms, p95 {np.percentile(ms, 95):.1f}ms, statuses {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    cores = os.cpu_count() or 1
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1} | {2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores} | {cores}))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--synthetic', type=int, default=0)
+    parser.add_argument('--url', help="load-test a running server instead of the pool")
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    if args.url:
+        http_mode(args)
+    else:
+        asyncio.run(pool_mode(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Throughput of the read endpoints under concurrent HTTP load
+
+Starts the API with uvicorn on a free port (or targets --url), then keeps
+--concurrency client threads, each with its own keep-alive session, firing
+GETs at one endpoint for --duration seconds. Reports req/s, latency
+percentiles and status codes per endpoint.
+
+Usage: python benchmarks/load_test_read_endpoints.py [--concurrency 16] [--duration 10] [--url http://127.0.0.1:8000]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import requests
+
+ENDPOINTS = {
+    'players': '/api/players',
+    'players-all': '/api/players?fields=all&limit=1000',
+    'position-stats': '/api/analytics/position-stats',
+    'top-players': '/api/top-players/{position}?limit=10',
+}
+POSITIONS = ['GKP', 'DEF', 'MID', 'FWD']
+
+
+def start_server(**env):
+    """uvicorn on a free port, solver workers off unless env overrides it; returns (process, base url)"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    api_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api')
+    env = {**os.environ, 'FPL_SOLVER_WORKERS': '0', **env}
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--app-dir', api_dir, '--port', str(port), '--log-level', 'warning'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/api/health", timeout=1).ok:
+                return process, url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("API did not start")
+
+
+def hammer(url, path, concurrency, duration):
+    latencies, statuses, sizes = [], Counter(), []
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def client(worker):
+        session = requests.Session()
+        n = 0
+        while time.perf_counter() < stop:
+            target = url + path.format(position=POSITIONS[(worker + n) % len(POSITIONS)])
+            start = time.perf_counter()
+            try:
+                response = session.get(target, timeout=30)
+                status, size = response.status_code, len(response.content)
+            except requests.RequestException as e:
+                status, size = type(e).__name__, 0
+                session = requests.Session()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+                sizes.append(size)
+            n += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, np.array(latencies) * 1000, statuses, np.mean(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--endpoints', nargs='+', default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    args = parser.parse_args()
+
+    process, url = (None, args.url) if args.url else start_server()
+    try:
+        print(f"{url}, concurrency {args.concurrency}, {args.duration:.0f}s per endpoint")
+        print(f"{'endpoint':<16} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'bytes':>9}  statuses")
+        for name in args.endpoints:
+            elapsed, ms, statuses, size = hammer(url, ENDPOINTS[name], args.concurrency, args.duration)
+            print(f"{name:<16} {len(ms) / elapsed:8.1f} {np.percentile(ms, 50):7.1f}ms {np.percentile(ms, 95):7.1f}ms "
+                  f"{np.percentile(ms, 99):7.1f}ms {size:9.0f}  {dict(statuses)}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""Local stand-in for the FPL API, served from the files in data/
+
+Serves bootstrap-static/, fixtures/ and element-summary/{id}/ with injected
+latency and a configurable share of 503 responses, and answers conditional
+requests with 304 via ETag/Last-Modified, so the collector can be
+exercised and benchmarked without touching the real API. Players missing from
+gameweeks.csv get a copy of another player's history.
+
+With finished_round set, fixtures up to that gameweek (plus the first
+extra_fixtures of the next one) are reported finished and every player's
+history is synthesised with one row per finished fixture of their team;
+set_finished_round() advances the season in place.
+
+Usage: python benchmarks/stub_fpl_server.py [--port 8765] [--latency 0.1] [--error-rate 0.05]
+       then FPL_API_URL=http://127.0.0.1:8765/api/
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from synthetic import DATA_DIR
+
+SUMMARY_PATH = re.compile(r'^/api/element-summary/(\d+)/?$')
+
+
+def season_histories(players, fixtures, template):
+    """One history row per player per finished fixture of their team"""
+    finished = fixtures[fixtures['finished']]
+    sides = pd.concat([
+        pd.DataFrame({'team': finished['team_h'], 'fixture': finished['id'], 'opponent_team': finished['team_a'],
+                      'was_home': True, 'round': finished['event']}),
+        pd.DataFrame({'team': finished['team_a'], 'fixture': finished['id'], 'opponent_team': finished['team_h'],
+                      'was_home': False, 'round': finished['event']}),
+    ])
+    rows = players[['id', 'team']].merge(sides, on='team').sort_values(['id', 'round', 'fixture'])
+    histories = {}
+    for pid, fixture, opponent, home, gw in rows[['id', 'fixture', 'opponent_team', 'was_home', 'round']].itertuples(index=False):
+        histories.setdefault(pid, []).append({**template, 'element': pid, 'fixture': fixture,
+                                              'opponent_team': opponent, 'was_home': home, 'round': gw})
+    return histories
+
+
+def load_payloads(finished_round=None, extra_fixtures=0):
+    """JSON bodies per path, built once from data/"""
+    players = pd.read_csv(f"{DATA_DIR}/players.csv")
+    fixtures = pd.read_csv(f"{DATA_DIR}/fixtures.csv")
+    gameweeks = pd.read_csv(f"{DATA_DIR}/gameweeks.csv")
+    if finished_round is not None:
+        next_round = fixtures.index[fixtures['event'] == finished_round + 1][:extra_fixtures]
+        fixtures['finished'] = (fixtures['event'] <= finished_round) | fixtures.index.isin(next_round)
+
+    teams = [{'id': team, 'name': f"Team {team}", 'short_name': f"T{team:02d}"}
+             for team in sorted(players['team'].unique().tolist())]
+    element_types = [{'id': i, 'singular_name_short': name} for i, name in enumerate(['GKP', 'DEF', 'MID', 'FWD'], 1)]
+    bootstrap = {
+        'elements': json.loads(players.drop(columns=['position_name'], errors='ignore').to_json(orient='records')),
+        'teams': teams,
+        'element_types': element_types,
+    }
+
+    histories = {
+        int(pid): json.loads(rows.drop(columns=['player_id']).to_json(orient='records'))
+        for pid, rows in gameweeks.groupby('player_id')
+    }
+    template = next(iter(histories.values()))
+    if finished_round is not None:
+        histories = season_histories(players, fixtures, template[0])
+    summaries = {}
+    for pid in players['id'].tolist():
+        history = histories.get(pid) or [{**row, 'element': pid} for row in template]
+        summaries[pid] = json.dumps({'history': history, 'fixtures': [], 'history_past': []}).encode()
+
+    return {
+        '/api/bootstrap-static/': json.dumps(bootstrap).encode(),
+        '/api/fixtures/': fixtures.to_json(orient='records').encode(),
+    }, summaries
+
+
+class StubFPLServer:
+    """Threaded HTTP server on 127.0.0.1; start() returns the base URL to give the collector"""
+
+    def __init__(self, port: int = 0, latency: float = 0.05, error_rate: float = 0.0, seed: int = 0,
+                 finished_round: int = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.last_modified = formatdate(usegmt=True)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.payloads, self.summaries = load_payloads(finished_round)
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/api/"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                with stub._lock:
+                    stub.requests += 1
+                    fail = stub._random.random() < stub.error_rate
+                    stub.errors += fail
+                time.sleep(stub.latency)
+
+                summary = SUMMARY_PATH.match(path)
+                body = stub.summaries.get(int(summary.group(1))) if summary else stub.payloads.get(path)
+                if fail:
+                    self._send(503, b'{"detail": "injected failure"}')
+                elif body is None:
+                    self._send(404, b'{"detail": "Not found."}')
+                else:
+                    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        with stub._lock:
+                            stub.not_modified += 1
+                        self._send(304, b'', etag)
+                    else:
+                        self._send(200, body, etag)
+
+            def _send(self, status, body, etag=None):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if etag:
+                    self.send_header('ETag', etag)
+                    self.send_header('Last-Modified', stub.last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+                with stub._lock:
+                    stub.bytes_sent += len(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def set_finished_round(self, finished_round: int, extra_fixtures: int = 0):
+        self.payloads, self.summaries = load_payloads(finished_round, extra_fixtures)
+
+    def start(self) -> str:
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--finished-round', type=int, default=None)
+    args = parser.parse_args()
+
+    server = StubFPLServer(args.port, args.latency, args.error_rate, finished_round=args.finished_round)
+    print(f"Stub FPL API on {server.url} (latency {args.latency}s, error rate {args.error_rate})")
+    server.httpd.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Synthetic player pools shared by the benchmark scripts"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(backend_dir, 'core'))
+
+DATA_DIR = os.path.join(backend_dir, '..', 'data')
+POSITION_SHARE = {'GKP': 0.11, 'DEF': 0.33, 'MID': 0.40, 'FWD': 0.16}
+ELEMENT_TYPES = {'GKP': 1, 'DEF': 2, 'MID': 3, 'FWD': 4}
+
+
+def synthetic_players(n_players, n_teams=20, seed=0):
+    """Random player table shaped like players.csv plus a predictions dict"""
+    rng = np.random.default_rng(seed)
+    positions = rng.choice(list(POSITION_SHARE), size=n_players, p=list(POSITION_SHARE.values()))
+    now_cost = rng.integers(40, 141, size=n_players)
+    # Points loosely follow price so the knapsack is not trivial
+    points = np.clip(now_cost / 20 + rng.normal(0, 1.5, size=n_players), 0.5, 12)
+
+    players = pd.DataFrame({
+        'id': np.arange(1, n_players + 1),
+        'web_name': [f"Player {i}" for i in range(1, n_players + 1)],
+        'position_name': positions,
+        'element_type': pd.Series(positions).map(ELEMENT_TYPES).to_numpy(),
+        'team': rng.integers(1, n_teams + 1, size=n_players),
+        'now_cost': now_cost,
+        'total_points': (points * rng.uniform(3, 8, size=n_players)).round().astype(int),
+    })
+    predictions = dict(zip(players['id'].tolist(), points.tolist()))
+    return players, predictions
+
+
+def real_players():
+    """players.csv with the fallback predictions SimplePredictor uses before training"""
+    players = pd.read_csv(os.path.join(DATA_DIR, 'players.csv'))
+    points = (players['total_points'] / players['total_points'].max() * 8).fillna(3).clip(1, 10)
+    return players, dict(zip(players['id'].tolist(), points.tolist()))
+
+
+def synthetic_seasons(n_players=700, n_seasons=1, n_teams=20, rounds_per_season=38, seed=0):
+    """players, gameweeks and fixtures tables for consecutive seasons, rounds numbered on across seasons.
+
+    Each round every team plays once against a random opponent; players
+    appear in most of their team's fixtures with points, minutes, xG, xA
+    and bps drawn around a per-player level.
+    """
+    rng = np.random.default_rng(seed)
+    players, _ = synthetic_players(n_players, n_teams, seed)
+    n_rounds = n_seasons * rounds_per_season
+
+    pairs = np.argsort(rng.random((n_rounds, n_teams)), axis=1) + 1
+    home, away = pairs[:, 0::2].ravel(), pairs[:, 1::2].ravel()
+    events = np.repeat(np.arange(1, n_rounds + 1), n_teams // 2)
+    fixtures = pd.DataFrame({
+        'id': np.arange(1, len(events) + 1), 'event': events, 'finished': True,
+        'team_h': home, 'team_a': away,
+        'team_h_difficulty': rng.integers(2, 6, size=len(events)),
+        'team_a_difficulty': rng.integers(2, 6, size=len(events)),
+    })
+
+    sides = pd.concat([
+        pd.DataFrame({'team': home, 'fixture': fixtures['id'], 'round': events, 'was_home': True}),
+        pd.DataFrame({'team': away, 'fixture': fixtures['id'], 'round': events, 'was_home': False}),
+    ])
+    rows = players[['id', 'team']].merge(sides, on='team').rename(columns={'id': 'player_id'})
+    rows = rows[rng.random(len(rows)) < 0.85].sort_values(['player_id', 'round']).reset_index(drop=True)
+    level = rows['player_id'].map(players.set_index('id')['now_cost'] / 20).to_numpy()
+    minutes = np.where(rng.random(len(rows)) < 0.8, 90, rng.integers(1, 90, size=len(rows)))
+    rows['minutes'] = minutes
+    rows['total_points'] = np.maximum(rng.poisson(level * minutes / 90), 0) + (minutes >= 60)
+    rows['expected_goals'] = np.round(rng.gamma(0.5, level / 20), 2)
+    rows['expected_assists'] = np.round(rng.gamma(0.5, level / 30), 2)
+    rows['bps'] = rng.poisson(5 + 3 * level)
+    return players, rows.drop(columns=['team']), fixtures
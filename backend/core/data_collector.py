@@ -1,99 +1,194 @@
-import requests
 import pandas as pd
-import json
 import os
-from datetime import datetime
+
+from data_store import DataStore
+from fetcher import Checkpoint, ConcurrentFetcher
+from http_cache import HTTPCache
 
 class SimpleFPLCollector:
-    def __init__(self):
-        self.base_url = "https://fantasy.premierleague.com/api/"
+    def __init__(self, base_url=None, max_workers=None, requests_per_second=None, data_dir=None):
+        self.base_url = base_url or os.environ.get('FPL_API_URL', "https://fantasy.premierleague.com/api/")
         # Get the backend directory path
         self.backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        self.data_dir = os.path.join(self.backend_dir, '..', 'data')
+        self.data_dir = data_dir or os.path.join(self.backend_dir, '..', 'data')
         
         # Ensure data directory exists
         os.makedirs(self.data_dir, exist_ok=True)
+        self.store = DataStore(self.data_dir)
+        
+        # Responses are cached on disk and revalidated with ETag/Last-Modified once stale
+        self.cache = HTTPCache(
+            os.path.join(self.data_dir, 'http_cache'),
+            ttl_seconds=float(os.environ.get('FPL_HTTP_CACHE_TTL', 300)),
+        )
+        
+        # One pooled session and rate limit shared by every request this collector makes
+        self.fetcher = ConcurrentFetcher(
+            max_workers=max_workers or int(os.environ.get('FPL_FETCH_WORKERS', 8)),
+            rate=requests_per_second or float(os.environ.get('FPL_FETCH_RATE', 10)),
+            cache=self.cache,
+        )
+        self._bootstrap = None
+    
+    def get_bootstrap(self):
+        """bootstrap-static payload, fetched at most once per collector"""
+        if self._bootstrap is None:
+            self._bootstrap = self.fetcher.get_json(f"{self.base_url}bootstrap-static/")
+            self.cache.log('bootstrap-static/')
+        return self._bootstrap
     
     def get_all_data(self):
         """Get all player data"""
         print("📥 Fetching FPL player data...")
         
-        bootstrap = requests.get(f"{self.base_url}bootstrap-static/").json()
+        bootstrap = self.get_bootstrap()
         
         # Extract players with position names
         players = pd.DataFrame(bootstrap['elements'])
-        players['position_name'] = players['element_type'].map({1: 'GKP', 2: 'DEF', 3: 'MID', 4: 'FWD'})
+        players['position_name'] = players['element_type'].map(self.get_element_types())
         
-        # Save to CSV
-        players_path = os.path.join(self.data_dir, 'players.csv')
-        players.to_csv(players_path, index=False)
-        print(f"✅ Saved {len(players)} players to {players_path}")
+        # Save to the store
+        self.store.write('players', players)
+        print(f"✅ Saved {len(players)} players to {self.store.path('players')}")
         
-        return players
+        return self.store.read('players')
     
     def get_fixtures(self):
         """Get fixture data with difficulty ratings"""
         print("📥 Fetching fixture data...")
         
         try:
-            fixtures_data = requests.get(f"{self.base_url}fixtures/").json()
+            fixtures_data = self.fetcher.get_json(f"{self.base_url}fixtures/")
+            self.cache.log('fixtures/')
             fixtures_df = pd.DataFrame(fixtures_data)
             
-            fixtures_path = os.path.join(self.data_dir, 'fixtures.csv')
-            fixtures_df.to_csv(fixtures_path, index=False)
-            print(f"✅ Saved {len(fixtures_df)} fixtures to {fixtures_path}")
+            # Nested per-fixture stats go to their own long table
+            self.store.write('fixtures', fixtures_df)
+            print(f"✅ Saved {len(fixtures_df)} fixtures to {self.store.path('fixtures')}")
             
-            return fixtures_df
+            return self.store.read('fixtures')
         except Exception as e:
             print(f"❌ Error fetching fixtures: {e}")
             return pd.DataFrame()
     
-    def get_player_history(self, max_players=500):  # INCREASED from 300
+    def get_player_history(self, max_players=500, progress=None):  # INCREASED from 300
         """Get historical data for more players to fix insufficient data issue"""
-        players_path = os.path.join(self.data_dir, 'players.csv')
+        top_players = self._active_players(max_players)['id'].tolist()
+        
+        print(f"📥 Collecting history for top {len(top_players)} active players...")
+        histories = self._fetch_histories(top_players, progress=progress)
+        gameweeks_df = self._history_frame(top_players, histories)
+        
+        if not gameweeks_df.empty:
+            self.store.write('gameweeks', gameweeks_df)
+            print(f"✅ Saved {len(gameweeks_df)} gameweek records to {self.store.path('gameweeks')}")
+            return gameweeks_df
+        else:
+            print("❌ No gameweek data collected")
+            return pd.DataFrame()
+    
+    def update_player_history(self, max_players=500, fixtures=None, progress=None):
+        """Fetch only players with newly finished fixtures and upsert their rows into the gameweeks table.
+        
+        A player is stale when a finished fixture of their team is missing
+        from the store and is not older than the last round ingested for them
+        (older gaps predate a transfer and never fill). Falls back to a full
+        collection when there is no store yet. progress(done, total) is called
+        as each player's history arrives.
+        """
+        if not self.store.exists('gameweeks'):
+            return self.get_player_history(max_players, progress=progress)
+        
+        stored = self.store.read('gameweeks', columns=['player_id', 'fixture', 'round'])
+        targets = self._active_players(max_players)[['id', 'team']]
+        fixtures = self.get_fixtures() if fixtures is None else fixtures
+        finished = fixtures[fixtures['finished'].astype(bool)]
+        
+        # Every (player, finished fixture) pair the store should hold
+        team_fixtures = pd.concat([
+            finished[['id', 'event', 'team_h']].rename(columns={'id': 'fixture', 'team_h': 'team'}),
+            finished[['id', 'event', 'team_a']].rename(columns={'id': 'fixture', 'team_a': 'team'}),
+        ])
+        expected = targets.merge(team_fixtures, on='team').rename(columns={'id': 'player_id'})
         
+        last_round = stored.groupby('player_id')['round'].max().rename('last_round')
+        expected = expected.merge(last_round, left_on='player_id', right_index=True, how='left')
+        missing = expected.merge(stored[['player_id', 'fixture']], on=['player_id', 'fixture'], how='left', indicator=True)
+        missing = missing[(missing['_merge'] == 'left_only') &
+                          ~(missing['event'] < missing['last_round'])]
+        stale = missing['player_id'].drop_duplicates().tolist()
+        
+        print(f"📥 {len(stale)}/{len(targets)} players have new finished fixtures "
+              f"(store has rounds up to {int(stored['round'].max()) if not stored.empty else 0})")
+        if not stale:
+            return self.store.read('gameweeks')
+        
+        # These players are known to have changed, so cached copies are always revalidated
+        histories = self._fetch_histories(stale, revalidate=True, progress=progress)
+        fresh = self._history_frame(stale, histories)
+        
+        # Upsert on (player, fixture): refetched rows replace stored ones, e.g. after bonus is confirmed
+        gameweeks_df = self.store.upsert('gameweeks', fresh)
+        print(f"✅ Upserted {len(fresh)} rows for {fresh['player_id'].nunique() if not fresh.empty else 0} players, "
+              f"{len(gameweeks_df)} gameweek records in {self.store.path('gameweeks')}")
+        return gameweeks_df
+    
+    def _active_players(self, max_players):
         try:
-            players = pd.read_csv(players_path)
+            players = self.store.read('players', columns=['id', 'team', 'minutes', 'total_points'])
         except FileNotFoundError:
             players = self.get_all_data()
         
         # Get more players by total points AND minutes (active players)
         active_players = players[players['minutes'] > 50]  # Players with game time
-        top_players = active_players.nlargest(max_players, 'total_points')['id'].tolist()
-        
-        all_history = []
+        return active_players.nlargest(max_players, 'total_points')
+    
+    def _fetch_histories(self, player_ids, revalidate=False, progress=None):
+        """element-summary history rows per player, resuming from the checkpoint unless revalidating"""
+        # Histories finished by an interrupted run are reused, only the rest are fetched
+        checkpoint = Checkpoint(os.path.join(self.data_dir, 'gameweeks.checkpoint.jsonl'))
+        if revalidate:
+            # These players changed since the checkpoint may have been written, so its copies can predate that
+            checkpoint.clear()
+        done = checkpoint.load()
+        pending = {pid: f"{self.base_url}element-summary/{pid}/" for pid in player_ids if pid not in done}
+        if len(pending) < len(player_ids):
+            print(f"♻️ Resuming: {len(player_ids) - len(pending)} players from checkpoint")
         
-        print(f"📥 Collecting history for top {len(top_players)} active players...")
+        fetched = self.fetcher.fetch_all(
+            pending, on_result=lambda pid, data: checkpoint.append(pid, data['history']), revalidate=revalidate,
+            progress=progress,
+        )
+        self.cache.log('element-summary/{id}/')
+        histories = {**done, **{pid: data['history'] for pid, data in fetched['results'].items()}}
         
-        for i, player_id in enumerate(top_players):
-            if i % 50 == 0:
-                print(f"Progress: {i+1}/{len(top_players)}")
-            
-            try:
-                data = requests.get(f"{self.base_url}element-summary/{player_id}/").json()
-                history = pd.DataFrame(data['history'])
-                
-                if not history.empty:
-                    history['player_id'] = player_id
-                    all_history.append(history)
-                    
-            except Exception as e:
-                continue  # Skip failed requests
-        
-        if all_history:
-            gameweeks_df = pd.concat(all_history, ignore_index=True)
-            gameweeks_path = os.path.join(self.data_dir, 'gameweeks.csv')
-            gameweeks_df.to_csv(gameweeks_path, index=False)
-            print(f"✅ Saved {len(gameweeks_df)} gameweek records to {gameweeks_path}")
-            return gameweeks_df
+        if fetched['failed']:
+            # Keep the checkpoint so the next run only retries these
+            print(f"⚠️ {len(fetched['failed'])} players failed after {self.fetcher.max_retries} retries: "
+                  f"{sorted(fetched['failed'])[:20]}")
         else:
-            print("❌ No gameweek data collected")
-            return pd.DataFrame()
+            checkpoint.clear()
+        return histories
+    
+    @staticmethod
+    def _history_frame(player_ids, histories):
+        all_history = []
+        for player_id in player_ids:
+            history = pd.DataFrame(histories.get(player_id, []))
+            if not history.empty:
+                history['player_id'] = player_id
+                all_history.append(history)
+        return pd.concat(all_history, ignore_index=True) if all_history else pd.DataFrame()
     # In your data collector
     def get_team_mapping(self):
-        bootstrap = requests.get(f"{self.base_url}bootstrap-static/").json()
+        bootstrap = self.get_bootstrap()
         teams = {team['id']: team['name'] for team in bootstrap['teams']}
         return teams
+    
+    def get_element_types(self):
+        """Position short names by element_type id"""
+        bootstrap = self.get_bootstrap()
+        return {element_type['id']: element_type['singular_name_short'] for element_type in bootstrap['element_types']}
 
 
 
@@ -0,0 +1,149 @@
+import ast
+import hashlib
+import os
+import threading
+from typing import Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+TABLES = ('players', 'gameweeks', 'fixtures', 'fixture_stats')
+
+# Upsert keys per table
+KEYS = {
+    'players': ['id'],
+    'gameweeks': ['player_id', 'fixture'],
+    'fixtures': ['id'],
+    'fixture_stats': ['fixture', 'identifier', 'side', 'element'],
+}
+
+
+def normalize_fixture_stats(fixtures_df: pd.DataFrame) -> pd.DataFrame:
+    """Long table (fixture, identifier, side, element, value) from the nested fixtures `stats` column.
+
+    Accepts the API's list of dicts or the stringified Python list the CSV
+    files stored.
+    """
+    rows = []
+    for fixture, stats in zip(fixtures_df['id'].tolist(), fixtures_df['stats'].tolist()):
+        if isinstance(stats, str):
+            stats = ast.literal_eval(stats) if stats.strip() else []
+        elif not isinstance(stats, list):
+            continue
+        for stat in stats:
+            for side in ('h', 'a'):
+                for entry in stat.get(side, []):
+                    rows.append((fixture, stat['identifier'], side, entry['element'], entry['value']))
+    return pd.DataFrame(rows, columns=['fixture', 'identifier', 'side', 'element', 'value']).astype(
+        {'fixture': 'int64', 'element': 'int64', 'value': 'int64'}
+    )
+
+
+def typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Numeric strings (the API sends form, selected_by_percent, ... as text) become floats"""
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_string_dtype(df[column]) or df[column].dtype == object:
+            values = df[column]
+            if values.map(lambda v: isinstance(v, (list, dict))).any():
+                continue
+            numeric = pd.to_numeric(values, errors='coerce')
+            if numeric.notna().sum() == values.notna().sum() and values.notna().any():
+                df[column] = numeric
+    return df
+
+
+class DataStore:
+    """Typed Parquet tables in data/: players, gameweeks, fixtures and fixture_stats.
+
+    read() loads only the requested columns. The nested fixtures `stats`
+    column is never stored on fixtures; write('fixtures') splits it into the
+    long fixture_stats table. On the first read of a table whose Parquet file
+    is missing (or older than its CSV), the legacy CSV is migrated.
+    """
+
+    def __init__(self, data_dir: str = None):
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.data_dir = data_dir or os.path.join(backend_dir, '..', 'data')
+        self._lock = threading.Lock()
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    def path(self, table: str) -> str:
+        return os.path.join(self.data_dir, f"{table}.parquet")
+
+    def csv_path(self, table: str) -> str:
+        return os.path.join(self.data_dir, f"{table}.csv")
+
+    def exists(self, table: str) -> bool:
+        return os.path.exists(self.path(table)) or os.path.exists(self.csv_path(table))
+
+    def columns(self, table: str) -> List[str]:
+        self._ensure(table)
+        return pq.read_schema(self.path(table)).names
+
+    def content_hash(self, tables: Iterable[str]) -> str:
+        """SHA-256 over the stored bytes of `tables`, migrating them first"""
+        digest = hashlib.sha256()
+        for table in tables:
+            self._ensure(table)
+            digest.update(table.encode())
+            with open(self.path(table), 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+
+    def read(self, table: str, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Load a table, or just `columns` of it; raises FileNotFoundError if it was never collected"""
+        self._ensure(table)
+        if columns is not None:
+            available = set(pq.read_schema(self.path(table)).names)
+            columns = [column for column in columns if column in available]
+        return pd.read_parquet(self.path(table), columns=columns)
+
+    def write(self, table: str, df: pd.DataFrame):
+        """Replace a table; fixtures also replace fixture_stats when they carry a stats column"""
+        if table == 'fixtures' and 'stats' in df.columns:
+            self._write('fixture_stats', normalize_fixture_stats(df))
+            df = df.drop(columns=['stats'])
+        self._write(table, typed(df))
+
+    def upsert(self, table: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Insert or replace rows by the table's key, returning the stored table"""
+        keys = KEYS[table]
+        current = self.read(table) if self.exists(table) else pd.DataFrame()
+        merged = pd.concat([current, typed(df)], ignore_index=True) \
+            .drop_duplicates(keys, keep='last') \
+            .sort_values(keys, ignore_index=True)
+        self.write(table, merged)
+        return merged
+
+    def _write(self, table: str, df: pd.DataFrame):
+        path = self.path(table)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        # Atomic replace: readers see the old or the new table, never a partial file
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp, compression='zstd')
+        os.replace(tmp, path)
+
+    def _ensure(self, table: str):
+        """Migrate the legacy CSV when there is no Parquet file or the CSV is newer"""
+        source = 'fixtures' if table == 'fixture_stats' else table
+        path, source_csv = self.path(table), self.csv_path(source)
+        if not self._stale(path, source_csv):
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            return
+        with self._lock:
+            if not self._stale(path, source_csv):
+                return
+            print(f"🗃️ Migrating {os.path.basename(source_csv)} to Parquet...")
+            df = pd.read_csv(source_csv)
+            self.write(source, df)
+            if source == 'fixtures' and 'stats' not in df.columns:
+                # Nothing to normalize, but the table must exist
+                self._write('fixture_stats', normalize_fixture_stats(pd.DataFrame({'id': [], 'stats': []})))
+
+    @staticmethod
+    def _stale(path: str, csv_path: str) -> bool:
+        return os.path.exists(csv_path) and (
+            not os.path.exists(path) or os.path.getmtime(csv_path) > os.path.getmtime(path)
+        )
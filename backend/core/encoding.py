@@ -0,0 +1,94 @@
+import gzip
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import orjson
+import pandas as pd
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(value) -> bytes:
+    """Compact JSON; NaN and infinities become null, numpy scalars and arrays are native"""
+    return orjson.dumps(value, default=str, option=OPTIONS)
+
+
+def frame_records(df: pd.DataFrame) -> List[bytes]:
+    """One JSON object per row, encoded column-wise without going through per-row dicts"""
+    columns = [(dumps(str(column)) + b':', df[column].tolist()) for column in df.columns]
+    return [
+        b'{' + b','.join(key + dumps(values[i]) for key, values in columns) + b'}'
+        for i in range(len(df))
+    ]
+
+
+def json_array(encoded: List[bytes]) -> bytes:
+    return b'[' + b','.join(encoded) + b']'
+
+
+class Compressor:
+    """Content-Encoding negotiation and compression for response bodies.
+
+    Prefers brotli over gzip when the client accepts both with the same
+    q-value. Bodies under min_size are left alone. Compressed bodies of
+    responses that carry an ETag are kept in a small LRU, so repeat requests
+    for the same version of a large payload skip compression.
+    """
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5, cache_entries: int = 64):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_entries = cache_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Best supported encoding for an Accept-Encoding header, or None for identity"""
+        if not accept_encoding:
+            return None
+        weights = {}
+        for part in accept_encoding.split(','):
+            name, _, params = part.strip().partition(';')
+            q = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    q = 0.0
+            weights[name.strip().lower()] = q
+        wildcard = weights.get('*', 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = weights.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def compress(self, body: bytes, encoding: str, etag: Optional[str] = None) -> bytes:
+        key = (etag, encoding)
+        if etag is not None:
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return self._cache[key]
+
+        if encoding == 'br':
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+        if etag is not None:
+            with self._lock:
+                self._cache[key] = compressed
+                while len(self._cache) > self.cache_entries:
+                    self._cache.popitem(last=False)
+        return compressed
@@ -0,0 +1,262 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Per-round stats the rolling windows summarise; a double gameweek counts as one round
+STATS = ['total_points', 'minutes', 'expected_goals', 'expected_assists', 'bps']
+WINDOWS = (3, 5, 10)
+# Rounds ahead, starting with the row's own, that the fixture difficulty features cover
+FIXTURE_HORIZON = 3
+
+FEATURE_COLUMNS = (
+    [f"{stat}_avg_{window}" for window in WINDOWS for stat in STATS]
+    + ['appearances', 'fixtures', 'difficulty', f'fixtures_next_{FIXTURE_HORIZON}', f'difficulty_next_{FIXTURE_HORIZON}']
+)
+
+
+def round_stats(gameweeks_df: pd.DataFrame) -> pd.DataFrame:
+    """STATS summed per (player_id, round), sorted by player then round. Missing stat columns count as 0."""
+    frame = gameweeks_df.reindex(columns=['player_id', 'round', *STATS])
+    frame[STATS] = frame[STATS].apply(pd.to_numeric, errors='coerce').fillna(0.0)
+    frame = frame.dropna(subset=['player_id', 'round']).astype({'player_id': 'int64', 'round': 'int64'})
+    return frame.groupby(['player_id', 'round'], sort=True)[STATS].sum().reset_index()
+
+
+def rows_digest(gameweeks_df: pd.DataFrame) -> int:
+    """Order-independent digest of the gameweek rows' player, round and STATS: the sum of their row hashes"""
+    columns = gameweeks_df.reindex(columns=['player_id', 'round', *STATS])
+    return int(pd.util.hash_pandas_object(columns, index=False).to_numpy().sum(dtype=np.uint64))
+
+
+def next_gameweek(fixtures_df: pd.DataFrame) -> int:
+    """First gameweek that still has unfinished fixtures"""
+    if fixtures_df is None or fixtures_df.empty:
+        return 1
+    pending = fixtures_df[~fixtures_df['finished'].astype(bool) & fixtures_df['event'].notna()]
+    if pending.empty:
+        return int(fixtures_df['event'].max()) + 1
+    return int(pending['event'].min())
+
+
+class FixtureTable:
+    """Per team and round: number of fixtures and their summed difficulty, with running totals along the rounds"""
+
+    def __init__(self, fixtures_df: Optional[pd.DataFrame], n_rounds: int = 38):
+        fixtures = pd.DataFrame() if fixtures_df is None else fixtures_df.dropna(subset=['event'])
+        teams = np.concatenate([fixtures.get('team_h', pd.Series(dtype='int64')).to_numpy(),
+                                fixtures.get('team_a', pd.Series(dtype='int64')).to_numpy()]).astype(np.int64)
+        events = np.tile(fixtures.get('event', pd.Series(dtype='int64')).to_numpy(), 2).astype(np.int64)
+        difficulty = np.concatenate([fixtures.get('team_h_difficulty', pd.Series(dtype=float)).to_numpy(),
+                                     fixtures.get('team_a_difficulty', pd.Series(dtype=float)).to_numpy()])
+        difficulty = np.nan_to_num(difficulty.astype(np.float64), nan=3.0)
+
+        n_teams = int(teams.max()) + 1 if len(teams) else 1
+        self.n_rounds = max(n_rounds, int(events.max()) if len(events) else 0) + FIXTURE_HORIZON + 1
+        counts = np.zeros((n_teams, self.n_rounds))
+        totals = np.zeros((n_teams, self.n_rounds))
+        np.add.at(counts, (teams, events), 1.0)
+        np.add.at(totals, (teams, events), difficulty)
+        self.counts, self.totals = counts, totals
+        # Column r holds the sum over rounds < r, so any window is one subtraction
+        self.count_sums = np.concatenate([np.zeros((n_teams, 1)), counts.cumsum(axis=1)], axis=1)
+        self.total_sums = np.concatenate([np.zeros((n_teams, 1)), totals.cumsum(axis=1)], axis=1)
+
+    def features(self, teams: np.ndarray, rounds: np.ndarray) -> dict:
+        """Fixture columns for each (team, round); unknown teams and rounds have no fixtures"""
+        known = (teams >= 0) & (teams < len(self.counts)) & (rounds >= 0) & (rounds < self.n_rounds - FIXTURE_HORIZON)
+        team = np.where(known, teams, 0)
+        first = np.where(known, rounds, 0)
+        last = first + FIXTURE_HORIZON
+        count = np.where(known, self.counts[team, first], 0.0)
+        ahead = np.where(known, self.count_sums[team, last] - self.count_sums[team, first], 0.0)
+        total = np.where(known, self.totals[team, first], 0.0)
+        total_ahead = np.where(known, self.total_sums[team, last] - self.total_sums[team, first], 0.0)
+        # Difficulty 3 is neutral, so a round without fixtures reads as average rather than easy
+        return {
+            'fixtures': count,
+            'difficulty': np.divide(total, count, out=np.full(len(count), 3.0), where=count > 0),
+            f'fixtures_next_{FIXTURE_HORIZON}': ahead,
+            f'difficulty_next_{FIXTURE_HORIZON}': np.divide(total_ahead, ahead, out=np.full(len(ahead), 3.0),
+                                                            where=ahead > 0),
+        }
+
+
+class FeatureEngine:
+    """Rolling-window features per player and round from the gameweek history.
+
+    Every row describes what was known before its round: means of STATS
+    over the player's last 3, 5 and 10 rounds played, the number of rounds
+    played so far, and the fixture count and difficulty of the round and
+    the FIXTURE_HORIZON rounds from it. `points` is the round's outcome,
+    the training target.
+
+    build() computes the whole history at once from cumulative sums per
+    player. It also keeps the last max(WINDOWS) rounds of every player in a
+    (players, window, stats) buffer, so update() adds a new gameweek by
+    reading and shifting only that buffer, and upcoming() gives the rows
+    to predict from without touching the history again.
+    """
+
+    def __init__(self):
+        self.depth = max(WINDOWS)
+        self.frame = pd.DataFrame(columns=['player_id', 'round', *FEATURE_COLUMNS, 'points'])
+        self.fixtures = FixtureTable(None)
+        self.teams = pd.Series(dtype='int64')
+        self.player_ids = pd.Index([], dtype='int64')
+        self.recent = np.zeros((0, self.depth, len(STATS)))
+        self.played = np.zeros(0, dtype=np.int64)
+        self.last_round = np.zeros(0, dtype=np.int64)
+        self.rows_seen = 0
+        self.rows_hash = 0
+
+    def build(self, gameweeks_df: pd.DataFrame, fixtures_df: Optional[pd.DataFrame] = None,
+              players_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Feature rows for the whole history, replacing any previous history"""
+        self._set_context(fixtures_df, players_df)
+        rounds = round_stats(gameweeks_df)
+        self.rows_seen = len(gameweeks_df)
+        self.rows_hash = rows_digest(gameweeks_df)
+
+        player = rounds['player_id'].to_numpy()
+        values = rounds[STATS].to_numpy(dtype=np.float64)
+        n = len(rounds)
+        index = np.arange(n)
+        first = np.ones(n, dtype=bool)
+        first[1:] = player[1:] != player[:-1]
+        group_start = np.maximum.accumulate(np.where(first, index, 0)) if n else index
+        last = np.ones(n, dtype=bool)
+        last[:-1] = first[1:]
+        group_end = np.minimum.accumulate(np.where(last, index, n - 1)[::-1])[::-1] if n else index
+
+        # sums[i] - sums[j] is the total of rows j..i-1, so a window before row i is one subtraction
+        sums = np.zeros((n + 1, len(STATS)))
+        np.cumsum(values, axis=0, out=sums[1:])
+        columns = {}
+        for window in WINDOWS:
+            start = np.maximum(index - window, group_start)
+            count = (index - start)[:, None]
+            means = np.divide(sums[index] - sums[start], count, out=np.zeros((n, len(STATS))), where=count > 0)
+            for k, stat in enumerate(STATS):
+                columns[f"{stat}_avg_{window}"] = means[:, k]
+        columns['appearances'] = (index - group_start).astype(np.float64)
+
+        frame = pd.DataFrame({'player_id': player, 'round': rounds['round'].to_numpy(), **columns})
+        frame = self._with_fixtures(frame)
+        frame['points'] = rounds['total_points'].to_numpy(dtype=np.float64)
+        self.frame = frame
+
+        # Buffer the last `depth` rounds of each player, most recent in the last slot
+        self.player_ids = pd.Index(player[first])
+        slot = self.depth - 1 - (group_end - index)
+        keep = slot >= 0
+        self.recent = np.zeros((len(self.player_ids), self.depth, len(STATS)))
+        owner = np.cumsum(first) - 1
+        self.recent[owner[keep], slot[keep]] = values[keep]
+        self.played = group_end[first] - index[first] + 1
+        self.last_round = rounds['round'].to_numpy()[last]
+        return frame
+
+    def update(self, new_gameweeks_df: pd.DataFrame, fixtures_df: Optional[pd.DataFrame] = None,
+               players_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Append the rows for rounds after each player's last one; returns the new feature rows"""
+        self._set_context(fixtures_df, players_df)
+        rounds = round_stats(new_gameweeks_df)
+        self.rows_seen += len(new_gameweeks_df)
+        self.rows_hash = (self.rows_hash + rows_digest(new_gameweeks_df)) % 2 ** 64
+        # A snapshot loaded with mmap_mode='r' hands back read-only buffers; they are small, so copy
+        self.recent, self.played, self.last_round = (np.array(a) for a in (self.recent, self.played, self.last_round))
+        self._grow(rounds['player_id'].unique())
+
+        added = []
+        for round_number, group in rounds.groupby('round', sort=True):
+            owner = self.player_ids.get_indexer(group['player_id'].to_numpy())
+            if (self.last_round[owner] >= round_number).any():
+                raise ValueError(f"Round {round_number} is not after the last round of every player in it")
+            frame = self._rolling(owner)
+            frame.insert(0, 'round', round_number)
+            frame.insert(0, 'player_id', group['player_id'].to_numpy())
+            frame = self._with_fixtures(frame)
+            values = group[STATS].to_numpy(dtype=np.float64)
+            frame['points'] = values[:, STATS.index('total_points')]
+            added.append(frame)
+
+            self.recent[owner, :-1] = self.recent[owner, 1:]
+            self.recent[owner, -1] = values
+            self.played[owner] += 1
+            self.last_round[owner] = round_number
+
+        if not added:
+            return self.frame.iloc[:0]
+        new_rows = pd.concat(added, ignore_index=True)
+        self.frame = pd.concat([self.frame, new_rows], ignore_index=True)
+        return new_rows
+
+    def sync(self, gameweeks_df: pd.DataFrame, fixtures_df: Optional[pd.DataFrame] = None,
+             players_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """All feature rows for gameweeks_df, updating incrementally when it only adds later rounds.
+
+        Anything else (a first call, backfilled or corrected rows, the rest
+        of a double gameweek already partly seen) rebuilds from scratch. The
+        rows already seen are compared by content (rows_digest), not count.
+        """
+        if self.rows_seen and len(gameweeks_df) > self.rows_seen:
+            owner = self.player_ids.get_indexer(gameweeks_df['player_id'].to_numpy())
+            seen_round = np.where(owner >= 0, self.last_round[owner], -1)
+            fresh = gameweeks_df['round'].to_numpy() > seen_round
+            if (self.rows_seen + int(fresh.sum()) == len(gameweeks_df)
+                    and rows_digest(gameweeks_df[~fresh]) == self.rows_hash):
+                self.update(gameweeks_df[fresh], fixtures_df, players_df)
+                return self.frame
+        if self.rows_seen != len(gameweeks_df) or rows_digest(gameweeks_df) != self.rows_hash:
+            self.build(gameweeks_df, fixtures_df, players_df)
+        else:
+            self._set_context(fixtures_df, players_df)
+        return self.frame
+
+    def upcoming(self, player_ids, round_number: Optional[int] = None) -> pd.DataFrame:
+        """Feature rows for the next round of each player, from the buffered history (zeros for new players)"""
+        if round_number is None:
+            round_number = int(self.last_round.max()) + 1 if len(self.last_round) else 1
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        owner = self.player_ids.get_indexer(player_ids)
+        frame = self._rolling(np.where(owner >= 0, owner, 0))
+        frame.loc[owner < 0, :] = 0.0
+        frame.insert(0, 'round', round_number)
+        frame.insert(0, 'player_id', player_ids)
+        return self._with_fixtures(frame)
+
+    def _rolling(self, owner: np.ndarray) -> pd.DataFrame:
+        """Window means and appearances for the given buffer rows, before their next round"""
+        recent = self.recent[owner]
+        played = self.played[owner]
+        columns = {}
+        for window in WINDOWS:
+            count = np.minimum(played, window)[:, None]
+            means = np.divide(recent[:, -window:].sum(axis=1), count, out=np.zeros((len(owner), len(STATS))),
+                              where=count > 0)
+            for k, stat in enumerate(STATS):
+                columns[f"{stat}_avg_{window}"] = means[:, k]
+        columns['appearances'] = played.astype(np.float64)
+        return pd.DataFrame(columns)
+
+    def _with_fixtures(self, frame: pd.DataFrame) -> pd.DataFrame:
+        teams = self.teams.reindex(frame['player_id'].to_numpy()).fillna(-1).to_numpy(dtype=np.int64)
+        for column, values in self.fixtures.features(teams, frame['round'].to_numpy(dtype=np.int64)).items():
+            frame[column] = values
+        return frame
+
+    def _set_context(self, fixtures_df: Optional[pd.DataFrame], players_df: Optional[pd.DataFrame]):
+        if fixtures_df is not None:
+            self.fixtures = FixtureTable(fixtures_df)
+        if players_df is not None:
+            self.teams = players_df.set_index('id')['team'].astype('int64')
+
+    def _grow(self, player_ids: np.ndarray):
+        """Buffer rows for players not seen before"""
+        new = pd.Index(player_ids).difference(self.player_ids)
+        if len(new):
+            self.player_ids = self.player_ids.append(new)
+            self.recent = np.concatenate([self.recent, np.zeros((len(new), self.depth, len(STATS)))])
+            self.played = np.concatenate([self.played, np.zeros(len(new), dtype=np.int64)])
+            self.last_round = np.concatenate([self.last_round, np.zeros(len(new), dtype=np.int64)])
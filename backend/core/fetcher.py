@@ -0,0 +1,206 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import HTTPCache
+from metrics import REGISTRY
+
+# Worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+FETCH_SECONDS = REGISTRY.histogram(
+    'fpl_fetch_seconds', "FPL API fetch latency including retries, by endpoint and outcome", ('endpoint', 'outcome')
+)
+FETCH_RETRIES = REGISTRY.counter('fpl_fetch_retries_total', "Retried FPL API requests", ('endpoint',))
+
+
+class FetchError(Exception):
+    """Raised when a URL still fails after every retry"""
+
+    def __init__(self, url: str, reason: str):
+        super().__init__(f"{url}: {reason}")
+        self.url = url
+        self.reason = reason
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ConcurrentFetcher:
+    """Fetches JSON over one pooled requests.Session from a bounded thread pool.
+
+    Every request takes a token from a shared TokenBucket first, so the
+    upstream sees at most `rate` requests per second however many workers
+    run. Connection errors, timeouts and RETRY_STATUSES are retried with
+    exponential backoff and jitter, honouring Retry-After when sent.
+
+    With an HTTPCache, fresh entries skip the network (and the rate limit)
+    entirely and stale ones are fetched conditionally.
+    """
+
+    def __init__(self, session: requests.Session = None, max_workers: int = 8, rate: float = 10.0,
+                 burst: int = None, max_retries: int = 4, backoff: float = 0.5, timeout: float = 10.0,
+                 cache: HTTPCache = None):
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.session = session or self.make_session(max_workers)
+        self.cache = cache
+        self.retries = 0
+
+    @staticmethod
+    def make_session(pool_size: int) -> requests.Session:
+        """Session whose connection pool fits every worker, so connections are reused"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def get_json(self, url: str, revalidate: bool = False):
+        """Parsed JSON for url; revalidate skips serving a fresh cache entry without asking the server"""
+        started = time.perf_counter()
+        outcome = 'failed'
+        try:
+            data, outcome = self._get_json(url, revalidate)
+            return data
+        finally:
+            FETCH_SECONDS.observe(time.perf_counter() - started, endpoint=HTTPCache.endpoint(url), outcome=outcome)
+
+    def _get_json(self, url: str, revalidate: bool):
+        """(parsed JSON, outcome) where outcome is fresh, revalidated or downloaded"""
+        cached = self.cache.lookup(url) if self.cache is not None else None
+        if cached is not None and cached.fresh and not revalidate:
+            self.cache.record(url, 'fresh', served=len(cached.body))
+            return json.loads(cached.body), 'fresh'
+        headers = cached.validators() if cached is not None else {}
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            delay = self.backoff * 2 ** attempt * (0.5 + random.random())
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                reason = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 304 and cached is not None:
+                    self.cache.touch(url, cached)
+                    self.cache.record(url, 'revalidated', served=len(cached.body))
+                    return json.loads(cached.body), 'revalidated'
+                if response.status_code == 200:
+                    if self.cache is not None:
+                        self.cache.store(url, response.content, response.headers)
+                        self.cache.record(url, 'miss', downloaded=len(response.content))
+                    return response.json(), 'downloaded'
+                if response.status_code not in RETRY_STATUSES:
+                    raise FetchError(url, f"HTTP {response.status_code}")
+                reason = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After')
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+            if attempt < self.max_retries:
+                self.retries += 1
+                FETCH_RETRIES.inc(endpoint=HTTPCache.endpoint(url))
+                time.sleep(delay)
+        raise FetchError(url, reason)
+
+    def fetch_all(self, urls: Dict[int, str], on_result: Callable[[int, object], None] = None,
+                  progress_every: int = 50, revalidate: bool = False,
+                  progress: Callable[[int, int], None] = None) -> Dict:
+        """Fetch {key: url} concurrently, returning {'results': {key: json}, 'failed': {key: reason}}.
+
+        on_result runs in the calling thread as each response arrives, in
+        completion order; progress(done, total) after every URL, failed or not.
+        """
+        results, failed = {}, {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fetch') as pool:
+            futures = {pool.submit(self.get_json, url, revalidate): key for key, url in urls.items()}
+            for done, future in enumerate(as_completed(futures), 1):
+                key = futures[future]
+                if progress is not None:
+                    progress(done, len(urls))
+                try:
+                    results[key] = future.result()
+                except FetchError as e:
+                    failed[key] = e.reason
+                    continue
+                if on_result is not None:
+                    on_result(key, results[key])
+                if done % progress_every == 0:
+                    print(f"Progress: {done}/{len(urls)}")
+        return {'results': results, 'failed': failed}
+
+
+class Checkpoint:
+    """Append-only JSON-lines record of finished keys, so an interrupted run can resume.
+
+    Each line is written and flushed as soon as its key completes; a torn
+    last line from a crash is dropped on load. Entries older than max_age
+    seconds are treated as stale and fetched again.
+    """
+
+    def __init__(self, path: str, max_age: float = 12 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[int, object]:
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path) as f:
+            text = f.read()
+        if text and not text.endswith('\n'):
+            # Drop a torn last line so the next append starts on a fresh one
+            text = text[:text.rfind('\n') + 1]
+            with open(self.path, 'w') as f:
+                f.write(text)
+
+        cutoff = time.time() - self.max_age
+        for line in text.splitlines():
+            entry = json.loads(line)
+            if entry['fetched_at'] >= cutoff:
+                done[entry['key']] = entry['data']
+        return done
+
+    def append(self, key: int, data):
+        line = json.dumps({'key': key, 'fetched_at': time.time(), 'data': data})
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line + '\n')
+            f.flush()
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class CachedResponse:
+    """One cached body with the validators needed to revalidate it"""
+
+    def __init__(self, body: bytes, meta: Dict, ttl: float):
+        self.body = body
+        self.meta = meta
+        self.fresh = time.time() - meta['fetched_at'] < ttl
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for this entry"""
+        headers = {}
+        if self.meta.get('etag'):
+            headers['If-None-Match'] = self.meta['etag']
+        if self.meta.get('last_modified'):
+            headers['If-Modified-Since'] = self.meta['last_modified']
+        return headers
+
+
+class HTTPCache:
+    """On-disk cache of GET response bodies keyed by URL.
+
+    Entries younger than ttl_seconds are served without a request. Older ones
+    are revalidated with If-None-Match / If-Modified-Since, and a 304 just
+    refreshes the entry's age. Files are replaced atomically so concurrent
+    fetchers never read a half-written body. Per-endpoint counters record
+    fresh hits, 304s, misses and bytes downloaded vs served from disk.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float = 300.0):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.metrics = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def endpoint(url: str) -> str:
+        """Metrics bucket for a URL: its path with ids collapsed, e.g. element-summary/{id}/"""
+        path = urlparse(url).path
+        path = path.split('/api/', 1)[-1]
+        return re.sub(r'/\d+(?=/|$)', '/{id}', path)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest())
+
+    def lookup(self, url: str) -> Optional[CachedResponse]:
+        path = self._path(url)
+        try:
+            with open(path + '.meta') as f:
+                meta = json.load(f)
+            with open(path + '.body', 'rb') as f:
+                body = f.read()
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return CachedResponse(body, meta, self.ttl_seconds)
+
+    def store(self, url: str, body: bytes, headers) -> None:
+        meta = {
+            'url': url,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'size': len(body),
+        }
+        path = self._path(url)
+        # Body first: a meta file only ever points at a complete body
+        self._write(path + '.body', body)
+        self._write(path + '.meta', json.dumps(meta).encode())
+
+    def touch(self, url: str, cached: CachedResponse) -> None:
+        """A 304 confirmed the entry; restart its TTL"""
+        cached.meta['fetched_at'] = time.time()
+        self._write(self._path(url) + '.meta', json.dumps(cached.meta).encode())
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def record(self, url: str, outcome: str, downloaded: int = 0, served: int = 0):
+        """Count one request: outcome is 'fresh', 'revalidated' or 'miss'"""
+        with self._lock:
+            stats = self.metrics.setdefault(self.endpoint(url), {
+                'requests': 0, 'fresh': 0, 'revalidated': 0, 'miss': 0,
+                'bytes_downloaded': 0, 'bytes_from_cache': 0,
+            })
+            stats['requests'] += 1
+            stats[outcome] += 1
+            stats['bytes_downloaded'] += downloaded
+            stats['bytes_from_cache'] += served
+
+    def stats(self, endpoint: str = None) -> Dict:
+        with self._lock:
+            if endpoint is not None:
+                return dict(self.metrics.get(endpoint, {}))
+            return {name: dict(stats) for name, stats in self.metrics.items()}
+
+    def log(self, endpoint: str):
+        stats = self.stats(endpoint)
+        if not stats:
+            return
+        hits = stats['fresh'] + stats['revalidated']
+        print(f"🗄️ {endpoint}: {stats['requests']} requests, {hits} cache hits "
+              f"({stats['fresh']} fresh, {stats['revalidated']} revalidated), "
+              f"{stats['bytes_downloaded'] / 1024:.1f} KiB downloaded, "
+              f"{stats['bytes_from_cache'] / 1024:.1f} KiB from cache")
@@ -0,0 +1,126 @@
+from typing import Dict
+
+import numpy as np
+
+# Rows per vectorized pass: keeps a pass's slice of the feature matrix and its work arrays in cache
+CHUNK_ROWS = 512
+# Above this many rows per position sklearn's compiled traversal beats the numpy walk (bench_inference.py)
+MAX_COMPILED_ROWS = 1024
+
+
+class CompiledForest:
+    """A fitted sklearn tree or forest flattened into node arrays, evaluated for all rows and trees at once.
+
+    Every tree's nodes are concatenated with child indices made global.
+    Node k lives at slot 2k of the lookup arrays and its right child's
+    index at slot 2k + 1 of `children`, so one step is `slot + (x >
+    threshold)` followed by a single gather; leaves point to themselves.
+    All (row, tree) pairs of a chunk advance together until most have
+    reached a leaf, then only the rest are carried on. Thresholds are
+    float32 rounded down, which makes the float32 comparison decide
+    exactly as sklearn's float64 one does.
+    """
+
+    def __init__(self, model):
+        trees = [estimator.tree_ for estimator in getattr(model, 'estimators_', [model])]
+        sizes = np.array([tree.node_count for tree in trees])
+        roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        offsets = np.repeat(roots, sizes)
+        is_leaf = np.concatenate([tree.children_left for tree in trees]) < 0
+        nodes = np.arange(len(is_leaf))
+
+        left = np.where(is_leaf, nodes, np.concatenate([tree.children_left for tree in trees]) + offsets)
+        right = np.where(is_leaf, nodes, np.concatenate([tree.children_right for tree in trees]) + offsets)
+        self.children = np.empty(2 * len(nodes), dtype=np.int32)
+        self.children[0::2] = 2 * left
+        self.children[1::2] = 2 * right
+
+        threshold = np.concatenate([tree.threshold for tree in trees])
+        rounded = threshold.astype(np.float32)
+        rounded = np.where(rounded > threshold, np.nextafter(rounded, np.float32(-np.inf)), rounded)
+        feature = np.concatenate([tree.feature for tree in trees])
+        # Leaves compare feature 0 against +inf, so stepping from a leaf stays on it
+        self.feature = np.repeat(np.where(is_leaf, 0, feature).astype(np.int32), 2)
+        self.threshold = np.repeat(np.where(is_leaf, np.inf, rounded).astype(np.float32), 2)
+        self.is_leaf = np.repeat(is_leaf, 2)
+        self.value = np.repeat(np.concatenate([tree.value[:, 0, 0] for tree in trees]), 2)
+        self.roots = (2 * roots).astype(np.int32)
+        self.n_trees = len(trees)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.children, self.feature, self.threshold, self.is_leaf, self.value))
+
+    def predict(self, X: np.ndarray, chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+        """Mean over trees for each row of a float32 (rows, features) matrix"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        out = np.empty(len(X))
+        for start in range(0, len(X), chunk_rows):
+            out[start:start + chunk_rows] = self._predict_chunk(X[start:start + chunk_rows])
+        return out
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        n_rows = len(X)
+        flat = X.ravel()
+        slot = np.tile(self.roots, n_rows)
+        # Offset of each pair's row in the flattened matrix
+        base = np.repeat(np.arange(n_rows, dtype=np.int32) * X.shape[1], self.n_trees)
+        index = np.empty(len(slot), dtype=np.int32)
+        x = np.empty(len(slot), dtype=np.float32)
+        threshold = np.empty(len(slot), dtype=np.float32)
+        go_right = np.empty(len(slot), dtype=bool)
+
+        # Every pair steps in place, with preallocated buffers, while at least half are still walking
+        while True:
+            np.take(self.feature, slot, out=index)
+            index += base
+            np.take(flat, index, out=x)
+            np.take(self.threshold, slot, out=threshold)
+            np.greater(x, threshold, out=go_right)
+            slot += go_right
+            np.take(self.children, slot, out=slot)
+            walking = ~self.is_leaf[slot]
+            remaining = np.count_nonzero(walking)
+            if remaining * 2 < len(slot):
+                break
+
+        # Then only the pairs still walking, dropping finished ones whenever half of them are done
+        active = np.flatnonzero(walking)
+        current, current_base = slot[active], base[active]
+        while len(active):
+            current = self.children[current + (flat[self.feature[current] + current_base] > self.threshold[current])]
+            walking = ~self.is_leaf[current]
+            remaining = np.count_nonzero(walking)
+            if remaining * 2 < len(active):
+                slot[active] = current
+                active, current, current_base = active[walking], current[walking], current_base[walking]
+        return self.value[slot].reshape(n_rows, self.n_trees).mean(axis=1)
+
+
+class CompiledPredictor:
+    """CompiledForest per element_type, compiling a model shared by several positions once.
+
+    A position with more than max_compiled_rows rows in one call goes to its
+    sklearn forest instead, still on the float32 matrix: past that size the
+    per-node loop in sklearn's C code beats the numpy walk's passes.
+    """
+
+    def __init__(self, models: Dict, max_compiled_rows: int = MAX_COMPILED_ROWS):
+        compiled = {}
+        self.models = models
+        self.forests = {}
+        self.max_compiled_rows = max_compiled_rows
+        for element_type, model in models.items():
+            if id(model) not in compiled:
+                compiled[id(model)] = CompiledForest(model)
+            self.forests[element_type] = compiled[id(model)]
+
+    def predict(self, X: np.ndarray, element_types: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Fills out[i] for rows whose element_type has a forest; other rows keep their value"""
+        for element_type, forest in self.forests.items():
+            rows = np.flatnonzero(element_types == element_type)
+            if len(rows) > self.max_compiled_rows:
+                out[rows] = self.models[element_type].predict(X[rows])
+            elif len(rows):
+                out[rows] = forest.predict(X[rows])
+        return out
@@ -1,81 +1,853 @@
+import bisect
+import time
+from statistics import NormalDist
+
+import numpy as np
 import pandas as pd
 import pulp
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
+
+from simulation import CAPTAIN, DEFAULT_DISPERSION, RISK_MODES, STARTERS, Simulator, risk_score, summary
+from squad_search import BranchAndBound, LocalSearch
+
+try:
+    import highspy
+except ImportError:  # Fall back to CBC through PuLP
+    highspy = None
+
+POSITIONS = ['GKP', 'DEF', 'MID', 'FWD']
+INF = float('inf')
+
+# Exact backends in order of preference, with their p95 single-solve latency in seconds on ~700
+# players (benchmarks/bench_solver_backends.py). Branch-and-bound is quoted without dominance pruning
+# (prune_dominated=False), ~40s on players.csv; with it, ~2s. Excluded players are re-checked by
+# SquadModel._excluded, which prunes fewer players when they dominated others. 'local' is the anytime fallback.
+EXACT_SOLVERS = {'highs': 1.5, 'cbc': 2.0, 'bnb': 40.0}
+SOLVERS = tuple(EXACT_SOLVERS) + ('local',)
+# Statuses that come with a squad; 'Feasible' is a heuristic solution without an optimality proof
+SOLVED = ('Optimal', 'Feasible')
+
+
+def available_solvers() -> list:
+    """Backends usable in this process: HiGHS needs highspy, CBC the binary PuLP ships or finds"""
+    solvers = []
+    if highspy is not None:
+        solvers.append('highs')
+    if pulp.PULP_CBC_CMD(msg=0).available():
+        solvers.append('cbc')
+    return solvers + ['bnb', 'local']
+
+
+def select_solver(latency_target: float = None) -> str:
+    """Backend for a latency target in seconds.
+
+    The preferred exact backend that is available and typically finishes
+    within the target; local search (which stops at the target) when none
+    does. Without a target, the preferred available exact backend.
+    """
+    available = available_solvers()
+    for solver, seconds in EXACT_SOLVERS.items():
+        if solver in available and (latency_target is None or seconds <= latency_target):
+            return solver
+    return 'local'
+
+
+class PlayerArrays:
+    """Column arrays for one players/predictions snapshot, built once per snapshot.
+
+    outcomes (simulation.fit_outcomes) adds each player's availability,
+    appearance rate and points dispersion for Simulator; players it does not
+    cover are assumed available, always appearing, at the default dispersion.
+    """
+
+    def __init__(self, players_df: pd.DataFrame, predictions: Dict[int, float], outcomes: pd.DataFrame = None):
+        # Filter to players with predictions
+        available = players_df[players_df['id'].isin(list(predictions.keys()))]
+
+        self.ids = available['id'].to_numpy(dtype=np.int64)
+        self.names = available['web_name'].astype(str).to_numpy()
+        self.positions = available['position_name'].astype(str).to_numpy()
+        self.teams = available['team'].to_numpy()
+        self.prices = available['now_cost'].to_numpy(dtype=float) / 10  # Convert to millions
+        self.points = available['id'].map(predictions).to_numpy(dtype=float)
+        defaults = {'availability': 1.0, 'appearance': 1.0, 'dispersion': DEFAULT_DISPERSION}
+        outcomes = (pd.DataFrame(defaults, index=self.ids) if outcomes is None
+                    else outcomes.reindex(self.ids).fillna(defaults))
+        self.availability = outcomes['availability'].to_numpy(dtype=float)
+        self.appearance = outcomes['appearance'].to_numpy(dtype=float)
+        self.dispersion = outcomes['dispersion'].to_numpy(dtype=float)
+
+        # Row indices per position and per team, used to emit constraint rows in bulk
+        self.position_index = {pos: np.flatnonzero(self.positions == pos) for pos in POSITIONS}
+        team_codes, team_inverse = np.unique(self.teams, return_inverse=True)
+        order = np.argsort(team_inverse, kind='stable')
+        splits = np.flatnonzero(np.diff(team_inverse[order])) + 1
+        self.team_index = dict(zip(team_codes.tolist(), np.split(order, splits)))
+        self.team_codes = team_inverse
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ConstraintMatrix:
+    """Sparse constraint matrix in coordinate form, with lower/upper bounds per row"""
 
-class FPLOptimizer:
     def __init__(self):
+        self.names = []
+        self.lower = []
+        self.upper = []
+        self._rows, self._cols, self._vals = [], [], []
+
+    def add_rows(self, names: List[str], rows: np.ndarray, cols: np.ndarray, vals: np.ndarray,
+                 lower, upper) -> int:
+        """Append a block of rows; `rows` are block-relative. Returns the first row index"""
+        first = len(self.names)
+        self.names.extend(names)
+        self.lower.extend(np.broadcast_to(np.asarray(lower, dtype=float), len(names)).tolist())
+        self.upper.extend(np.broadcast_to(np.asarray(upper, dtype=float), len(names)).tolist())
+        self._rows.append(np.asarray(rows) + first)
+        self._cols.append(np.asarray(cols))
+        self._vals.append(np.asarray(vals, dtype=float))
+        return first
+
+    def add_row(self, name: str, cols: np.ndarray, vals: np.ndarray, lower: float, upper: float) -> int:
+        return self.add_rows([name], np.zeros(len(cols), dtype=int), cols, vals, lower, upper)
+
+    def csr(self):
+        """(starts, column indices, values) with entries grouped by row"""
+        rows = np.concatenate(self._rows)
+        order = np.argsort(rows, kind='stable')
+        starts = np.searchsorted(rows[order], np.arange(len(self.names)))
+        return starts, np.concatenate(self._cols)[order], np.concatenate(self._vals)[order]
+
+    def __len__(self):
+        return len(self.names)
+
+
+class FPLOptimizer:
+    """Squad selection MILP.
+
+    With pick_lineup the model also chooses the starting XI (1 GK, 3-5 DEF,
+    2-5 MID, 1-3 FWD, or an exact formation preference), a captain whose
+    points count twice, and the order of the three outfield substitutes.
+    Only starters score; bench slots carry small weights so the order
+    follows predicted points.
+
+    Only the squad and start columns are integer. Once they are fixed, the
+    captain and bench-slot rows form an assignment problem whose LP optimum
+    is already 0/1, so those columns are continuous and the MIP stays small.
+
+    With prune_dominated, players that dominated() proves can be left out
+    are fixed to zero before solving.
+    """
+
+    # Column blocks of the lineup model, each one column per player
+    LINEUP_BLOCKS = ('squad', 'start', 'captain', 'bench_1', 'bench_2', 'bench_3')
+    INTEGER_BLOCKS = ('squad', 'start')
+
+    def __init__(self, pick_lineup: bool = True, prune_dominated: bool = True):
         self.budget = 100.0
         self.formation = {
             'GKP': 2, 'DEF': 5, 'MID': 5, 'FWD': 3
         }
         self.max_per_team = 3
-    
-    def optimize_team(self, players_df: pd.DataFrame, predictions: Dict[int, float]) -> Dict:
-        """Simple team optimization"""
-        
-        # Filter to players with predictions
-        available_players = players_df[players_df['id'].isin(predictions.keys())].copy()
-        available_players['predicted_points'] = available_players['id'].map(predictions)
-        available_players['price'] = available_players['now_cost'] / 10  # Convert to millions
-        
-        # Create problem
-        prob = pulp.LpProblem("FPL_Team", pulp.LpMaximize)
-        
-        # Decision variables
-        player_vars = {}
-        for idx, row in available_players.iterrows():
-            player_vars[row['id']] = pulp.LpVariable(f"player_{row['id']}", cat='Binary')
-        
-        # Objective: maximize predicted points
-        prob += pulp.lpSum([
-            available_players[available_players['id'] == pid]['predicted_points'].iloc[0] * var
-            for pid, var in player_vars.items()
-        ])
-        
-        # Constraints
-        
-        # Budget constraint
-        prob += pulp.lpSum([
-            available_players[available_players['id'] == pid]['price'].iloc[0] * var
-            for pid, var in player_vars.items()
-        ]) <= self.budget
-        
+        self.pick_lineup = pick_lineup
+        self.starting_size = 11
+        self.starting_ranges = {
+            'GKP': (1, 1), 'DEF': (3, 5), 'MID': (2, 5), 'FWD': (1, 3)
+        }
+        self.bench_weights = (0.03, 0.02, 0.01)
+        self.prune_dominated = prune_dominated
+
+    @property
+    def blocks(self):
+        return self.LINEUP_BLOCKS if self.pick_lineup else ('squad',)
+
+    def prepare(self, players_df: pd.DataFrame, predictions: Dict[int, float],
+                outcomes: pd.DataFrame = None) -> PlayerArrays:
+        """Precompute the solver inputs for a players/predictions snapshot"""
+        return PlayerArrays(players_df, predictions, outcomes)
+
+    def parse_formation(self, formation_preference: Optional[str]) -> Dict[str, tuple]:
+        """Starting-XI bounds per position; a preference like '3-4-3' pins DEF-MID-FWD exactly"""
+        if not formation_preference or not formation_preference.strip():
+            return dict(self.starting_ranges)
+        try:
+            counts = [int(part) for part in formation_preference.strip().split('-')]
+        except ValueError:
+            counts = []
+        if len(counts) != 3 or sum(counts) != self.starting_size - 1:
+            raise ValueError(f"Invalid formation '{formation_preference}', expected e.g. '3-4-3'")
+
+        ranges = {'GKP': self.starting_ranges['GKP']}
+        for position, count in zip(['DEF', 'MID', 'FWD'], counts):
+            low, high = self.starting_ranges[position]
+            if not low <= count <= high:
+                raise ValueError(f"Formation '{formation_preference}' needs {low}-{high} {position}")
+            ranges[position] = (count, count)
+        return ranges
+
+    def objective(self, arrays: PlayerArrays, points: np.ndarray = None) -> np.ndarray:
+        """Objective coefficient per column, from arrays.points unless other per-player points are given"""
+        points = arrays.points if points is None else points
+        if not self.pick_lineup:
+            return points.copy()
+        n = len(arrays)
+        cost = np.zeros(len(self.blocks) * n)
+        cost[n:2 * n] = points        # starters score
+        cost[2 * n:3 * n] = points    # captain scores again
+        for k, weight in enumerate(self.bench_weights):
+            cost[(3 + k) * n:(4 + k) * n] = weight * points
+        return cost
+
+    def integer_columns(self, arrays: PlayerArrays) -> np.ndarray:
+        """Indices of the columns that must be integer"""
+        n = len(arrays)
+        return np.concatenate([np.arange(b * n, (b + 1) * n) for b, block in enumerate(self.blocks)
+                               if block in self.INTEGER_BLOCKS])
+
+    def column_upper(self, arrays: PlayerArrays, excluded: np.ndarray = None) -> np.ndarray:
+        """Column upper bounds: 0 for excluded players, and goalkeepers never take an outfield bench slot"""
+        n = len(arrays)
+        upper = np.ones(len(self.blocks) * n)
+        if excluded is not None:
+            upper[:n][excluded] = 0
+        if self.pick_lineup:
+            for k in range(len(self.bench_weights)):
+                upper[(3 + k) * n:(4 + k) * n][arrays.position_index['GKP']] = 0
+        return upper
+
+    def dominated(self, arrays: PlayerArrays, excluded: np.ndarray = None) -> np.ndarray:
+        """Mask of players some optimal squad does without, whatever the budget and formation.
+
+        A player is dominated by a same-position player who costs no more and
+        is predicted no lower (ties broken by id). Swapping a dominated squad
+        member for a dominator outside the squad never lowers the objective,
+        so a player with as many dominators as the position has squad places
+        can be dropped, as long as one of them is free to come in: the other
+        14 squad members fill at most 4 teams, so the dominators of the 4
+        other teams with the most of them are not counted. Excluded players
+        do not count as dominators.
+
+        Players are sorted by price, then points descending, then id: every
+        dominator of a player comes before it, and so does nobody else
+        predicted as high. Dominators are counted per team from a running
+        top `slots` of each team's predictions along that order, which is
+        all a count capped at the position's squad places needs.
+        """
+        n = len(arrays)
+        available = np.ones(n, dtype=bool) if excluded is None else ~excluded
+        n_teams = int(arrays.team_codes.max()) + 1 if n else 0
+        # Teams other than the player's own that the rest of the squad can fill
+        blocked = min((sum(self.formation.values()) - 1) // self.max_per_team, max(n_teams - 1, 0))
+        pruned = np.zeros(n, dtype=bool)
+        for position, slots in self.formation.items():
+            idx = arrays.position_index[position]
+            idx = self._dominance_order(arrays, idx[available[idx]])
+            points, teams = arrays.points[idx], arrays.team_codes[idx]
+            # per_team[j, t]: dominators of j in team t, capped at slots
+            per_team = np.zeros((len(idx), n_teams), dtype=np.int32)
+            for team in np.unique(teams):
+                members = np.flatnonzero(teams == team)
+                best, top = [], []
+                for value in points[members].tolist():
+                    bisect.insort(best, value)
+                    del best[:-slots]
+                    top.append(best + [-INF] * (slots - len(best)))
+                top = np.array(top)
+                # The team's last player strictly before each player in the order
+                last = np.searchsorted(members, np.arange(len(idx))) - 1
+                seen = np.where(last[:, None] >= 0, top[last], -INF)
+                per_team[:, team] = (seen >= points[:, None]).sum(axis=1)
+            other_teams = per_team.copy()
+            other_teams[np.arange(len(idx)), teams] = 0
+            remaining = per_team.sum(axis=1) - np.sort(other_teams, axis=1)[:, n_teams - blocked:].sum(axis=1)
+            pruned[idx[remaining >= slots]] = True
+        return pruned
+
+    def dominators(self, arrays: PlayerArrays, players: np.ndarray) -> np.ndarray:
+        """Mask of players that dominate at least one player of the players mask (see dominated())"""
+        result = np.zeros(len(arrays), dtype=bool)
+        for position in self.formation:
+            idx = self._dominance_order(arrays, arrays.position_index[position])
+            # Lowest prediction among the masked players after each player in the order
+            values = np.where(players[idx], arrays.points[idx], INF)
+            after = np.append(np.minimum.accumulate(values[::-1])[::-1][1:], INF)
+            result[idx] = arrays.points[idx] >= after
+        return result
+
+    @staticmethod
+    def _dominance_order(arrays: PlayerArrays, idx: np.ndarray) -> np.ndarray:
+        """idx sorted by price, then points descending, then id"""
+        return idx[np.lexsort((arrays.ids[idx], -arrays.points[idx], arrays.prices[idx]))]
+
+    def constraint_matrix(self, arrays: PlayerArrays, budget: float = None,
+                          formation_preference: str = None) -> ConstraintMatrix:
+        """All constraint rows in bulk; the budget row is always row 0"""
+        budget = self.budget if budget is None else budget
+        n = len(arrays)
+        everyone = np.arange(n)
+        matrix = ConstraintMatrix()
+        matrix.add_row('budget', everyone, arrays.prices, -INF, budget)
+
         # Position constraints
         for position, count in self.formation.items():
-            position_players = available_players[available_players['position_name'] == position]['id'].tolist()
-            prob += pulp.lpSum([player_vars[pid] for pid in position_players if pid in player_vars]) == count
-        
+            idx = arrays.position_index[position]
+            matrix.add_row(f"position_{position}", idx, np.ones(len(idx)), count, count)
+
         # Team constraint (max 3 from same team)
-        for team in available_players['team'].unique():
-            team_players = available_players[available_players['team'] == team]['id'].tolist()
-            prob += pulp.lpSum([player_vars[pid] for pid in team_players if pid in player_vars]) <= self.max_per_team
-        
-        # Solve
-        prob.solve(pulp.PULP_CBC_CMD(msg=0))
-        
-        # Extract solution
-        selected_players = []
-        total_cost = 0
-        total_predicted_points = 0
-        
-        for pid, var in player_vars.items():
-            if var.value() == 1:
-                player_info = available_players[available_players['id'] == pid].iloc[0]
-                selected_players.append({
-                    'id': pid,
-                    'name': player_info['web_name'],
-                    'position': player_info['position_name'],
-                    'team': player_info['team'],
-                    'price': player_info['price'],
-                    'predicted_points': predictions[pid]
-                })
-                total_cost += player_info['price']
-                total_predicted_points += predictions[pid]
-        
+        for team, idx in arrays.team_index.items():
+            matrix.add_row(f"team_{team}", idx, np.ones(len(idx)), -INF, self.max_per_team)
+
+        if not self.pick_lineup:
+            return matrix
+
+        squad, start, captain = 0, n, 2 * n
+        bench = [(3 + k) * n for k in range(len(self.bench_weights))]
+        ids = arrays.ids.tolist()
+
+        # Every outfield squad player either starts or takes exactly one bench slot;
+        # goalkeepers only need start <= squad (their bench columns are fixed at 0)
+        rows = np.tile(everyone, 2 + len(bench))
+        cols = np.concatenate([start + everyone, squad + everyone] + [b + everyone for b in bench])
+        vals = np.concatenate([np.ones(n), -np.ones(n)] + [np.ones(n)] * len(bench))
+        lower = np.where(arrays.positions == 'GKP', -INF, 0.0)
+        matrix.add_rows([f"role_{pid}" for pid in ids], rows, cols, vals, lower, 0.0)
+
+        # Captain must start
+        matrix.add_rows([f"captain_{pid}" for pid in ids], np.tile(everyone, 2),
+                        np.concatenate([captain + everyone, start + everyone]),
+                        np.concatenate([np.ones(n), -np.ones(n)]), -INF, 0.0)
+
+        matrix.add_row('starting_size', start + everyone, np.ones(n), self.starting_size, self.starting_size)
+        matrix.add_row('one_captain', captain + everyone, np.ones(n), 1, 1)
+        for k, b in enumerate(bench):
+            matrix.add_row(f"bench_slot_{k + 1}", b + everyone, np.ones(n), 1, 1)
+
+        # Starting formation
+        for position, (low, high) in self.parse_formation(formation_preference).items():
+            idx = arrays.position_index[position]
+            matrix.add_row(f"starting_{position}", start + idx, np.ones(len(idx)), low, high)
+
+        return matrix
+
+    def build_model(self, arrays: PlayerArrays, budget: float = None, formation_preference: str = None,
+                    excluded: np.ndarray = None):
+        """Build the MILP in PuLP from precomputed arrays, returning (problem, variables)"""
+        prob = pulp.LpProblem("FPL_Team", pulp.LpMaximize)
+
+        # Decision variables, one per column
+        names = [f"{block}_{pid}" for block in self.blocks for pid in arrays.ids.tolist()]
+        upper = self.column_upper(arrays, excluded).tolist()
+        integer = np.zeros(len(names), dtype=bool)
+        integer[self.integer_columns(arrays)] = True
+        variables = [pulp.LpVariable(name, lowBound=0, upBound=ub, cat='Binary' if is_int else 'Continuous')
+                     for name, ub, is_int in zip(names, upper, integer.tolist())]
+
+        # Objective: maximize predicted points
+        cost = self.objective(arrays)
+        nonzero = np.flatnonzero(cost)
+        prob += pulp.LpAffineExpression(zip([variables[i] for i in nonzero], cost[nonzero].tolist()))
+
+        matrix = self.constraint_matrix(arrays, budget, formation_preference)
+        starts, cols, vals = matrix.csr()
+        ends = np.append(starts[1:], len(cols))
+        for r, name in enumerate(matrix.names):
+            expr = pulp.LpAffineExpression(
+                zip([variables[c] for c in cols[starts[r]:ends[r]]], vals[starts[r]:ends[r]].tolist())
+            )
+            lower, upper = matrix.lower[r], matrix.upper[r]
+            if lower == upper:
+                prob += pulp.LpConstraint(expr, pulp.LpConstraintEQ, name, upper)
+                continue
+            # PuLP has no ranged rows: emit each finite side separately
+            if upper != INF:
+                prob += pulp.LpConstraint(expr, pulp.LpConstraintLE, name if lower == -INF else f"{name}_max", upper)
+            if lower != -INF:
+                prob += pulp.LpConstraint(expr, pulp.LpConstraintGE, name if upper == INF else f"{name}_min", lower)
+
+        return prob, variables
+
+    def solve_model(self, prob: pulp.LpProblem) -> int:
+        """Run CBC on a built model"""
+        return prob.solve(pulp.PULP_CBC_CMD(msg=0))
+
+    def player_record(self, arrays: PlayerArrays, i: int, predicted_points: float = None) -> Dict:
+        """API representation of one array row"""
         return {
-            'status': 'Optimal' if prob.status == pulp.LpStatusOptimal else 'Failed',
-            'players': sorted(selected_players, key=lambda x: x['position']),
+            'id': int(arrays.ids[i]),
+            'name': arrays.names[i],
+            'position': arrays.positions[i],
+            'team': arrays.teams[i].item(),
+            'price': float(arrays.prices[i]),
+            'predicted_points': float(arrays.points[i] if predicted_points is None else predicted_points)
+        }
+
+    def extract_solution(self, arrays: PlayerArrays, values: np.ndarray, status: str, budget: float = None) -> Dict:
+        """Turn a column solution vector into the API result dict"""
+        budget = self.budget if budget is None else budget
+        n = len(arrays)
+        values = np.zeros(len(self.blocks) * n) if values is None else np.asarray(values)
+        chosen = values.reshape(len(self.blocks), n) > 0.5
+        selected = np.flatnonzero(chosen[0])
+
+        selected_players = [self.player_record(arrays, i) for i in selected]
+        total_cost = float(arrays.prices[selected].sum())
+        result = {
+            'status': status,
+            'players': selected_players,
             'total_cost': round(total_cost, 1),
-            'total_predicted_points': round(total_predicted_points, 1),
-            'remaining_budget': round(self.budget - total_cost, 1)
+            'total_predicted_points': round(float(arrays.points[selected].sum()), 1),
+            'remaining_budget': round(budget - total_cost, 1)
         }
+
+        if self.pick_lineup and len(selected):
+            starters = chosen[1]
+            captain = np.flatnonzero(chosen[2])
+            bench_slot = {i: k + 1 for k in range(len(self.bench_weights)) for i in np.flatnonzero(chosen[3 + k])}
+            # Vice-captain: the best starter after the captain
+            by_points = [i for i in selected[np.argsort(-arrays.points[selected], kind='stable')] if starters[i]]
+            vice = next((i for i in by_points if i not in captain), None)
+
+            for record, i in zip(selected_players, selected):
+                record['is_starter'] = bool(starters[i])
+                record['is_captain'] = bool(i in captain)
+                record['is_vice_captain'] = bool(i == vice)
+                # Bench order: 0 is the substitute goalkeeper, 1-3 the outfield substitutes
+                record['bench_order'] = None if starters[i] else bench_slot.get(i, 0)
+
+            xi = selected[starters[selected]]
+            result['total_predicted_points'] = round(float(arrays.points[xi].sum() + arrays.points[captain].sum()), 1)
+            result['bench_predicted_points'] = round(float(arrays.points[selected].sum() - arrays.points[xi].sum()), 1)
+            result['formation'] = '-'.join(str(int((arrays.positions[xi] == pos).sum())) for pos in ['DEF', 'MID', 'FWD'])
+            result['captain_id'] = int(arrays.ids[captain[0]]) if len(captain) else None
+            result['vice_captain_id'] = int(arrays.ids[vice]) if vice is not None else None
+
+        result['players'] = sorted(selected_players, key=lambda x: x['position'])
+        return result
+
+    def optimize_team(self, players_df: pd.DataFrame, predictions: Dict[int, float],
+                      formation_preference: str = None, solver: str = None) -> Dict:
+        """Simple team optimization; solver is one of SOLVERS, by default the best available exact one"""
+        arrays = self.prepare(players_df, predictions)
+        return SquadModel(self, arrays, solver).solve(self.budget, formation_preference=formation_preference)
+
+
+class SquadModel:
+    """Squad MILP kept alive across requests for one players/predictions snapshot.
+
+    Requests only differ in budget, exclusions and formation preference, so a
+    solve moves row bounds and fixes excluded columns to zero instead of
+    rebuilding the problem. The previous optimal solution is passed back as
+    a MIP start. Backends (see SOLVERS):
+
+      - 'highs': HiGHS in-process, the default when highspy is installed
+      - 'cbc': the PuLP problem is reused and CBC is started with warmStart
+      - 'bnb': exact branch-and-bound in Python (squad_search.BranchAndBound)
+      - 'local': anytime local search bounded by latency_target, returning
+        status 'Feasible' instead of 'Optimal'
+
+    With no solver given, select_solver(latency_target) picks one.
+
+    solve_top_k() ranks alternatives by adding a no-good cut on the squad
+    columns after each solution and re-solving the same model; the cuts are
+    removed again before it returns. Dominated players are only pruned from
+    solve() and solve_frontier(): the runner-up squads may well need them.
+
+    solve_risk_adjusted() ranks squads by a risk-adjusted score of their
+    simulated gameweek totals (simulation.Simulator), solving for candidates
+    with a mean-variance objective first.
+
+    solve_frontier() walks a budget grid downwards: the squad that is optimal
+    at budget B and costs c stays optimal for every budget in [c, B], so only
+    one solve per distinct squad is needed.
+
+    Results carry 'timings', seconds per stage (filter, build, solve,
+    extract), so callers in another process can record them.
+    """
+
+    # Points given up per unit of squad price to break ties in solve_frontier; 100.0 of squad moves 0.001 points
+    FRONTIER_TIEBREAK = 1e-5
+
+    def __init__(self, optimizer: FPLOptimizer, arrays: PlayerArrays, solver: str = None,
+                 latency_target: float = None):
+        if solver is not None and solver not in SOLVERS:
+            raise ValueError(f"Unknown solver '{solver}', expected one of {', '.join(SOLVERS)}")
+        self.optimizer = optimizer
+        self.arrays = arrays
+        self.solver = solver or select_solver(latency_target)
+        self.latency_target = latency_target
+        self.matrix = optimizer.constraint_matrix(arrays)
+        self.row_index = {name: r for r, name in enumerate(self.matrix.names)}
+        self.last_values = None
+        self.last_formation = None
+        self.cuts = []
+        self._built_at = None
+        self._simulator = None
+        # Pruning without exclusions, reused by requests that exclude none of the players it relies on
+        self._pruned = optimizer.dominated(arrays) if optimizer.prune_dominated else None
+        self._pruning = optimizer.dominators(arrays, self._pruned) if optimizer.prune_dominated else None
+
+        if self.solver == 'highs':
+            self._build_highs()
+        elif self.solver == 'cbc':
+            self.prob, self.variables = optimizer.build_model(arrays)
+        elif self.solver == 'bnb':
+            self.search = BranchAndBound(optimizer, arrays)
+        else:
+            self.search = LocalSearch(optimizer, arrays, **({'time_budget': latency_target} if latency_target else {}))
+
+    def _build_highs(self):
+        n_cols = len(self.optimizer.blocks) * len(self.arrays)
+        starts, index, value = self.matrix.csr()
+
+        h = highspy.Highs()
+        h.setOptionValue('output_flag', False)
+        empty = np.array([], dtype=np.int32)
+        h.addCols(n_cols, self.optimizer.objective(self.arrays), np.zeros(n_cols),
+                  self.optimizer.column_upper(self.arrays), 0, empty, empty, np.array([]))
+        integer = self.optimizer.integer_columns(self.arrays).astype(np.int32)
+        h.changeColsIntegrality(len(integer), integer,
+                                np.full(len(integer), highspy.HighsVarType.kInteger.value, dtype=np.uint8))
+        h.changeObjectiveSense(highspy.ObjSense.kMaximize)
+
+        # Rows in CSR form, straight from the bulk constraint matrix
+        lower = np.maximum(self.matrix.lower, -highspy.kHighsInf)
+        upper = np.minimum(self.matrix.upper, highspy.kHighsInf)
+        h.addRows(len(self.matrix), lower, upper, len(index),
+                  starts.astype(np.int32), index.astype(np.int32), value)
+        self.highs = h
+
+    def _warm_start(self, excluded: np.ndarray, budget: float, formation_preference: str) -> np.ndarray:
+        """Previous solution as a start vector, or None if it is no longer feasible"""
+        if self.last_values is None or formation_preference != self.last_formation:
+            return None
+        selected = self.last_values[:len(self.arrays)] > 0.5
+        if excluded[selected].any() or self.arrays.prices[selected].sum() > budget + 1e-9:
+            return None
+        return self.last_values
+
+    def _formation_rows(self, formation_preference: str) -> Dict[str, tuple]:
+        if not self.optimizer.pick_lineup:
+            return {}
+        return {f"starting_{pos}": bounds for pos, bounds in self.optimizer.parse_formation(formation_preference).items()}
+
+    def solve(self, budget: float = None, exclude_players: Iterable[int] = (), time_limit: float = None,
+              formation_preference: str = None) -> Dict:
+        """Re-solve for a budget, exclusion list and formation, returning the optimize_team result dict"""
+        timings = {}
+        began = time.perf_counter()
+        budget = self.optimizer.budget if budget is None else budget
+        excluded, pruned = self._excluded(exclude_players)
+        formation_rows = self._formation_rows(formation_preference)
+        start = self._warm_start(excluded, budget, formation_preference)
+        timings['filter'] = time.perf_counter() - began
+
+        values, status, solve_time = self._run(budget, excluded, formation_rows, start, time_limit, timings)
+
+        if status in SOLVED:
+            self.last_values, self.last_formation = values, formation_preference
+        began = time.perf_counter()
+        result = self.optimizer.extract_solution(self.arrays, values, status, budget)
+        timings['extract'] = time.perf_counter() - began
+        result['solve_time'] = round(solve_time, 4)
+        result['pruned'] = pruned
+        result['timings'] = timings
+        return result
+
+    def solve_top_k(self, k: int, budget: float = None, exclude_players: Iterable[int] = (), time_limit: float = None,
+                    formation_preference: str = None, min_distance: int = 1) -> Dict:
+        """The k best squads, each differing from every better one in at least min_distance players"""
+        squad_size = sum(self.optimizer.formation.values())
+        if not 1 <= min_distance <= squad_size:
+            raise ValueError(f"min_distance must be between 1 and {squad_size}")
+        timings = {}
+        began = time.perf_counter()
+        budget = self.optimizer.budget if budget is None else budget
+        excluded = np.isin(self.arrays.ids, list(exclude_players))
+        formation_rows = self._formation_rows(formation_preference)
+        deadline = time.perf_counter() + time_limit if time_limit else None
+
+        solutions, status = [], 'Optimal'
+        start = self._warm_start(excluded, budget, formation_preference)
+        timings['filter'] = time.perf_counter() - began
+        timings['extract'] = 0.0
+        try:
+            for rank in range(k):
+                remaining = None if deadline is None else max(deadline - time.perf_counter(), 1e-3)
+                values, status, solve_time = self._run(budget, excluded, formation_rows, start, remaining, timings)
+                if status not in SOLVED:
+                    break
+                if rank == 0:
+                    self.last_values, self.last_formation = values, formation_preference
+                began = time.perf_counter()
+                solution = self.optimizer.extract_solution(self.arrays, values, status, budget)
+                timings['extract'] += time.perf_counter() - began
+                solution['rank'] = rank + 1
+                solution['solve_time'] = round(solve_time, 4)
+                solutions.append(solution)
+
+                # No-good cut: the next squad keeps at most squad_size - min_distance of these players
+                self._add_cut(np.flatnonzero(values[:len(self.arrays)] > 0.5), squad_size - min_distance)
+                start = None
+        finally:
+            self._remove_cuts()
+
+        return {
+            # Running out of distinct squads is not a failure once one has been found
+            'status': solutions[0]['status'] if solutions else status,
+            'solutions': solutions,
+            'requested': k,
+            'min_distance': min_distance,
+            'truncated': len(solutions) < k and status == 'TimeLimit',
+            'total_solve_time': round(sum(solution['solve_time'] for solution in solutions), 4),
+            'timings': timings,
+        }
+
+    def solve_risk_adjusted(self, k: int, budget: float = None, exclude_players: Iterable[int] = (),
+                            time_limit: float = None, formation_preference: str = None, min_distance: int = 1,
+                            risk_mode: str = 'std', risk_lambda: float = 0.5, quantile: float = 0.2,
+                            candidates: int = 5, n_scenarios: int = 20_000) -> Dict:
+        """The k best squads by a simulated risk-adjusted score: mean - risk_lambda * std, or a quantile.
+
+        The candidates are the squad with the best expected points (each
+        prediction times availability) and the top squads for expected
+        points minus gamma times variance, player variances adding up for a
+        lineup. gamma is the std penalty linearised at the first squad, with
+        a quantile taken as mean - z * std. All candidates are simulated over
+        the same n_scenarios and ranked by the exact score; each returned
+        solution carries its 'risk' summary.
+        """
+        if risk_mode not in RISK_MODES:
+            raise ValueError(f"Unknown risk mode '{risk_mode}', expected one of {', '.join(RISK_MODES)}")
+        if not self.optimizer.pick_lineup:
+            raise ValueError("Risk-adjusted ranking simulates lineups, it needs an optimizer with pick_lineup")
+        simulator = self.simulator()
+        mean, variance = simulator.moments()
+        deadline = time.perf_counter() + time_limit if time_limit else None
+        remaining = lambda: None if deadline is None else max(deadline - time.perf_counter(), 1e-3)
+
+        objective = self.optimizer.objective(self.arrays)
+        n = len(self.arrays)
+        captain = self.optimizer.blocks.index('captain')
+        try:
+            self._set_objective(self.optimizer.objective(self.arrays, mean))
+            result = self.solve_top_k(1, budget, exclude_players, remaining(), formation_preference)
+            if not result['solutions']:
+                return result
+            neutral = result['solutions'][0]
+            lineup = simulator.lineup(neutral)
+            std = np.sqrt(variance[lineup[STARTERS]].sum() + 3 * variance[lineup[CAPTAIN]])
+            z = risk_lambda if risk_mode == 'std' else -NormalDist().inv_cdf(quantile)
+            gamma = z / (2 * max(std, 1e-6))
+            penalized = self.optimizer.objective(self.arrays, mean - gamma * variance)
+            # The captain's doubled points carry four times the variance
+            penalized[captain * n:(captain + 1) * n] -= 2 * gamma * variance
+            self._set_objective(penalized)
+            result = self.solve_top_k(candidates, budget, exclude_players, remaining(), formation_preference,
+                                      min_distance)
+        finally:
+            self._set_objective(objective)
+
+        began = time.perf_counter()
+        solutions, lineups = [], []
+        for solution in [neutral] + result['solutions']:
+            lineup = simulator.lineup(solution)
+            if not any(np.array_equal(lineup, other) for other in lineups):
+                solutions.append(solution)
+                lineups.append(lineup)
+        stats = simulator.evaluate(np.array(lineups), n_scenarios, sorted({0.1, 0.5, 0.9, quantile}))
+        scores = risk_score(stats, risk_mode, risk_lambda, quantile)
+        order = np.argsort(-scores, kind='stable')[:k]
+        for rank, i in enumerate(order):
+            solutions[i]['risk'] = {'mode': risk_mode, 'candidate_rank': int(i) + 1, **summary(stats, i, scores[i])}
+            solutions[i]['rank'] = rank + 1
+        result['timings']['simulate'] = time.perf_counter() - began
+
+        result.update(status=solutions[order[0]]['status'], solutions=[solutions[i] for i in order], requested=k,
+                      candidates=len(solutions), risk_mode=risk_mode,
+                      total_solve_time=round(sum(solution['solve_time'] for solution in solutions), 4))
+        return result
+
+    def simulator(self) -> Simulator:
+        """Simulator for this model's snapshot, built on first use"""
+        if self._simulator is None:
+            minimums = {pos: low for pos, (low, _) in self.optimizer.starting_ranges.items() if pos != 'GKP'}
+            self._simulator = Simulator(self.arrays, minimums=minimums)
+        return self._simulator
+
+    def solve_frontier(self, min_budget: float, max_budget: float, step: float = 0.5,
+                       exclude_players: Iterable[int] = (), time_limit: float = None,
+                       formation_preference: str = None) -> Dict:
+        """Best predicted points at every budget from min_budget to max_budget in steps of `step`.
+
+        Returns 'points' in ascending budget order, each naming the index of
+        its squad in 'squads'; budgets too low for any squad have no squad.
+        Only the first solve can start from the model's previous solution:
+        each later budget is below the cost of the squad before it.
+        """
+        if step <= 0 or min_budget > max_budget:
+            raise ValueError("Expected min_budget <= max_budget and step > 0")
+        timings = {}
+        began = time.perf_counter()
+        count = int(np.floor((max_budget - min_budget) / step + 1e-9)) + 1
+        grid = [round(max_budget - i * step, 4) for i in range(count)]
+        excluded, pruned = self._excluded(exclude_players)
+        formation_rows = self._formation_rows(formation_preference)
+        deadline = time.perf_counter() + time_limit if time_limit else None
+        start = self._warm_start(excluded, grid[0], formation_preference)
+        timings['filter'] = time.perf_counter() - began
+        timings['extract'] = 0.0
+
+        # Among equally good squads prefer the cheapest, so each solve covers the widest budget range
+        objective = self.optimizer.objective(self.arrays)
+        tiebreak = objective.copy()
+        tiebreak[:len(self.arrays)] -= self.FRONTIER_TIEBREAK * self.arrays.prices
+        self._set_objective(tiebreak)
+
+        points, squads, status, i = [], [], 'Optimal', 0
+        try:
+            while i < len(grid):
+                remaining = None if deadline is None else max(deadline - time.perf_counter(), 1e-3)
+                values, status, solve_time = self._run(grid[i], excluded, formation_rows, start, remaining, timings)
+                if status not in SOLVED:
+                    break
+                if not squads:
+                    self.last_values, self.last_formation = values, formation_preference
+                began = time.perf_counter()
+                squad = self.optimizer.extract_solution(self.arrays, values, status, grid[i])
+                timings['extract'] += time.perf_counter() - began
+                squad['solve_time'] = round(solve_time, 4)
+                cost = float(self.arrays.prices[values[:len(self.arrays)] > 0.5].sum())
+
+                # Every budget down to the squad's cost keeps this squad optimal
+                while i < len(grid) and grid[i] >= cost - 1e-9:
+                    points.append({'budget': grid[i], 'total_predicted_points': squad['total_predicted_points'],
+                                   'total_cost': squad['total_cost'], 'squad': len(squads)})
+                    i += 1
+                squads.append(squad)
+                start = None
+        finally:
+            self._set_objective(objective)
+
+        if status == 'Failed':
+            # No squad fits this budget, so none fits a lower one either
+            points.extend({'budget': budget, 'total_predicted_points': None, 'total_cost': None, 'squad': None}
+                          for budget in grid[i:])
+        return {
+            'status': squads[0]['status'] if squads else status,
+            'points': points[::-1],
+            'squads': squads,
+            'grid_points': len(grid),
+            'solves': len(squads) + (status not in SOLVED),
+            'truncated': status == 'TimeLimit',
+            'total_solve_time': round(sum(squad['solve_time'] for squad in squads), 4),
+            'pruned': pruned,
+            'timings': timings,
+        }
+
+    def _excluded(self, exclude_players: Iterable[int]):
+        """Columns to fix at zero: the excluded players plus, when the optimizer prunes, the dominated ones"""
+        excluded = np.isin(self.arrays.ids, list(exclude_players))
+        if not self.optimizer.prune_dominated:
+            return excluded, 0
+        if excluded[self._pruning].any():
+            pruned = self.optimizer.dominated(self.arrays, excluded)
+        else:
+            pruned = self._pruned & ~excluded
+        return excluded | pruned, int(pruned.sum())
+
+    def _set_objective(self, objective: np.ndarray):
+        if self.solver == 'highs':
+            self.highs.changeColsCost(len(objective), np.arange(len(objective), dtype=np.int32), objective)
+        elif self.solver in ('bnb', 'local'):
+            self.search.set_objective(objective)
+        else:
+            nonzero = np.flatnonzero(objective)
+            self.prob.setObjective(pulp.LpAffineExpression(zip([self.variables[i] for i in nonzero],
+                                                               objective[nonzero].tolist())))
+
+    def _run(self, budget, excluded, formation_rows, start, time_limit, timings=None):
+        """Update and solve the model; build (bound updates) and solve seconds accumulate into timings"""
+        began = time.perf_counter()
+        if self.solver == 'highs':
+            values, status = self._solve_highs(budget, excluded, formation_rows, start, time_limit)
+        elif self.solver == 'cbc':
+            values, status = self._solve_cbc(budget, excluded, formation_rows, start, time_limit)
+        else:
+            values, status = self._solve_search(budget, excluded, formation_rows, start, time_limit)
+        ended = time.perf_counter()
+        if timings is not None:
+            timings['build'] = timings.get('build', 0.0) + self._built_at - began
+            timings['solve'] = timings.get('solve', 0.0) + ended - self._built_at
+        return values, status, ended - began
+
+    def _add_cut(self, selected: np.ndarray, upper: int):
+        if self.solver == 'highs':
+            self.highs.addRow(-highspy.kHighsInf, upper, len(selected), selected.astype(np.int32), np.ones(len(selected)))
+        elif self.solver == 'cbc':
+            self.prob += pulp.LpConstraint(pulp.LpAffineExpression((self.variables[i], 1) for i in selected.tolist()),
+                                           pulp.LpConstraintLE, f"nogood_{len(self.cuts)}", upper)
+        self.cuts.append((selected, upper))
+
+    def _remove_cuts(self):
+        if not self.cuts:
+            return
+        if self.solver == 'highs':
+            # Cuts are always the last rows of the model
+            rows = np.arange(len(self.matrix), len(self.matrix) + len(self.cuts), dtype=np.int32)
+            self.highs.deleteRows(len(rows), rows)
+        elif self.solver == 'cbc':
+            for r in range(len(self.cuts)):
+                del self.prob.constraints[f"nogood_{r}"]
+        self.cuts = []
+
+    def _solve_highs(self, budget, excluded, formation_rows, start, time_limit=None):
+        h = self.highs
+        n_cols = len(self.optimizer.blocks) * len(self.arrays)
+        h.setOptionValue('time_limit', float(time_limit) if time_limit else highspy.kHighsInf)
+        h.changeColsBounds(n_cols, np.arange(n_cols, dtype=np.int32), np.zeros(n_cols),
+                           self.optimizer.column_upper(self.arrays, excluded))
+        h.changeRowBounds(0, -highspy.kHighsInf, budget)
+        for name, (low, high) in formation_rows.items():
+            h.changeRowBounds(self.row_index[name], low, high)
+        if start is not None:
+            h.setSolution(n_cols, np.arange(n_cols, dtype=np.int32), start)
+        self._built_at = time.perf_counter()
+        h.run()
+
+        model_status = h.getModelStatus()
+        if model_status == highspy.HighsModelStatus.kTimeLimit:
+            return None, 'TimeLimit'
+        if model_status != highspy.HighsModelStatus.kOptimal:
+            return None, 'Failed'
+        return np.asarray(h.getSolution().col_value), 'Optimal'
+
+    def _solve_cbc(self, budget, excluded, formation_rows, start, time_limit=None):
+        for var, upper in zip(self.variables, self.optimizer.column_upper(self.arrays, excluded).tolist()):
+            var.upBound = upper
+        self.prob.constraints['budget'].constant = -budget
+        for name, (low, high) in formation_rows.items():
+            # Ranged rows were emitted as a _min/_max pair (or one equality for the goalkeeper)
+            if name in self.prob.constraints:
+                self.prob.constraints[name].constant = -high
+            else:
+                self.prob.constraints[f"{name}_min"].constant = -low
+                self.prob.constraints[f"{name}_max"].constant = -high
+        if start is not None:
+            for var, value in zip(self.variables, start.tolist()):
+                var.setInitialValue(value)
+        self._built_at = time.perf_counter()
+        self.prob.solve(pulp.PULP_CBC_CMD(msg=0, warmStart=start is not None, timeLimit=time_limit))
+
+        if self.prob.status == pulp.LpStatusOptimal and self.prob.sol_status == pulp.LpSolutionIntegerFeasible:
+            return None, 'TimeLimit'
+        if self.prob.status != pulp.LpStatusOptimal:
+            return None, 'Failed'
+        return np.array([var.value() or 0 for var in self.variables]), 'Optimal'
+
+    def _solve_search(self, budget, excluded, formation_rows, start, time_limit=None):
+        # The in-process backends take the cuts and starting bounds as they are; there is nothing to update
+        starting_ranges = {name[len('starting_'):]: bounds for name, bounds in formation_rows.items()}
+        self._built_at = time.perf_counter()
+        return self.search.solve(budget, excluded, starting_ranges, self.cuts, start, time_limit)
@@ -0,0 +1,216 @@
+import time
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+import pulp
+
+from optimizer import FPLOptimizer, PlayerArrays, POSITIONS, highspy
+
+# Seconds a plan may take unless the caller sets its own limit
+PLAN_TIME_LIMIT = 30.0
+
+# Fixture columns the planner reads
+FIXTURE_COLUMNS = ['id', 'event', 'finished', 'team_h', 'team_a', 'team_h_difficulty', 'team_a_difficulty']
+
+
+def fixture_multipliers(teams: np.ndarray, fixtures_df: pd.DataFrame, start_gameweek: int, horizon: int,
+                        difficulty_weight: float = 0.1) -> np.ndarray:
+    """(players, horizon) scale on a per-match prediction: 0 for a blank, summed over a double"""
+    if fixtures_df is None or fixtures_df.empty:
+        return np.ones((len(teams), horizon))
+
+    events = list(range(start_gameweek, start_gameweek + horizon))
+    fixtures = fixtures_df[fixtures_df['event'].isin(events)]
+    matches = pd.concat([
+        pd.DataFrame({'team': fixtures['team_h'], 'event': fixtures['event'], 'difficulty': fixtures['team_h_difficulty']}),
+        pd.DataFrame({'team': fixtures['team_a'], 'event': fixtures['event'], 'difficulty': fixtures['team_a_difficulty']}),
+    ])
+    # Difficulty 3 is neutral; each step easier or harder moves the expectation by difficulty_weight
+    matches['multiplier'] = 1 + difficulty_weight * (3 - matches['difficulty'])
+    table = matches.pivot_table(index='team', columns='event', values='multiplier', aggfunc='sum')
+    return table.reindex(index=teams, columns=events).fillna(0).to_numpy()
+
+
+class TransferPlanner:
+    """Multi-gameweek transfer planning for an existing squad.
+
+    Solves one MILP over the horizon with squad, buy and sell binaries per
+    candidate and gameweek, integer free-transfer and hit variables, and a
+    continuous bank. Free transfers bank at one per gameweek up to
+    max_free_transfers; a gameweek uses all of its free transfers before
+    any transfer costs hit_cost points. Players are bought and sold at
+    their current price, so a player sold in one gameweek can be bought
+    back in a later one.
+
+    Only a candidate subset gets variables: the current squad plus the best
+    players per position by horizon points and by points per million, so
+    the model stays small as the horizon grows.
+    """
+
+    def __init__(self, optimizer: FPLOptimizer, hit_cost: float = 4.0, max_free_transfers: int = 5,
+                 candidates_per_position: int = 30, time_limit: float = PLAN_TIME_LIMIT):
+        self.optimizer = optimizer
+        self.hit_cost = hit_cost
+        self.max_free_transfers = max_free_transfers
+        self.candidates_per_position = candidates_per_position
+        self.time_limit = time_limit
+
+    def gameweek_points(self, arrays: PlayerArrays, fixtures_df: pd.DataFrame, start_gameweek: int, horizon: int) -> np.ndarray:
+        """Per-gameweek expected points, the snapshot prediction scaled by fixtures"""
+        return arrays.points[:, None] * fixture_multipliers(arrays.teams, fixtures_df, start_gameweek, horizon)
+
+    def candidates(self, arrays: PlayerArrays, points: np.ndarray, squad_idx: np.ndarray) -> np.ndarray:
+        """Array rows that get decision variables"""
+        total = points.sum(axis=1)
+        value = total / arrays.prices
+        keep = set(squad_idx.tolist())
+        for position in POSITIONS:
+            idx = arrays.position_index[position]
+            keep.update(idx[np.argsort(-total[idx], kind='stable')[:self.candidates_per_position]].tolist())
+            keep.update(idx[np.argsort(-value[idx], kind='stable')[:self.candidates_per_position // 3]].tolist())
+        return np.array(sorted(keep))
+
+    def _squad_index(self, arrays: PlayerArrays, current_squad: Iterable[int]) -> np.ndarray:
+        current_squad = list(current_squad)
+        position_of = dict(zip(arrays.ids.tolist(), range(len(arrays))))
+        missing = [pid for pid in current_squad if pid not in position_of]
+        if missing:
+            raise ValueError(f"Squad players without predictions: {missing}")
+        squad_idx = np.array([position_of[pid] for pid in current_squad])
+
+        counts = pd.Series(arrays.positions[squad_idx]).value_counts().to_dict()
+        if len(set(current_squad)) != sum(self.optimizer.formation.values()) or \
+                any(counts.get(pos, 0) != count for pos, count in self.optimizer.formation.items()):
+            raise ValueError(f"Current squad must be {self.optimizer.formation}, got {counts}")
+        return squad_idx
+
+    def plan(self, arrays: PlayerArrays, points: np.ndarray, current_squad: Iterable[int], bank: float = 0.0,
+             free_transfers: int = 1, start_gameweek: int = 1, time_limit: float = None) -> Dict:
+        """Plan transfers over points.shape[1] gameweeks, returning a per-gameweek plan"""
+        squad_idx = self._squad_index(arrays, current_squad)
+        cand = self.candidates(arrays, points, squad_idx)
+        horizon = points.shape[1]
+        owned = np.isin(cand, squad_idx)
+        prices = arrays.prices[cand].tolist()
+        cand_ids = arrays.ids[cand].tolist()
+
+        prob = pulp.LpProblem("FPL_Transfer_Plan", pulp.LpMaximize)
+        squad, buy, sell = {}, {}, {}
+        for t in range(horizon):
+            for j, pid in enumerate(cand_ids):
+                squad[j, t] = pulp.LpVariable(f"squad_{pid}_{t}", cat='Binary')
+                sell[j, t] = pulp.LpVariable(f"sell_{pid}_{t}", cat='Binary')
+                buy[j, t] = pulp.LpVariable(f"buy_{pid}_{t}", cat='Binary')
+
+        free = [pulp.LpVariable(f"free_transfers_{t}", lowBound=1, upBound=self.max_free_transfers, cat='Integer')
+                for t in range(1, horizon)]
+        free_used = [pulp.LpVariable(f"free_used_{t}", lowBound=0, upBound=self.max_free_transfers, cat='Integer')
+                     for t in range(horizon)]
+        hits = [pulp.LpVariable(f"hits_{t}", lowBound=0, cat='Integer') for t in range(horizon)]
+        # 1 in gameweeks that take hits, which must first use up every free transfer
+        capped = [pulp.LpVariable(f"capped_{t}", cat='Binary') for t in range(horizon)]
+        squad_size = sum(self.optimizer.formation.values())
+        banks = [pulp.LpVariable(f"bank_{t}", lowBound=0) for t in range(horizon)]
+
+        # Objective: squad points minus hits; the tiny free-transfer term only makes banking explicit
+        objective = [(squad[j, t], float(points[i, t])) for t in range(horizon) for j, i in enumerate(cand)]
+        objective += [(h, -self.hit_cost) for h in hits] + [(f, 1e-4) for f in free]
+        prob += pulp.LpAffineExpression(objective)
+
+        for t in range(horizon):
+            # Squad flow: kept = previous + bought - sold
+            for j in range(len(cand)):
+                flow = [(squad[j, t], 1), (sell[j, t], 1), (buy[j, t], -1)]
+                if t > 0:
+                    flow.append((squad[j, t - 1], -1))
+                prob += pulp.LpConstraint(pulp.LpAffineExpression(flow), pulp.LpConstraintEQ,
+                                          f"flow_{cand_ids[j]}_{t}", int(owned[j]) if t == 0 else 0)
+                # Selling and buying back in the same gameweek would only spend a transfer
+                prob += pulp.LpConstraint(buy[j, t] + sell[j, t], pulp.LpConstraintLE, f"swap_{cand_ids[j]}_{t}", 1)
+
+            # Bank carries over, plus sales minus purchases
+            cash = [(banks[t], 1)] + [(sell[j, t], -prices[j]) for j in range(len(cand))]
+            cash += [(buy[j, t], prices[j]) for j in range(len(cand))]
+            if t > 0:
+                cash.append((banks[t - 1], -1))
+            prob += pulp.LpConstraint(pulp.LpAffineExpression(cash), pulp.LpConstraintEQ,
+                                      f"bank_{t}", float(bank) if t == 0 else 0)
+
+            # Transfers are free up to the banked count, hits beyond that
+            moves = [(buy[j, t], 1) for j in range(len(cand))]
+            moves += [(free_used[t], -1), (hits[t], -1)]
+            prob += pulp.LpConstraint(pulp.LpAffineExpression(moves), pulp.LpConstraintEQ, f"transfers_{t}", 0)
+            available = free[t - 1] if t > 0 else free_transfers
+            prob += pulp.LpConstraint(free_used[t] - available, pulp.LpConstraintLE, f"free_used_{t}", 0)
+            # Otherwise saving a free transfer for later and taking a hit now would tie with using it now
+            prob += pulp.LpConstraint(hits[t] - squad_size * capped[t], pulp.LpConstraintLE, f"hits_{t}", 0)
+            prob += pulp.LpConstraint(free_used[t] - available - self.max_free_transfers * capped[t],
+                                      pulp.LpConstraintGE, f"free_first_{t}", -self.max_free_transfers)
+            if t + 1 < horizon:
+                # Next week's free transfers: unused ones roll over, plus one new
+                prob += pulp.LpConstraint(free[t] + free_used[t] - available, pulp.LpConstraintLE, f"free_roll_{t}", 1)
+
+            # Squad composition every gameweek
+            for position, count in self.optimizer.formation.items():
+                members = np.flatnonzero(arrays.positions[cand] == position)
+                prob += pulp.LpConstraint(pulp.LpAffineExpression((squad[j, t], 1) for j in members),
+                                          pulp.LpConstraintEQ, f"position_{position}_{t}", count)
+            for team in np.unique(arrays.teams[cand]).tolist():
+                members = np.flatnonzero(arrays.teams[cand] == team)
+                prob += pulp.LpConstraint(pulp.LpAffineExpression((squad[j, t], 1) for j in members),
+                                          pulp.LpConstraintLE, f"team_{team}_{t}", self.optimizer.max_per_team)
+
+        time_limit = self.time_limit if time_limit is None else time_limit
+        if highspy is not None:
+            solver = pulp.HiGHS(msg=False, timeLimit=time_limit)
+        else:
+            solver = pulp.PULP_CBC_CMD(msg=0, timeLimit=time_limit)
+        start = time.perf_counter()
+        prob.solve(solver)
+        solve_time = time.perf_counter() - start
+
+        result = {
+            'status': self._status(prob),
+            'start_gameweek': start_gameweek,
+            'horizon': horizon,
+            'candidates': len(cand),
+            'variables': len(prob.variables()),
+            'constraints': len(prob.constraints),
+            'solve_time': round(solve_time, 3),
+        }
+        if result['status'] == 'Failed':
+            return result
+
+        def chosen(var):
+            return var is not None and (var.value() or 0) > 0.5
+
+        gameweeks = []
+        for t in range(horizon):
+            in_squad = [j for j in range(len(cand)) if chosen(squad[j, t])]
+            gameweeks.append({
+                'gameweek': start_gameweek + t,
+                'transfers_in': [self.optimizer.player_record(arrays, cand[j], points[cand[j], t])
+                                 for j in range(len(cand)) if chosen(buy[j, t])],
+                'transfers_out': [self.optimizer.player_record(arrays, cand[j], points[cand[j], t])
+                                  for j in range(len(cand)) if chosen(sell[j, t])],
+                'free_transfers': int(round(free[t - 1].value() or 0)) if t > 0 else int(free_transfers),
+                'hits': int(round(hits[t].value() or 0)),
+                'hit_cost': round((hits[t].value() or 0) * self.hit_cost, 1),
+                'bank': round(banks[t].value() or 0, 1),
+                'expected_points': round(float(points[cand[in_squad], t].sum()), 1),
+                'squad': [self.optimizer.player_record(arrays, cand[j], points[cand[j], t]) for j in in_squad],
+            })
+
+        result['gameweeks'] = gameweeks
+        result['total_expected_points'] = round(sum(gw['expected_points'] for gw in gameweeks), 1)
+        result['total_hit_cost'] = round(sum(gw['hit_cost'] for gw in gameweeks), 1)
+        result['net_points'] = round(result['total_expected_points'] - result['total_hit_cost'], 1)
+        return result
+
+    @staticmethod
+    def _status(prob: pulp.LpProblem) -> str:
+        if prob.status != pulp.LpStatusOptimal:
+            return 'Failed'
+        # A time-limited solve still returns its best plan
+        return 'Optimal' if prob.sol_status == pulp.LpSolutionOptimal else 'TimeLimit'
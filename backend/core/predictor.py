@@ -1,69 +1,89 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 import joblib
+import json
 import os
 
+from features import FEATURE_COLUMNS, STATS, FeatureEngine, next_gameweek
+from inference import CompiledPredictor
+from training import PositionTrainer
+
 class SimplePredictor:
+    # Columns create_features reads from the player and gameweek tables
+    PLAYER_COLUMNS = ['id', 'team', 'total_points', 'now_cost', 'element_type']
+    GAMEWEEK_COLUMNS = ['player_id', 'fixture', 'round', *STATS]
+    
     def __init__(self):
-        self.model = RandomForestRegressor(n_estimators=50, random_state=42)
+        # One model per element_type, fit by PositionTrainer
+        self.models = {}
+        self.training_metrics = None
+        # Array form of self.models for predict(), compiled on first use after training
+        self.compiled = None
         self.feature_cols = None
+        # Keeps its per-player window buffers, so a refresh with one new gameweek only computes that round
+        self.engine = FeatureEngine()
         self.backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.models_dir = os.path.join(self.backend_dir, '..', 'models')
         os.makedirs(self.models_dir, exist_ok=True)
     
-    def create_features(self, players_df, gameweeks_df, fixtures_df=None):
-        """BASIC features that actually work"""
-        # Just use the player's current data - no complex aggregations
-        features = players_df[['id', 'total_points', 'now_cost', 'form', 'selected_by_percent', 'element_type']].copy()
-        
-        # Simple target: just normalize total points to 0-10 scale
-        features['target'] = (features['total_points'] / features['total_points'].max() * 10).fillna(3)
-        
-        # Basic position encoding
-        features = pd.get_dummies(features, columns=['element_type'])
-        features = features.fillna(3)  # Default 3 points prediction
-        
+    def training_features(self, players_df, gameweeks_df, fixtures_df=None):
+        """One row per player per round played: rolling features from the rounds before it, target = its points"""
+        rounds = self.engine.sync(gameweeks_df, fixtures_df, players_df)
+        players = players_df[['id', 'now_cost', 'element_type']].rename(columns={'id': 'player_id'})
+        features = rounds.merge(players, on='player_id', how='inner')
+        # Incremental updates append rounds at the end; the fit sees the order a full build gives
+        features = features.sort_values(['player_id', 'round'], kind='stable', ignore_index=True)
+        features['target'] = features['points']
         return features
     
-    def train(self, features_df):
-        """BASIC training"""
+    def create_features(self, players_df, gameweeks_df, fixtures_df=None):
+        """One row per player with the rolling features for the next gameweek"""
+        self.engine.sync(gameweeks_df, fixtures_df, players_df)
+        features = players_df[self.PLAYER_COLUMNS].copy().reset_index(drop=True)
+        upcoming = self.engine.upcoming(features['id'], next_gameweek(fixtures_df))
+        return pd.concat([features, upcoming[FEATURE_COLUMNS]], axis=1)
+    
+    def train(self, features_df, trainer=None):
+        """Fits per-round points on the rolling features, one model per position"""
         if len(features_df) < 10:
             print("Not enough data")
             return
             
-        self.feature_cols = ['total_points', 'now_cost', 'form', 'selected_by_percent']
+        # element_type lets the pooled model of thin positions tell them apart
+        self.feature_cols = ['now_cost', 'element_type', *FEATURE_COLUMNS]
+        trainer = trainer or PositionTrainer.from_env()
+        self.models, self.training_metrics = trainer.fit(features_df, self.feature_cols)
+        self.compiled = CompiledPredictor(self.models)
+        print(f"Trained {len(self.models)} position models on {len(features_df)} player rounds "
+              f"in {self.training_metrics['train_seconds']:.2f}s ({self.training_metrics['workers']} workers)")
         
-        # Add position columns if they exist
-        for col in features_df.columns:
-            if col.startswith('element_type_'):
-                self.feature_cols.append(col)
-        
-        X = features_df[self.feature_cols].fillna(0)
-        y = features_df['target']
-        
-        self.model.fit(X, y)
-        print(f"Trained on {len(X)} players")
-        
-        # Save
+        # Save the models, and their metrics where they can be read without unpickling
         joblib.dump(self, os.path.join(self.models_dir, 'simple_predictor.pkl'))
+        with open(os.path.join(self.models_dir, 'training_metrics.json'), 'w') as f:
+            json.dump(self.training_metrics, f, indent=2)
         
     def predict(self, features_df):
-        """BASIC predictions that make sense"""
-        if self.feature_cols is None:
-            # Fallback: return reasonable predictions based on total points
-            return (features_df['total_points'] / features_df['total_points'].max() * 8).fillna(3).clip(1, 10)
-        
-        # Ensure columns exist
-        for col in self.feature_cols:
-            if col not in features_df.columns:
-                features_df[col] = 0
+        """Each player's position model; players without one keep the total-points fallback"""
+        # Fallback: return reasonable predictions based on total points
+        preds = (features_df['total_points'] / features_df['total_points'].max() * 8).fillna(3).clip(1, 10)
+        if not self.models:
+            return preds
         
-        X = features_df[self.feature_cols].fillna(0)
-        preds = self.model.predict(X)
+        if getattr(self, 'compiled', None) is None:
+            self.compiled = CompiledPredictor(self.models)
+        preds = preds.to_numpy(dtype=np.float64, copy=True)
+        self.compiled.predict(self.feature_matrix(features_df), features_df['element_type'].to_numpy(), preds)
         
         # Force realistic predictions (1-10 points)
         return np.clip(preds, 1, 10)
-
-
-
+    
+    def feature_matrix(self, features_df, out=None):
+        """float32 (rows, feature_cols) matrix, filled into out when given; missing columns and NaNs become 0"""
+        if out is None:
+            out = np.empty((len(features_df), len(self.feature_cols)), dtype=np.float32)
+        for j, col in enumerate(self.feature_cols):
+            if col in features_df.columns:
+                out[:, j] = features_df[col].to_numpy(dtype=np.float32, na_value=0.0)
+            else:
+                out[:, j] = 0.0
+        return out
@@ -0,0 +1,281 @@
+import asyncio
+import copy
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+import pandas as pd
+
+from data_collector import SimpleFPLCollector
+from metrics import REGISTRY, STAGE_SECONDS
+from serving_table import ServingTable
+from snapshot import ServingSnapshot, snapshot_key
+
+REFRESH_JOBS = REGISTRY.counter('fpl_refresh_jobs_total', "Refresh jobs by outcome", ('outcome',))
+
+# Progress queue of the refresh worker, and whether it runs in its own process; set once by _init_worker
+_progress = None
+_in_process = False
+
+
+def _init_worker(progress, in_process: bool = False):
+    global _progress, _in_process
+    _progress = progress
+    _in_process = in_process
+
+
+def report(job_id: int, stage: str, done: int = None, total: int = None):
+    """Send a job's current stage (and how far into it) to the scheduler; a no-op outside a refresh worker"""
+    if _progress is not None:
+        _progress.put((job_id, stage, done, total))
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], job_id: int, stage: str):
+    report(job_id, stage)
+    started = time.perf_counter()
+    yield
+    timings[stage] = time.perf_counter() - started
+
+
+class ServingState:
+    """Everything the API serves for one data version: players, fixtures, snapshot, solver arrays and read tables.
+
+    Built in full before it is published and not modified afterwards, so a
+    handler that takes the published reference once sees players,
+    predictions and derived tables that belong together, however many
+    refreshes happen while it runs. data_version is assigned on publishing.
+    """
+
+    def __init__(self, players: pd.DataFrame, fixtures: pd.DataFrame, snapshot: ServingSnapshot, optimizer):
+        self.players = players
+        self.fixtures = fixtures
+        self.snapshot = snapshot
+        self.predictor = snapshot.predictor
+        self.predictions = snapshot.predictions
+        self.arrays = optimizer.prepare(players, self.predictions, snapshot.outcomes)
+        # Its version follows the snapshot key, so ETags stay valid across restarts on the same data
+        self.table = ServingTable(players, self.predictions, snapshot.key[:16], snapshot.outcomes)
+        self.data_version = 0
+        self.created_at = time.time()
+
+
+def refresh_pipeline(job_id: int, predictor, optimizer, snapshot_path: str, max_players: int = 300):
+    """Collect fresh data, retrain, predict and build the next ServingState; returns (state, seconds per stage, metrics).
+
+    Only players with newly finished fixtures are re-fetched. predictor is
+    the one currently serving: its feature buffers are carried over, so
+    only the new rounds' features are computed, and its models are refit on
+    them (PositionTrainer's memory ceiling keeps that inside the refresh
+    window). The saved snapshot is what a cold boot on this data would
+    build. metrics is what the worker process recorded in its REGISTRY
+    (Registry.export), for the API process to merge; empty when the
+    pipeline runs in the API process itself.
+    """
+    if not _in_process:
+        # In the API process the serving predictor is shared with request handlers, so work on a copy
+        predictor = copy.deepcopy(predictor)
+    timings = {}
+    collector = SimpleFPLCollector()
+    with _timed(timings, job_id, 'players'):
+        players = collector.get_all_data()
+    with _timed(timings, job_id, 'fixtures'):
+        fixtures = collector.get_fixtures()
+    with _timed(timings, job_id, 'histories'):
+        gameweeks = collector.update_player_history(
+            max_players=max_players, fixtures=fixtures,
+            progress=lambda done, total: report(job_id, 'histories', done, total))
+    with _timed(timings, job_id, 'snapshot'):
+        snapshot = ServingSnapshot.build(snapshot_key(collector.store), players, gameweeks, fixtures, predictor)
+        snapshot.save(snapshot_path)
+    with _timed(timings, job_id, 'serving'):
+        state = ServingState(players, fixtures, snapshot, optimizer)
+    return state, timings, REGISTRY.export(reset=True) if _in_process else []
+
+
+class RefreshJob:
+    """One run of the refresh pipeline, as reported by the status endpoint"""
+
+    def __init__(self, job_id: int, trigger: str):
+        self.id = job_id
+        self.trigger = trigger
+        self.state = 'queued'
+        self.stage = None
+        self.done = None
+        self.total = None
+        self.error = None
+        self.timings = {}
+        self.data_version = None
+        self.task = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ('succeeded', 'failed')
+
+    def info(self) -> Dict:
+        return {
+            'id': self.id,
+            'trigger': self.trigger,
+            'state': self.state,
+            'stage': self.stage,
+            'progress': {'done': self.done, 'total': self.total} if self.total else None,
+            'error': self.error,
+            'data_version': self.data_version,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'seconds': round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None,
+            'timings': {stage: round(seconds, 3) for stage, seconds in self.timings.items()},
+        }
+
+
+class RefreshScheduler:
+    """Runs the data refresh in a background worker and publishes the result in a single swap.
+
+    trigger() starts a job, or returns the one already queued or running;
+    with an interval (seconds), start() also triggers one every interval.
+    The pipeline (refresh_pipeline) runs in a spawned worker process, so the
+    HTTP calls, feature building and prediction neither block the event
+    loop nor hold the GIL the request handlers need; with workers=0 it runs
+    in a background thread of the API process instead. Progress comes back
+    over a queue as the job's stage and done/total counts, and the metrics
+    the worker recorded come back with the result.
+
+    The pipeline's result goes to prepare(result) in a thread, for work that
+    must happen in the API process before serving (starting solver workers),
+    and then to publish(prepared) on the event loop thread, where no request
+    handler runs until it returns. A failed job leaves the served state as
+    it was.
+    """
+
+    def __init__(self, pipeline: Callable, args: Callable[[], tuple], prepare: Callable, publish: Callable,
+                 interval: float = None, workers: int = 1, history: int = 20):
+        self.pipeline = pipeline
+        self.args = args
+        self.prepare = prepare
+        self.publish = publish
+        self.interval = interval or None
+        self.workers = workers
+        self.history = history
+        self.jobs = OrderedDict()
+        self.current = None
+        self._ids = itertools.count(1)
+        self._progress = multiprocessing.get_context('spawn').Queue()
+        self._executor = None
+        self._scheduler = None
+
+    @classmethod
+    def from_env(cls, pipeline: Callable, args: Callable[[], tuple], prepare: Callable, publish: Callable):
+        """Scheduler configured from FPL_REFRESH_INTERVAL (seconds, unset or 0 for manual only) and FPL_REFRESH_WORKERS"""
+        return cls(pipeline, args, prepare, publish,
+                   interval=float(os.environ.get('FPL_REFRESH_INTERVAL', 0)),
+                   workers=int(os.environ.get('FPL_REFRESH_WORKERS', 1)))
+
+    def start(self):
+        """Begin triggering a refresh every interval seconds, if an interval is set"""
+        if self.interval and self._scheduler is None:
+            self._scheduler = asyncio.create_task(self._schedule())
+
+    def trigger(self, trigger: str = 'manual') -> RefreshJob:
+        """Start a refresh job, unless one is queued or running already: then that job"""
+        if self.current is not None and not self.current.finished:
+            return self.current
+        job = RefreshJob(next(self._ids), trigger)
+        self.jobs[job.id] = job
+        while len(self.jobs) > self.history:
+            self.jobs.popitem(last=False)
+        self.current = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    async def _schedule(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            job = self.trigger('scheduled')
+            await asyncio.shield(job.task)
+
+    def _worker(self):
+        if self._executor is None:
+            if self.workers == 0:
+                _init_worker(self._progress)
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='refresh')
+            else:
+                self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_init_worker, initargs=(self._progress, True))
+        return self._executor
+
+    def _drain(self):
+        """Apply the progress reports queued by the worker"""
+        while True:
+            try:
+                job_id, stage, done, total = self._progress.get_nowait()
+            except queue.Empty:
+                return
+            job = self.jobs.get(job_id)
+            if job is not None and not job.finished:
+                job.stage, job.done, job.total = stage, done, total
+
+    async def _run(self, job: RefreshJob):
+        loop = asyncio.get_running_loop()
+        job.state = 'running'
+        job.started_at = time.time()
+        print(f"🔄 Refresh job {job.id} started ({job.trigger})")
+        try:
+            future = loop.run_in_executor(self._worker(), self.pipeline, job.id, *self.args())
+            while not future.done():
+                await asyncio.wait([future], timeout=0.25)
+                self._drain()
+            result, job.timings, metrics = future.result()
+            REGISTRY.merge(metrics)
+
+            job.stage, job.done, job.total = 'prepare', None, None
+            started = time.perf_counter()
+            prepared = await asyncio.to_thread(self.prepare, result)
+            job.timings['prepare'] = time.perf_counter() - started
+
+            job.stage = 'publish'
+            job.data_version = self.publish(prepared)
+            job.state = 'succeeded'
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # The worker died; the next job starts a fresh one
+                self._executor = None
+            job.state = 'failed'
+            job.error = f"{type(e).__name__}: {e}"
+            print(f"❌ Refresh job {job.id} failed at {job.stage}: {job.error}")
+        finally:
+            job.finished_at = time.time()
+            REFRESH_JOBS.inc(outcome=job.state)
+        for stage, seconds in job.timings.items():
+            STAGE_SECONDS.observe(seconds, pipeline='refresh', stage=stage)
+        if job.state == 'succeeded':
+            print(f"✅ Refresh job {job.id} published data version {job.data_version} "
+                  f"in {job.finished_at - job.started_at:.1f}s")
+
+    def stats(self) -> Dict:
+        last_success = next((job for job in reversed(self.jobs.values()) if job.state == 'succeeded'), None)
+        return {
+            'interval': self.interval,
+            'workers': self.workers,
+            'running': self.current.info() if self.current is not None and not self.current.finished else None,
+            'last_success': last_success.info() if last_success else None,
+            'jobs': [job.info() for job in reversed(self.jobs.values())],
+        }
+
+    def shutdown(self):
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            self._scheduler = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
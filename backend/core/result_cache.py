@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Iterable, Optional
+
+
+class OptimizationCache:
+    """LRU cache with a TTL for optimization results.
+
+    Keys are built from the normalized request plus the data version, so a
+    refresh makes every old entry unreachable; clear() also frees them.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 900.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(data_version: int, budget: float, exclude_players: Iterable[int],
+                 formation_preference: Optional[str] = None, **options) -> Hashable:
+        """Normalize a request so equivalent requests share one entry.
+
+        The budget is kept exact: responses report the request's own
+        remaining_budget, and a rounded key would hand 99.96 the squad and
+        remaining budget solved for 100.0.
+        """
+        return (
+            data_version,
+            float(budget),
+            tuple(sorted(set(int(pid) for pid in exclude_players))),
+            (formation_preference or '').strip() or None,
+            tuple(sorted(options.items())),
+        )
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -0,0 +1,166 @@
+import base64
+import binascii
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import orjson
+import pandas as pd
+
+from encoding import dumps, frame_records, json_array
+
+TOP_PLAYER_COLUMNS = ['id', 'web_name', 'team', 'now_cost', 'total_points',
+                      'predicted_points', 'value', 'form', 'form_score']
+
+# /api/players columns when no fields= are requested
+DEFAULT_FIELDS = ['id', 'web_name', 'first_name', 'second_name', 'team', 'position_name', 'status',
+                  'now_cost', 'price', 'total_points', 'form', 'selected_by_percent',
+                  'predicted_points', 'value', 'prediction_confidence']
+
+
+def encode_cursor(version: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(dumps({'v': version, 'o': offset})).decode()
+
+
+def decode_cursor(cursor: str, version: str) -> int:
+    """Row offset of a cursor; raises ValueError if it is malformed or from another data version"""
+    try:
+        state = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        offset = int(state['o'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if state.get('v') != version or offset < 0:
+        raise ValueError("Cursor is from an older data version, restart from the first page")
+    return offset
+
+
+class ServingTable:
+    """Read-side view of one data/prediction version, built once in publish_data().
+
+    Derived columns (predicted_points, value, prediction_confidence, price,
+    form_score) are materialized, every cell is pre-encoded as JSON, players
+    are indexed per position in descending predicted_points order and the
+    position aggregates are computed up front. The read endpoints then only
+    filter, slice and join bytes. `version` identifies the data the table
+    was built from; it is embedded in ETags and pagination cursors. With
+    outcomes (simulation.fit_outcomes), prediction_confidence is the chance
+    the player plays, availability times appearance rate.
+    """
+
+    def __init__(self, players_df: pd.DataFrame, predictions: Dict[int, float], version: str = '',
+                 outcomes: Optional[pd.DataFrame] = None):
+        start = time.perf_counter()
+        df = players_df.reset_index(drop=True).copy()
+        df['predicted_points'] = df['id'].map(predictions).fillna(0).astype(float)
+        df['price'] = df['now_cost'] / 10
+        df['value'] = (df['predicted_points'] / df['price']).round(2)
+        if outcomes is not None:
+            playing = outcomes['availability'] * outcomes['appearance']
+            df['prediction_confidence'] = df['id'].map(playing).fillna(0.0).round(2)
+        else:
+            df['prediction_confidence'] = np.minimum(1.0, df['total_points'] / 50.0).round(2)
+        self.df = df
+        self.version = version
+
+        # Projections join '"column":value' fragments instead of serializing
+        self.cells = {
+            column: [dumps(column) + b':' + dumps(value) for value in df[column].tolist()]
+            for column in df.columns
+        }
+        self.full_rows = frame_records(df)
+        self.positions = df['position_name'].astype(str).str.upper().to_numpy()
+        self.teams = df['team'].to_numpy()
+        self.prices = df['price'].to_numpy(dtype=float)
+        self._orders = {}
+
+        # Per-position rows in nlargest(keep='first') order
+        ranked = df.assign(form_score=(df['form'].astype(float) * 0.3 + df['predicted_points'] * 0.7).round(2))
+        self.top_players_rows = {}
+        for position, group in ranked.groupby('position_name', sort=False):
+            order = np.argsort(-group['predicted_points'].to_numpy(), kind='stable')
+            self.top_players_rows[str(position).upper()] = frame_records(group.iloc[order][TOP_PLAYER_COLUMNS])
+
+        self.position_stats = self._position_stats(df)
+        self.position_stats_json = json_array(frame_records(self.position_stats))
+        self.build_seconds = time.perf_counter() - start
+
+    @staticmethod
+    def _position_stats(df: pd.DataFrame) -> pd.DataFrame:
+        stats = df.assign(price=df['now_cost'] / 10).groupby('position_name').agg({
+            'predicted_points': ['mean', 'max', 'std', 'count'],
+            'price': ['mean', 'max', 'min'],
+            'total_points': ['mean', 'max'],
+            'form': 'mean',
+            'selected_by_percent': 'mean'
+        }).round(2)
+        stats.columns = ['_'.join(col).strip() for col in stats.columns]
+        result = stats.reset_index()
+        result['avg_value'] = (result['predicted_points_mean'] / result['price_mean']).round(2)
+        return result
+
+    def order(self, column: str, descending: bool) -> np.ndarray:
+        """Row indices sorted by column (stable, missing values last), computed once per column"""
+        key = (column, descending)
+        if key not in self._orders:
+            self._orders[key] = self.df[column].sort_values(
+                ascending=not descending, kind='stable', na_position='last'
+            ).index.to_numpy()
+        return self._orders[key]
+
+    def players_page(self, fields: Optional[List[str]] = None, positions: Optional[Iterable[str]] = None,
+                     teams: Optional[Iterable[int]] = None, min_price: Optional[float] = None,
+                     max_price: Optional[float] = None, sort: str = '-predicted_points',
+                     limit: int = 50, cursor: Optional[str] = None) -> bytes:
+        """One page of /api/players as a JSON envelope; raises ValueError on unknown columns or a bad cursor
+
+        fields=None gives DEFAULT_FIELDS and ['all'] every column. sort is a
+        column name, '-' prefixed for descending.
+        """
+        if fields is None:
+            fields = DEFAULT_FIELDS
+        elif fields == ['all']:
+            fields = None
+        else:
+            unknown = [field for field in fields if field not in self.cells]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        column, descending = (sort[1:], True) if sort.startswith('-') else (sort, False)
+        if column not in self.cells:
+            raise ValueError(f"Unknown sort column: {column}")
+        offset = decode_cursor(cursor, self.version) if cursor else 0
+
+        mask = np.ones(len(self.df), dtype=bool)
+        if positions:
+            mask &= np.isin(self.positions, [position.upper() for position in positions])
+        if teams:
+            mask &= np.isin(self.teams, list(teams))
+        if min_price is not None:
+            mask &= self.prices >= min_price
+        if max_price is not None:
+            mask &= self.prices <= max_price
+        order = self.order(column, descending)
+        matching = order[mask[order]]
+        rows = matching[offset:offset + limit]
+
+        if fields is None:
+            players = [self.full_rows[i] for i in rows]
+        else:
+            cells = [self.cells[field] for field in fields]
+            players = [b'{' + b','.join(column[i] for column in cells) + b'}' for i in rows]
+        end = offset + len(rows)
+        next_cursor = encode_cursor(self.version, end) if end < len(matching) else None
+        header = dumps({'data_version': self.version, 'total': len(matching), 'count': len(rows),
+                        'next_cursor': next_cursor})
+        return header[:-1] + b',"players":' + json_array(players) + b'}'
+
+    def top_players_json(self, position: str, limit: int) -> bytes:
+        rows = self.top_players_rows.get(position.upper(), [])
+        return json_array(rows[:max(limit, 0)])
+
+    def info(self) -> Dict:
+        return {
+            'version': self.version,
+            'players': len(self.df),
+            'positions': sorted(self.top_players_rows),
+            'build_seconds': round(self.build_seconds, 3),
+        }
@@ -0,0 +1,248 @@
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+OUTFIELD = ('DEF', 'MID', 'FWD')
+# Fewest starters per outfield position a substitution may leave in the XI
+DEFAULT_MINIMUMS = {'DEF': 3, 'MID': 2, 'FWD': 1}
+RISK_MODES = ('std', 'quantile')
+
+# Points a player can score in one gameweek are 0..MAX_POINTS - 1; the NB tail beyond is folded into the last one
+MAX_POINTS = 40
+# Variance/mean of gameweek points among appearances, used for positions with fewer than DISPERSION_MIN_ROWS rows
+DEFAULT_DISPERSION = 2.0
+MIN_DISPERSION = 1.05
+DISPERSION_MIN_ROWS = 30
+# Weight, in gameweeks, of the position's appearance rate in a player's own
+APPEARANCE_PRIOR = 5.0
+
+# Scenarios sampled at once, and (lineup, slot, scenario) cells gathered at once when scoring
+SCENARIO_CHUNK = 50_000
+GATHER_CELLS = 4_000_000
+
+# Lineup columns: 11 starters with the goalkeeper first, the substitute goalkeeper, the outfield bench in order,
+# captain and vice-captain
+STARTERS = slice(0, 11)
+BENCH_GK, BENCH = 11, (12, 13, 14)
+CAPTAIN, VICE = 15, 16
+LINEUP_SLOTS = 17
+# Highest possible total: eleven players and the captain's second share
+MAX_TOTAL = 12 * (MAX_POINTS - 1)
+
+
+def fit_outcomes(players_df: pd.DataFrame, gameweeks_df: pd.DataFrame) -> pd.DataFrame:
+    """Per-player outcome parameters, indexed by id: availability, appearance and dispersion.
+
+    availability is chance_of_playing_next_round / 100, or 1 for status 'a'
+    and 0 otherwise when the chance is not set. appearance is the player's
+    share of gameweeks with minutes, shrunk towards their position's share
+    by APPEARANCE_PRIOR gameweeks. dispersion is the variance/mean ratio of
+    points in gameweeks played, per position.
+    """
+    players = players_df.set_index('id')
+    chance = players.get('chance_of_playing_next_round', pd.Series(np.nan, index=players.index)) / 100
+    status = players.get('status', pd.Series('a', index=players.index))
+    availability = chance.fillna((status == 'a').astype(float)).clip(0, 1)
+
+    history = gameweeks_df[['player_id', 'minutes', 'total_points']].merge(
+        players['element_type'], left_on='player_id', right_index=True)
+    history['played'] = history['minutes'] > 0
+    per_player = history.groupby('player_id')['played'].agg(['sum', 'count'])
+    position_rate = history.groupby('element_type')['played'].mean()
+    prior = players['element_type'].map(position_rate).fillna(1.0)
+    played = per_player['sum'].reindex(players.index, fill_value=0)
+    rounds = per_player['count'].reindex(players.index, fill_value=0)
+    appearance = (played + APPEARANCE_PRIOR * prior) / (rounds + APPEARANCE_PRIOR)
+
+    points = history.loc[history['played']].groupby('element_type')['total_points'].agg(['mean', 'var', 'count'])
+    ratio = (points['var'] / points['mean']).where(points['count'] >= DISPERSION_MIN_ROWS)
+    dispersion = players['element_type'].map(ratio.clip(lower=MIN_DISPERSION)).fillna(DEFAULT_DISPERSION)
+
+    return pd.DataFrame({'availability': availability, 'appearance': appearance.clip(0.05, 1),
+                         'dispersion': dispersion}).astype(float)
+
+
+def outcome_cdf(points: np.ndarray, availability: np.ndarray, appearance: np.ndarray,
+                dispersion: np.ndarray) -> np.ndarray:
+    """(players, MAX_POINTS + 1) float32 CDF over outcomes: 0 is not playing, k + 1 is playing and scoring k.
+
+    A player plays with probability availability * appearance. Points when
+    playing are negative binomial with mean points / appearance, so the
+    expected outcome is the prediction times availability, and variance
+    dispersion times the mean.
+    """
+    played = availability * appearance
+    mean = np.maximum(points, 0) / np.maximum(appearance, 1e-6)
+    n = np.maximum(mean / (np.maximum(dispersion, MIN_DISPERSION) - 1), 1e-9)[:, None]
+    q = 1 - 1 / np.maximum(dispersion, MIN_DISPERSION)[:, None]
+    k = np.arange(1, MAX_POINTS)
+    # pmf(k) = pmf(k - 1) * (k - 1 + n) / k * q, starting from pmf(0) = (1 - q) ** n
+    pmf = np.cumprod(np.concatenate([(1 - q) ** n, (k - 1 + n) / k * q], axis=1), axis=1)
+    table = np.concatenate([(1 - played)[:, None], played[:, None] * pmf], axis=1)
+    cdf = np.cumsum(table, axis=1)
+    cdf[:, -1] = 1.0
+    return cdf.astype(np.float32)
+
+
+def risk_score(stats: Dict, mode: str = 'std', risk_lambda: float = 0.5, quantile: float = 0.2) -> np.ndarray:
+    """Per-lineup score from evaluate() stats: mean - risk_lambda * std, or the given quantile of total points"""
+    if mode == 'std':
+        return stats['mean'] - risk_lambda * stats['std']
+    if mode == 'quantile':
+        return stats['quantiles'][quantile]
+    raise ValueError(f"Unknown risk mode '{mode}', expected one of {', '.join(RISK_MODES)}")
+
+
+class Simulator:
+    """Monte Carlo gameweek points for lineups drawn from one PlayerArrays snapshot.
+
+    A player plays with probability availability * appearance and then
+    scores negative-binomial points (outcome_cdf), so their expected points
+    are the prediction times availability. Each player's outcomes come from
+    their own random stream seeded by (seed, array index): every lineup
+    evaluated sees the same scenarios for a player, which keeps comparisons
+    between lineups free of sampling noise in the players they share.
+
+    Scoring follows FPL rules: the captain's points count twice, or the
+    vice-captain's if the captain does not play; a starting goalkeeper who
+    does not play is replaced by the substitute goalkeeper, and the outfield
+    bench comes on in order for starters who did not play, as long as the XI
+    keeps the minimum per position.
+    """
+
+    def __init__(self, arrays, seed: int = 0, minimums: Dict[str, int] = None):
+        self.arrays = arrays
+        self.seed = seed
+        minimums = minimums or DEFAULT_MINIMUMS
+        self.minimums = np.array([minimums[position] for position in OUTFIELD], dtype=np.int8)
+        self.cdf = outcome_cdf(arrays.points, arrays.availability, arrays.appearance, arrays.dispersion)
+        # 0 for goalkeepers, 1-3 for DEF, MID, FWD
+        self.codes = np.zeros(len(arrays), dtype=np.int8)
+        for code, position in enumerate(OUTFIELD, 1):
+            self.codes[arrays.positions == position] = code
+        self.index = {int(player_id): i for i, player_id in enumerate(arrays.ids)}
+
+    def moments(self):
+        """(mean, variance) of each player's simulated points, exact for the outcome distribution"""
+        probability = np.diff(self.cdf, prepend=0, axis=1).astype(float)
+        points = np.maximum(np.arange(MAX_POINTS + 1) - 1, 0)
+        mean = probability @ points
+        return mean, probability @ points ** 2 - mean ** 2
+
+    def lineup(self, result: Dict) -> np.ndarray:
+        """Array indices of an optimizer result's lineup, in the LINEUP_SLOTS column order"""
+        players = result['players']
+        if not players or players[0].get('is_starter') is None:
+            raise ValueError("Simulating a squad needs its lineup: starters, bench order and captain")
+        index = [self.index[player['id']] for player in players]
+        starters = sorted((i for i, player in zip(index, players) if player['is_starter']),
+                          key=lambda i: self.codes[i])
+        bench = sorted((player['bench_order'], i) for i, player in zip(index, players) if not player['is_starter'])
+        captain = self.index[result['captain_id']]
+        vice = self.index[result['vice_captain_id']] if result.get('vice_captain_id') is not None else captain
+        return np.array(starters + [i for _, i in bench] + [captain, vice], dtype=np.int64)
+
+    def sample(self, players: np.ndarray, n_scenarios: int, streams: list = None) -> np.ndarray:
+        """(players, n_scenarios) int8 outcomes, 0 for not playing and k + 1 for k points"""
+        streams = streams or [np.random.default_rng([self.seed, int(i)]) for i in players]
+        outcomes = np.empty((len(players), n_scenarios), dtype=np.int8)
+        for row, (i, stream) in enumerate(zip(players, streams)):
+            outcomes[row] = np.searchsorted(self.cdf[i], stream.random(n_scenarios, dtype=np.float32), side='right')
+        return outcomes
+
+    def score(self, outcomes: np.ndarray, lineups: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """(lineups, scenarios) total points; lineups index rows of outcomes, codes are their slots' positions"""
+        cells = outcomes[lineups]
+        played = cells > 0
+        points = np.maximum(cells, 1).astype(np.int16) - 1
+        total = points[:, STARTERS].sum(axis=1, dtype=np.int16)
+
+        # Substitute goalkeeper for a starting goalkeeper who did not play
+        total += points[:, BENCH_GK] * ~played[:, 0]
+
+        # Outfield bench in order; count is the XI per position, missing its starters not yet replaced
+        starter_codes = codes[:, STARTERS]
+        missing = np.stack([((starter_codes == c)[:, :, None] & ~played[:, STARTERS]).sum(axis=1, dtype=np.int8)
+                            for c in (1, 2, 3)], axis=1)
+        count = np.broadcast_to(np.stack([(starter_codes == c).sum(axis=1, dtype=np.int8) for c in (1, 2, 3)],
+                                         axis=1)[:, :, None], missing.shape).copy()
+        rows = np.arange(len(lineups))
+        for slot in BENCH:
+            position = codes[:, slot] - 1
+            same = missing[rows, position] > 0
+            # Replacing a starter of another position must leave that position at its minimum
+            other = (missing > 0) & (count > self.minimums[None, :, None])
+            other[rows, position] = False
+            chosen = np.argmax(other, axis=1)
+            sub = played[:, slot] & (same | other.any(axis=1))
+            total += points[:, slot] * sub
+
+            swap = sub & ~same
+            missing[rows, position] -= sub & same
+            for c in range(3):
+                leaving = swap & (chosen == c)
+                missing[:, c] -= leaving
+                count[:, c] -= leaving
+                count[:, c] += swap & (position[:, None] == c)
+
+        # Captain scores twice, the vice-captain instead when the captain did not play
+        total += np.where(played[:, CAPTAIN], points[:, CAPTAIN], points[:, VICE])
+        return total
+
+    def evaluate(self, lineups: np.ndarray, n_scenarios: int = 10_000,
+                 quantiles: Sequence[float] = (0.1, 0.5, 0.9)) -> Dict:
+        """Mean, std and quantiles of total points per lineup over n_scenarios common scenarios.
+
+        lineups is (lineups, LINEUP_SLOTS) array indices, see lineup(). Totals
+        are integers, so they are counted per value and the statistics come
+        from those histograms.
+        """
+        lineups = np.atleast_2d(np.asarray(lineups, dtype=np.int64))
+        players, local = np.unique(lineups, return_inverse=True)
+        local = local.reshape(lineups.shape)
+        codes = self.codes[lineups]
+        streams = [np.random.default_rng([self.seed, int(i)]) for i in players]
+        width = MAX_TOTAL + 1
+        histogram = np.zeros((len(lineups), width), dtype=np.int64)
+        per_gather = max(1, GATHER_CELLS // (LINEUP_SLOTS * min(n_scenarios, SCENARIO_CHUNK)))
+
+        for start in range(0, n_scenarios, SCENARIO_CHUNK):
+            outcomes = self.sample(players, min(SCENARIO_CHUNK, n_scenarios - start), streams)
+            for first in range(0, len(lineups), per_gather):
+                block = slice(first, first + per_gather)
+                total = self.score(outcomes, local[block], codes[block])
+                offsets = np.arange(total.shape[0])[:, None] * width
+                histogram[block] += np.bincount((total + offsets).ravel(),
+                                                minlength=total.shape[0] * width).reshape(-1, width)
+
+        values = np.arange(width)
+        mean = histogram @ values / n_scenarios
+        std = np.sqrt(np.maximum(histogram @ values ** 2 / n_scenarios - mean ** 2, 0))
+        cumulative = np.cumsum(histogram, axis=1)
+        return {
+            'mean': mean,
+            'std': std,
+            'quantiles': {q: (cumulative < q * n_scenarios).sum(axis=1).astype(float) for q in quantiles},
+            'n_scenarios': n_scenarios,
+        }
+
+    def simulate(self, squad, n_scenarios: int = 100_000, quantiles: Sequence[float] = (0.1, 0.5, 0.9)) -> Dict:
+        """Outcome summary of one lineup, given as an optimizer result or as lineup() indices"""
+        lineup = self.lineup(squad) if isinstance(squad, dict) else np.asarray(squad)
+        stats = self.evaluate(lineup[None, :], n_scenarios, quantiles)
+        return summary(stats, 0)
+
+
+def summary(stats: Dict, row: int, score: float = None) -> Dict:
+    """JSON-ready outcome summary of one lineup from evaluate() stats"""
+    result = {
+        'mean': round(float(stats['mean'][row]), 2),
+        'std': round(float(stats['std'][row]), 2),
+        'quantiles': {f"p{round(q * 100):02d}": float(values[row]) for q, values in stats['quantiles'].items()},
+        'n_scenarios': stats['n_scenarios'],
+    }
+    if score is not None:
+        result['score'] = round(float(score), 2)
+    return result
+
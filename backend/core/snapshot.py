@@ -0,0 +1,113 @@
+import hashlib
+import os
+import time
+from typing import Dict, Optional
+
+import joblib
+import pandas as pd
+
+import features as features_module
+import inference as inference_module
+import predictor as predictor_module
+import simulation as simulation_module
+import training as training_module
+from data_store import DataStore
+from metrics import stage
+from predictor import SimplePredictor
+from simulation import fit_outcomes
+
+# Bump when the snapshot layout changes, so old files are rebuilt rather than misread
+SNAPSHOT_FORMAT = 2
+INPUT_TABLES = ('players', 'gameweeks', 'fixtures')
+
+
+def snapshot_key(store: DataStore) -> str:
+    """Content hash of the serving inputs and of the code that turns them into predictions and outcome parameters.
+
+    training and inference are hashed too: the snapshot pickles their
+    fitted forests and CompiledForest arrays.
+    """
+    digest = hashlib.sha256(store.content_hash(INPUT_TABLES).encode())
+    for module in (features_module, training_module, inference_module, predictor_module, simulation_module):
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    digest.update(str(SNAPSHOT_FORMAT).encode())
+    return digest.hexdigest()
+
+
+class ServingSnapshot:
+    """Trained model, feature matrix, predictions and simulation outcome parameters for one version of the input data.
+
+    Saved as a single joblib file next to the models. load() only accepts a
+    file built from the same inputs (same snapshot_key), so a cold start
+    with unchanged data skips feature building, training and prediction.
+    """
+
+    def __init__(self, key: str, predictor, features: pd.DataFrame, predictions: Dict[int, float],
+                 outcomes: pd.DataFrame = None, build_seconds: float = 0.0):
+        self.format = SNAPSHOT_FORMAT
+        self.key = key
+        self.predictor = predictor
+        self.features = features
+        self.predictions = predictions
+        # Per-player availability, appearance rate and points dispersion (simulation.fit_outcomes)
+        self.outcomes = outcomes
+        self.created_at = time.time()
+        self.build_seconds = build_seconds
+
+    @classmethod
+    def build(cls, key: str, players_df: pd.DataFrame, gameweeks_df: pd.DataFrame, fixtures_df: pd.DataFrame,
+              predictor=None, train: bool = True) -> 'ServingSnapshot':
+        """Features and predictions for the inputs, from a new SimplePredictor unless one is given.
+
+        A given predictor keeps its FeatureEngine buffers, so only rounds it
+        has not seen are computed; with train its models are refit on the
+        result, which gives the same snapshot as a fresh build.
+        """
+        start = time.perf_counter()
+        predictor = predictor or SimplePredictor()
+        if train:
+            with stage('snapshot', 'features'):
+                training = predictor.training_features(players_df, gameweeks_df, fixtures_df)
+            if training.empty:
+                raise ValueError("Failed to create training features")
+            with stage('snapshot', 'train'):
+                predictor.train(training)
+
+        with stage('snapshot', 'features'):
+            features = predictor.create_features(players_df, gameweeks_df, fixtures_df)
+        predictions = {}
+        if not features.empty and 'id' in features.columns:
+            with stage('snapshot', 'predict'):
+                predictions = dict(zip(features['id'].tolist(), predictor.predict(features).tolist()))
+        with stage('snapshot', 'outcomes'):
+            outcomes = fit_outcomes(players_df, gameweeks_df)
+        return cls(key, predictor, features, predictions, outcomes, time.perf_counter() - start)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(self, tmp)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path: str, key: str) -> Optional['ServingSnapshot']:
+        """The snapshot at path if it was built from inputs with this key, else None"""
+        try:
+            snapshot = joblib.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable snapshot {path}: {e}")
+            return None
+        if getattr(snapshot, 'format', None) != SNAPSHOT_FORMAT or snapshot.key != key:
+            return None
+        return snapshot
+
+    def info(self) -> Dict:
+        return {
+            'key': self.key[:12],
+            'created_at': self.created_at,
+            'build_seconds': round(self.build_seconds, 3),
+            'predictions': len(self.predictions),
+        }
@@ -0,0 +1,307 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable
+
+from optimizer import EXACT_SOLVERS, FPLOptimizer, PlayerArrays, SquadModel, select_solver
+from planner import PLAN_TIME_LIMIT, TransferPlanner
+
+# Per-process state of a pool worker, set once by _init_worker
+_worker_model = None
+
+
+def _init_worker(optimizer: FPLOptimizer, arrays: PlayerArrays, solver: str, latency_target: float):
+    """Build the worker's own persistent squad model from the preloaded snapshot"""
+    global _worker_model
+    _worker_model = SquadModel(optimizer, arrays, solver, latency_target)
+
+
+def _warm_up():
+    return os.getpid()
+
+
+def _plan_transfers(model: SquadModel, points, current_squad, hit_cost: float = 4.0, **options) -> Dict:
+    """TransferPlanner.plan on a pool model's optimizer and snapshot"""
+    return TransferPlanner(model.optimizer, hit_cost=hit_cost).plan(model.arrays, points, current_squad, **options)
+
+
+# Calls the pool runs besides SquadModel methods, each taking the model first
+_POOL_CALLS = {'plan_transfers': _plan_transfers}
+
+
+def _call_model(model: SquadModel, method: str, *args, **kwargs) -> Dict:
+    call = _POOL_CALLS.get(method)
+    return call(model, *args, **kwargs) if call else getattr(model, method)(*args, **kwargs)
+
+
+def _call_worker_model(method: str, *args, **kwargs) -> Dict:
+    return _call_model(_worker_model, method, *args, **kwargs)
+
+
+class SolverPoolSaturated(Exception):
+    """Raised when every worker is busy and the queue is full"""
+
+    def __init__(self, queue_depth: int, max_pending: int):
+        super().__init__(f"Solver pool saturated ({queue_depth}/{max_pending} requests pending)")
+        self.queue_depth = queue_depth
+        self.max_pending = max_pending
+
+
+class SnapshotUnavailable(Exception):
+    """Raised for a solve against a replaced snapshot that no pin() kept serving"""
+
+
+class SolverPool:
+    """Runs squad solves off the event loop in a bounded pool of worker processes.
+
+    Each worker holds a SquadModel built from the optimizer and snapshot
+    passed to load_snapshot(), so a request only ships its budget,
+    exclusions and formation. prepare_snapshot() and activate() split that
+    in two, so new workers can finish starting before they take requests.
+    At most workers + max_queue solves may be pending; beyond that solve()
+    raises SolverPoolSaturated. With workers=0 solves run in one background
+    thread of the API process instead.
+
+    Solves take the arrays of the snapshot they are for (the current one by
+    default). pin() keeps a snapshot's workers running after activate()
+    replaces it, until the pin is released, so a batch of solves started on
+    one snapshot finishes on it.
+    Without an explicit solver the backend is chosen for latency_target
+    (seconds) by select_solver(). Without an explicit solve_timeout it is
+    10s, or the backend's typical latency (EXACT_SOLVERS) if that is longer.
+    """
+
+    def __init__(self, workers: int = None, max_queue: int = None, solve_timeout: float = None, solver: str = None,
+                 latency_target: float = None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_queue = 2 * max(self.workers, 1) if max_queue is None else max_queue
+        self.latency_target = latency_target
+        self.solver = solver or select_solver(latency_target)
+        expected = EXACT_SOLVERS.get(self.solver, 0.0)
+        if solve_timeout is None:
+            solve_timeout = max(10.0, expected)
+        elif expected > solve_timeout:
+            print(f"⚠️ Solver '{self.solver}' typically takes up to {expected}s, above the {solve_timeout}s solve "
+                  f"timeout: expect 504s")
+        self.solve_timeout = solve_timeout
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._executor = None
+        self._inline_model = None
+        self._arrays = None
+        self._optimizer = None
+        # Pins per snapshot (by id of its arrays), and replaced snapshots kept for them: (arrays, executor, model)
+        self._pins = {}
+        self._retained = {}
+
+    @classmethod
+    def from_env(cls):
+        """Pool configured from FPL_SOLVER_WORKERS, FPL_SOLVER_QUEUE, FPL_SOLVE_TIMEOUT, FPL_SOLVER and FPL_LATENCY_TARGET_MS"""
+        workers = os.environ.get('FPL_SOLVER_WORKERS')
+        max_queue = os.environ.get('FPL_SOLVER_QUEUE')
+        solve_timeout = os.environ.get('FPL_SOLVE_TIMEOUT')
+        latency_target = os.environ.get('FPL_LATENCY_TARGET_MS')
+        return cls(
+            workers=int(workers) if workers else None,
+            max_queue=int(max_queue) if max_queue else None,
+            solve_timeout=float(solve_timeout) if solve_timeout else None,
+            solver=os.environ.get('FPL_SOLVER') or None,
+            latency_target=float(latency_target) / 1000 if latency_target else None,
+        )
+
+    @property
+    def max_pending(self) -> int:
+        return max(self.workers, 1) + self.max_queue
+
+    @property
+    def arrays(self) -> PlayerArrays:
+        """The snapshot solves are currently submitted against"""
+        return self._arrays
+
+    def pin(self, arrays: PlayerArrays) -> Callable[[], None]:
+        """Keep the current snapshot, which arrays must be, solvable until the returned release() is called"""
+        if arrays is not self._arrays:
+            raise SnapshotUnavailable("Only the current snapshot can be pinned")
+        key = id(arrays)
+        self._pins[key] = self._pins.get(key, 0) + 1
+        released = []
+
+        def release():
+            if released:
+                return
+            released.append(True)
+            self._pins[key] -= 1
+            if self._pins[key] == 0:
+                del self._pins[key]
+                retained = self._retained.pop(key, None)
+                if retained is not None and retained[1] is not self._executor:
+                    retained[1].shutdown(wait=False, cancel_futures=False)
+        return release
+
+    def load_snapshot(self, arrays: PlayerArrays, optimizer: FPLOptimizer = None):
+        """Start workers preloaded with a new snapshot; solves already running finish on the old one"""
+        self.activate(self.prepare_snapshot(arrays, optimizer, wait=False))
+
+    def prepare_snapshot(self, arrays: PlayerArrays, optimizer: FPLOptimizer = None, wait: bool = True) -> tuple:
+        """Workers (or the inline model) for a snapshot, not yet serving; with wait, blocks until they are initialised"""
+        optimizer = optimizer or self._optimizer or FPLOptimizer()
+        if self.workers == 0:
+            return arrays, optimizer, None, SquadModel(optimizer, arrays, self.solver, self.latency_target)
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(optimizer, arrays, self.solver, self.latency_target),
+        )
+        # Spawn and initialise the workers now rather than on the first request
+        warm = [executor.submit(_warm_up) for _ in range(self.workers)]
+        if wait:
+            for future in warm:
+                future.result()
+        return arrays, optimizer, executor, None
+
+    def activate(self, prepared: tuple):
+        """Serve a prepare_snapshot() result from the next solve on; solves already running finish on the old one"""
+        arrays, optimizer, executor, inline_model = prepared
+        old_executor = self._executor
+        if self._arrays is not None and self._arrays is not arrays and self._pins.get(id(self._arrays)):
+            # Pinned batches keep solving on the old snapshot; release() shuts its workers down
+            self._retained[id(self._arrays)] = (self._arrays, old_executor, self._inline_model)
+            old_executor = None if executor is not None else old_executor
+        self._arrays = arrays
+        self._optimizer = optimizer
+
+        if executor is None:
+            self._inline_model = inline_model
+            # A single thread: the persistent model is not safe to solve concurrently
+            self._executor = old_executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='solver')
+            return
+
+        self._executor = executor
+        if old_executor is not None:
+            old_executor.shutdown(wait=False, cancel_futures=False)
+
+    async def solve(self, budget: float, exclude_players: Iterable[int], formation_preference: str = None,
+                    arrays: PlayerArrays = None) -> Dict:
+        """Solve in the pool, enforcing backpressure and the per-request timeout"""
+        return await self._submit('solve', budget, list(exclude_players), self.solve_timeout, formation_preference,
+                                  arrays=arrays)
+
+    async def solve_top_k(self, k: int, budget: float, exclude_players: Iterable[int], formation_preference: str = None,
+                          min_distance: int = 1, arrays: PlayerArrays = None) -> Dict:
+        """K best distinct squads from one worker's model; the timeout covers all k solves"""
+        return await self._submit('solve_top_k', k, budget, list(exclude_players), self.solve_timeout,
+                                  formation_preference, min_distance, arrays=arrays)
+
+    async def solve_risk_adjusted(self, k: int, budget: float, exclude_players: Iterable[int],
+                                  formation_preference: str = None, min_distance: int = 1, risk_mode: str = 'std',
+                                  risk_lambda: float = 0.5, quantile: float = 0.2, candidates: int = 5,
+                                  arrays: PlayerArrays = None) -> Dict:
+        """K best squads by simulated risk-adjusted points; the timeout covers the candidate solves"""
+        return await self._submit('solve_risk_adjusted', k, budget, list(exclude_players), self.solve_timeout,
+                                  formation_preference, min_distance, risk_mode, risk_lambda, quantile, candidates,
+                                  arrays=arrays)
+
+    async def solve_frontier(self, min_budget: float, max_budget: float, step: float, exclude_players: Iterable[int],
+                             formation_preference: str = None, arrays: PlayerArrays = None) -> Dict:
+        """Points-vs-budget frontier from one worker's model; the timeout covers the whole walk"""
+        return await self._submit('solve_frontier', min_budget, max_budget, step, list(exclude_players),
+                                  self.solve_timeout, formation_preference, arrays=arrays)
+
+    async def plan_transfers(self, points, current_squad: Iterable[int], hit_cost: float = 4.0, bank: float = 0.0,
+                             free_transfers: int = 1, start_gameweek: int = 1, time_limit: float = None,
+                             arrays: PlayerArrays = None) -> Dict:
+        """TransferPlanner plan in the pool, under the same backpressure as solves.
+
+        The planner stops itself at time_limit (PLAN_TIME_LIMIT by default)
+        and returns its best plan with status 'TimeLimit', which is passed on.
+        """
+        time_limit = time_limit or PLAN_TIME_LIMIT
+        return await self._submit('plan_transfers', points, list(current_squad), arrays=arrays, timeout=time_limit,
+                                  partial=True, hit_cost=hit_cost, bank=bank, free_transfers=free_transfers,
+                                  start_gameweek=start_gameweek, time_limit=time_limit)
+
+    async def _submit(self, method: str, *args, arrays: PlayerArrays = None, timeout: float = None,
+                      partial: bool = False, **kwargs) -> Dict:
+        """Run a model call in the pool; with partial, a 'TimeLimit' result is returned instead of raised"""
+        timeout = timeout or self.solve_timeout
+        if self._executor is None:
+            raise RuntimeError("Solver pool has no snapshot loaded")
+        executor, inline_model = self._target(arrays)
+        if self.in_flight >= self.max_pending:
+            self.rejected += 1
+            raise SolverPoolSaturated(self.in_flight, self.max_pending)
+
+        loop = asyncio.get_running_loop()
+        try:
+            if self.workers == 0:
+                submitted = executor.submit(_call_model, inline_model, method, *args, **kwargs)
+            else:
+                submitted = executor.submit(_call_worker_model, method, *args, **kwargs)
+            # The slot is held until the worker is done with the solve, not until this request stops waiting for it
+            self.in_flight += 1
+            submitted.add_done_callback(lambda _: self._release(loop))
+            # The solver stops itself at the timeout; the grace covers IPC and queueing
+            result = await asyncio.wait_for(asyncio.wrap_future(submitted), timeout=timeout + 1.0)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+        except BrokenProcessPool:
+            if executor is self._executor:
+                # A worker died; start a fresh pool on the same snapshot for the next request
+                self.load_snapshot(self._arrays)
+            raise
+
+        if result['status'] == 'TimeLimit' and not partial:
+            self.timed_out += 1
+            raise asyncio.TimeoutError(f"Solve exceeded {timeout}s")
+        self.completed += 1
+        return result
+
+    def _target(self, arrays: PlayerArrays = None) -> tuple:
+        """(executor, inline model) serving arrays: the current snapshot or one kept by pin()"""
+        if arrays is None or arrays is self._arrays:
+            return self._executor, self._inline_model
+        retained = self._retained.get(id(arrays))
+        if retained is None or retained[0] is not arrays:
+            raise SnapshotUnavailable("The snapshot was replaced by a newer one")
+        return retained[1], retained[2]
+
+    def _release(self, loop: asyncio.AbstractEventLoop):
+        """Free a solve's slot; runs in the executor's thread, so the count changes on the event loop"""
+        try:
+            loop.call_soon_threadsafe(self._decrement)
+        except RuntimeError:
+            # The loop has closed on shutdown
+            pass
+
+    def _decrement(self):
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "solver": self.solver,
+            "latency_target": self.latency_target,
+            "in_flight": self.in_flight,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "solve_timeout": self.solve_timeout,
+            "retained_snapshots": len(self._retained),
+        }
+
+    def shutdown(self):
+        for _, executor, _ in self._retained.values():
+            if executor is not self._executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._retained.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,628 @@
+import itertools
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+POSITIONS = ['GKP', 'DEF', 'MID', 'FWD']
+NEG_INF = float('-inf')
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def suffix_best(values: Sequence[float], k_max: int) -> List[List[float]]:
+    """table[k][j] is the largest sum of k entries of values[j:], -inf when fewer than k remain"""
+    n = len(values)
+    table = [[0.0] * (n + 1)] + [[NEG_INF] * (n + 1) for _ in range(k_max)]
+    for j in range(n - 1, -1, -1):
+        value = values[j]
+        for k in range(1, k_max + 1):
+            take = value + table[k - 1][j + 1]
+            skip = table[k][j + 1]
+            table[k][j] = take if take > skip else skip
+    return table
+
+
+def suffix_best_roles(start: Sequence[float], bench: Sequence[Sequence[float]], s_max: int, b_max: int):
+    """table[s][b][j]: best sum of s start values then b bench values from [j:], starters picked before the bench.
+
+    bench[o] holds the values of the o-th of b_max bench picks, so the first of b remaining picks uses bench[b_max - b].
+    """
+    n = len(start)
+    table = [[[NEG_INF] * (n + 1) for _ in range(b_max + 1)] for _ in range(s_max + 1)]
+    table[0][0] = [0.0] * (n + 1)
+    for j in range(n - 1, -1, -1):
+        for b in range(1, b_max + 1):
+            take, skip = bench[b_max - b][j] + table[0][b - 1][j + 1], table[0][b][j + 1]
+            table[0][b][j] = take if take > skip else skip
+        for s in range(1, s_max + 1):
+            row, prev = table[s], table[s - 1]
+            for b in range(b_max + 1):
+                take, skip = start[j] + prev[b][j + 1], row[b][j + 1]
+                row[b][j] = take if take > skip else skip
+    return table
+
+
+class SquadSearch:
+    """In-process squad solvers over per-position candidate lists, no MILP solver needed.
+
+    They solve the same model as FPLOptimizer for a given objective vector
+    (same column layout), so SquadModel can swap them in for HiGHS/CBC.
+    For a fixed formation every squad player has a role: starter, substitute
+    goalkeeper or outfield substitute. Within a position, swapping a starter
+    with a better bench player never lowers the objective, so with
+    candidates sorted by starting value the starters of each position are
+    always the first ones picked.
+    """
+
+    def __init__(self, optimizer, arrays):
+        self.optimizer = optimizer
+        self.arrays = arrays
+        self.n = len(arrays)
+        self.team_codes = np.unique(arrays.teams, return_inverse=True)[1].astype(np.int64)
+        self.n_teams = int(self.team_codes.max()) + 1 if self.n else 0
+        self.set_objective(optimizer.objective(arrays))
+
+    def set_objective(self, objective: np.ndarray):
+        blocks = np.asarray(objective, dtype=float).reshape(len(self.optimizer.blocks), self.n)
+        self.squad_value = blocks[0]
+        if self.optimizer.pick_lineup:
+            self.start_value = blocks[0] + blocks[1]
+            self.captain_value = blocks[2]
+            self.bench_values = blocks[0] + blocks[3:]
+        else:
+            self.start_value = blocks[0]
+            self.captain_value = np.zeros(self.n)
+            self.bench_values = np.zeros((0, self.n))
+
+    def formations(self, starting_ranges: Dict[str, tuple]) -> List[Dict[str, Tuple[int, int]]]:
+        """(starters, bench) per position for every allowed formation"""
+        squad = self.optimizer.formation
+        if not self.optimizer.pick_lineup:
+            return [{pos: (squad[pos], 0) for pos in POSITIONS}]
+        ranges = [range(starting_ranges[pos][0], starting_ranges[pos][1] + 1) for pos in POSITIONS]
+        return [{pos: (count, squad[pos] - count) for pos, count in zip(POSITIONS, counts)}
+                for counts in itertools.product(*ranges) if sum(counts) == self.optimizer.starting_size]
+
+    def bench_value(self, position: str, ordinal: int = 0) -> np.ndarray:
+        """Best value a player can get as the position's ordinal-th substitute.
+
+        Substitutes of one position come in candidate order, so the k-th of
+        them sits in the k-th outfield bench slot or a later one.
+        """
+        if position == 'GKP' or not len(self.bench_values):
+            return self.squad_value
+        return self.bench_values[min(ordinal, len(self.bench_values) - 1):].max(axis=0)
+
+    def candidates(self, excluded: np.ndarray) -> Dict[str, np.ndarray]:
+        """Selectable players per position, best starting value first and cheaper first on ties"""
+        result = {}
+        for pos in POSITIONS:
+            idx = self.arrays.position_index[pos]
+            idx = idx[~excluded[idx]]
+            result[pos] = idx[np.lexsort((self.arrays.prices[idx], -self.start_value[idx]))]
+        return result
+
+    def lineup(self, squad: Sequence[int], formation: Dict[str, Tuple[int, int]]):
+        """Exact objective of a squad in one formation, with its starters, captain and bench order"""
+        starters, outfield_bench, value = [], [], 0.0
+        for pos in POSITIONS:
+            members = sorted((i for i in squad if self.arrays.positions[i] == pos),
+                             key=lambda i: (-self.start_value[i], self.arrays.prices[i]))
+            count = formation[pos][0]
+            starters.extend(members[:count])
+            if pos == 'GKP' or not len(self.bench_values):
+                value += float(self.squad_value[members[count:]].sum())
+            else:
+                outfield_bench.extend(members[count:])
+        value += float(self.start_value[starters].sum())
+        captain = max(starters, key=lambda i: self.captain_value[i]) if self.optimizer.pick_lineup else None
+        if captain is not None:
+            value += float(self.captain_value[captain])
+
+        order = ()
+        if outfield_bench:
+            slots = range(len(self.bench_values))
+            order = max(itertools.permutations(outfield_bench),
+                        key=lambda perm: sum(self.bench_values[k, i] for k, i in zip(slots, perm)))
+            value += float(sum(self.bench_values[k, i] for k, i in zip(slots, order)))
+        return value, starters, captain, order
+
+    def columns(self, squad: Sequence[int], formation: Dict[str, Tuple[int, int]]) -> np.ndarray:
+        """Column solution vector in FPLOptimizer's layout"""
+        values = np.zeros(len(self.optimizer.blocks) * self.n)
+        values[list(squad)] = 1
+        if self.optimizer.pick_lineup:
+            _, starters, captain, order = self.lineup(squad, formation)
+            values[self.n + np.asarray(starters)] = 1
+            values[2 * self.n + captain] = 1
+            for k, i in enumerate(order):
+                values[(3 + k) * self.n + i] = 1
+        return values
+
+    def best_lineup(self, squad: Sequence[int], formations) -> Tuple[float, Dict]:
+        return max(((self.lineup(squad, formation)[0], formation) for formation in formations), key=lambda x: x[0])
+
+    def feasible(self, squad: Sequence[int], budget: float, excluded: np.ndarray, cuts) -> bool:
+        squad = np.asarray(squad)
+        if excluded[squad].any() or self.arrays.prices[squad].sum() > budget + 1e-9:
+            return False
+        if np.bincount(self.team_codes[squad], minlength=self.n_teams).max() > self.optimizer.max_per_team:
+            return False
+        return all(np.isin(selected, squad).sum() <= upper for selected, upper in cuts)
+
+    def start_squad(self, start: Optional[np.ndarray], budget: float, excluded: np.ndarray, cuts):
+        """Squad of a warm-start vector if it still fits, else None"""
+        if start is None:
+            return None
+        squad = np.flatnonzero(start[:self.n] > 0.5)
+        if len(squad) != sum(self.optimizer.formation.values()) or not self.feasible(squad, budget, excluded, cuts):
+            return None
+        return squad.tolist()
+
+
+class BranchAndBound(SquadSearch):
+    """Exact depth-first branch-and-bound, one formation at a time.
+
+    Squads are built position by position, each position's picks in
+    candidate-list order, so every squad is enumerated once. Bounds come
+    from the Lagrangian relaxation of the budget and team-limit rows, whose
+    best multipliers give the LP relaxation bound: for multipliers
+    lam, mu >= 0 the players still to pick are worth at most
+    lam * remaining budget + sum(mu * remaining team places) plus the best
+    (value - lam * price - mu[team]) picks from the rest of each candidate
+    list.
+
+    Per formation the multipliers are tuned by subgradient steps, then
+    reduced-cost fixing drops every player whose forced inclusion pushes
+    the bound below the incumbent. The suffix sums over what is left are
+    tabulated once, so a node bound is a handful of lookups. A short
+    LocalSearch run seeds the incumbent.
+    """
+
+    LAMBDA_SCALES = (0.8, 1.0, 1.25)
+    EPS = 1e-9
+
+    def __init__(self, optimizer, arrays, seed_seconds: float = 0.02):
+        super().__init__(optimizer, arrays)
+        self.seed_seconds = seed_seconds
+        self.nodes = 0
+
+    def set_objective(self, objective: np.ndarray):
+        super().set_objective(objective)
+        self._objective = np.asarray(objective, dtype=float)
+
+    def _roles(self, candidates: Dict[str, np.ndarray], formation: Dict[str, Tuple[int, int]]):
+        """(candidates, values, picks) for the starter and the bench role of each position"""
+        return [(idx, self.start_value[idx], formation[pos][0]) for pos, idx in candidates.items()] + \
+               [(idx, self.bench_value(pos)[idx], formation[pos][1]) for pos, idx in candidates.items()]
+
+    def relaxation(self, candidates: Dict[str, np.ndarray], formation: Dict[str, Tuple[int, int]],
+                   budget: float, lam: float, mu: np.ndarray):
+        """Lagrangian bound for multipliers (lam, mu), with the relaxed squad's cost and team counts"""
+        prices, teams = self.arrays.prices, self.team_codes
+        bound = lam * budget + self.optimizer.max_per_team * mu.sum()
+        if self.optimizer.pick_lineup:
+            bound += max(self.captain_value[idx].max() for idx in candidates.values())
+        cost, used = 0.0, np.zeros(self.n_teams)
+        for idx, value, count in self._roles(candidates, formation):
+            if not count:
+                continue
+            reduced = value - lam * prices[idx] - mu[teams[idx]]
+            top = np.argpartition(reduced, len(reduced) - count)[-count:]
+            bound += reduced[top].sum()
+            cost += prices[idx[top]].sum()
+            np.add.at(used, teams[idx[top]], 1)
+        return bound, cost, used
+
+    def multipliers(self, candidates: Dict[str, np.ndarray], formation: Dict[str, Tuple[int, int]],
+                    budget: float, target: float, iterations: int = 100) -> Tuple[float, np.ndarray, float]:
+        """(lam, mu, bound) after subgradient steps on the Lagrangian dual, stopping once bound <= target"""
+        limit = self.optimizer.max_per_team
+        lam, mu = 0.0, np.zeros(self.n_teams)
+        best, best_lam, best_mu = np.inf, lam, mu
+        theta, stalled = 1.0, 0
+        for _ in range(iterations):
+            bound, cost, used = self.relaxation(candidates, formation, budget, lam, mu)
+            if bound < best - 1e-12:
+                best, best_lam, best_mu, stalled = bound, lam, mu.copy(), 0
+            else:
+                stalled += 1
+                if stalled >= 5:
+                    theta, stalled = theta / 2, 0
+            if best <= target + self.EPS:
+                break
+            step_lam, step_mu = budget - cost, limit - used
+            # Multipliers already at 0 with slack in their row stay at 0
+            if lam <= 0 and step_lam > 0:
+                step_lam = 0.0
+            step_mu[(mu <= 0) & (step_mu > 0)] = 0
+            norm = step_lam ** 2 + (step_mu ** 2).sum()
+            if norm <= 1e-12:
+                break
+            step = theta * (bound - target) / norm
+            lam = max(0.0, lam - step * step_lam)
+            mu = np.maximum(0.0, mu - step * step_mu)
+        return best_lam, best_mu, best
+
+    def reduced_cost_fixing(self, candidates: Dict[str, np.ndarray], formation: Dict[str, Tuple[int, int]],
+                            lam: float, mu: np.ndarray, gap: float) -> Dict[str, np.ndarray]:
+        """Candidates that can still be part of a squad beating the incumbent, which is `gap` below the bound"""
+        kept = {}
+        for pos, idx in candidates.items():
+            keep = np.zeros(len(idx), dtype=bool)
+            for value, count in ((self.start_value[idx], formation[pos][0]), (self.bench_value(pos)[idx], formation[pos][1])):
+                if not count:
+                    continue
+                reduced = value - lam * self.arrays.prices[idx] - mu[self.team_codes[idx]]
+                # Forcing a player in displaces the weakest relaxed pick of the role
+                threshold = np.partition(reduced, len(reduced) - count)[-count]
+                keep |= threshold - reduced < gap + self.EPS
+            kept[pos] = idx[keep]
+        return kept
+
+    def solve(self, budget: float, excluded: np.ndarray, starting_ranges: Dict[str, tuple], cuts=(),
+              start: Optional[np.ndarray] = None, time_limit: float = None):
+        """Returns (column values, status) like SquadModel's MILP backends"""
+        deadline = time.perf_counter() + time_limit if time_limit else None
+        formations = self.formations(starting_ranges)
+        candidates = self.candidates(excluded)
+        squad_size = self.optimizer.formation
+        self.nodes = 0
+        if not formations or any(len(candidates[pos]) < count for pos, count in squad_size.items()):
+            return None, 'Failed'
+
+        # Incumbent: the warm start or a quick local search, whichever is better
+        self.best_value, self.best_squad = NEG_INF, None
+        seeds = [self.start_squad(start, budget, excluded, cuts)]
+        if self.seed_seconds:
+            seed = LocalSearch(self.optimizer, self.arrays, time_budget=self.seed_seconds)
+            seed.set_objective(self._objective)
+            values, status = seed.solve(budget, excluded, starting_ranges, cuts)
+            if values is not None:
+                seeds.append(np.flatnonzero(values[:self.n] > 0.5).tolist())
+        for squad in seeds:
+            if squad is not None:
+                value = self.best_lineup(squad, formations)[0]
+                if value > self.best_value:
+                    self.best_value, self.best_squad = value, squad
+
+        # Loosest formations first, with the bound at zero multipliers as a cheap ordering key
+        zero = np.zeros(self.n_teams)
+        order = sorted(formations, key=lambda f: -self.relaxation(candidates, f, budget, 0.0, zero)[0])
+        try:
+            for formation in order:
+                lam, mu, bound = self.multipliers(candidates, formation, budget, self.best_value)
+                if bound <= self.best_value + self.EPS:
+                    continue
+                kept = self.reduced_cost_fixing(candidates, formation, lam, mu, bound - self.best_value)
+                if any(len(kept[pos]) < sum(formation[pos]) for pos in POSITIONS):
+                    continue
+                self._search(formation, kept, budget, lam, mu, cuts, deadline)
+        except SearchTimeout:
+            return None, 'TimeLimit'
+
+        if self.best_squad is None:
+            return None, 'Failed'
+        return self.columns(self.best_squad, self.best_lineup(self.best_squad, formations)[1]), 'Optimal'
+
+    def _search(self, formation, candidates, budget, center, mu, cuts, deadline):
+        """Depth-first search over one formation's candidate lists, updating the incumbent"""
+        need = [formation[pos] for pos in POSITIONS]
+        lambdas = sorted({center * scale for scale in self.LAMBDA_SCALES})
+        team_mu = mu.tolist()
+        cand = [candidates[pos].tolist() for pos in POSITIONS]
+        price = [self.arrays.prices[candidates[pos]].tolist() for pos in POSITIONS]
+        start_v = [self.start_value[candidates[pos]].tolist() for pos in POSITIONS]
+        bench_v = [[self.bench_value(pos, o)[candidates[pos]].tolist() for o in range(need[p][1])]
+                   for p, pos in enumerate(POSITIONS)]
+        cap_v = [self.captain_value[candidates[pos]].tolist() for pos in POSITIONS]
+        team = [self.team_codes[candidates[pos]].tolist() for pos in POSITIONS]
+        n_positions = len(POSITIONS)
+
+        # Per multiplier and position: best s start then b bench picks from each suffix of the candidate list
+        tables = [[suffix_best_roles([v - lam * c - team_mu[t] for v, c, t in zip(start_v[p], price[p], team[p])],
+                                     [[v - lam * c - team_mu[t] for v, c, t in zip(values, price[p], team[p])]
+                                      for values in bench_v[p]],
+                                     *need[p]) for p in range(n_positions)] for lam in lambdas]
+        cheapest = [[[-x for x in row] for row in suffix_best([-c for c in price[p]], sum(need[p]))]
+                    for p in range(n_positions)]
+        cap_suffix = []
+        for p in range(n_positions):
+            suffix = [NEG_INF] * (len(cap_v[p]) + 1)
+            for j in range(len(cap_v[p]) - 1, -1, -1):
+                suffix[j] = max(cap_v[p][j], suffix[j + 1])
+            cap_suffix.append(suffix)
+
+        # Bound, minimum cost and best captain of the positions after p, with their full candidate lists
+        rest = [[0.0] * (n_positions + 1) for _ in lambdas]
+        rest_cost = [0.0] * (n_positions + 1)
+        rest_cap = [NEG_INF] * (n_positions + 1)
+        for p in range(n_positions - 1, -1, -1):
+            s, b = need[p]
+            for l in range(len(lambdas)):
+                rest[l][p] = rest[l][p + 1] + tables[l][p][s][b][0]
+            rest_cost[p] = rest_cost[p + 1] + cheapest[p][s + b][0]
+            rest_cap[p] = max(rest_cap[p + 1], cap_suffix[p][0] if s else NEG_INF)
+
+        max_per_team = self.optimizer.max_per_team
+        pick_lineup = self.optimizer.pick_lineup
+        team_count = [0] * self.n_teams
+        chosen = []
+
+        def leaf():
+            if cuts and not all(np.isin(selected, chosen).sum() <= upper for selected, upper in cuts):
+                return
+            value = self.lineup(chosen, formation)[0]
+            if value > self.best_value + self.EPS:
+                self.best_value, self.best_squad = value, list(chosen)
+
+        def search(p, k, j, value, cost, cap, team_term):
+            s, b = need[p]
+            remaining = s + b - k
+            starters_left = max(s - k, 0)
+            bench_left = remaining - starters_left
+            for i in range(j, len(cand[p]) - remaining + 1):
+                self.nodes += 1
+                if deadline is not None and not self.nodes & 1023 and time.perf_counter() > deadline:
+                    raise SearchTimeout()
+                # Everything from candidate i on is bounded by the relaxation over suffix i
+                if cost + cheapest[p][remaining][i] + rest_cost[p + 1] > budget + 1e-9:
+                    break
+                left = budget - cost
+                relaxed = team_term + min(lam * left + tables[l][p][starters_left][bench_left][i] + rest[l][p + 1]
+                                          for l, lam in enumerate(lambdas))
+                if pick_lineup:
+                    relaxed += max(cap, rest_cap[p + 1], cap_suffix[p][i] if starters_left else NEG_INF)
+                if value + relaxed <= self.best_value + self.EPS:
+                    break
+
+                c = price[p][i]
+                if cost + c + cheapest[p][remaining - 1][i + 1] + rest_cost[p + 1] > budget + 1e-9:
+                    continue
+                t = team[p][i]
+                if team_count[t] >= max_per_team:
+                    continue
+                starting = k < s
+                gain = start_v[p][i] if starting else bench_v[p][k - s][i]
+                new_cap = max(cap, cap_v[p][i]) if starting else cap
+
+                team_count[t] += 1
+                chosen.append(cand[p][i])
+                if remaining > 1:
+                    search(p, k + 1, i + 1, value + gain, cost + c, new_cap, team_term - team_mu[t])
+                elif p + 1 < n_positions:
+                    search(p + 1, 0, 0, value + gain, cost + c, new_cap, team_term - team_mu[t])
+                else:
+                    leaf()
+                chosen.pop()
+                team_count[t] -= 1
+
+        search(0, 0, 0, 0.0, 0.0, NEG_INF, max_per_team * sum(team_mu))
+
+
+class LocalSearch(SquadSearch):
+    """Anytime heuristic: iterated local search within a time budget.
+
+    Per formation, starts from the cheapest squad that respects the team
+    limit and climbs with best-improving single swaps (same role, within
+    budget and team limit), then with the best swap of two slots at once,
+    which moves budget between positions. A squad that breaks a no-good cut
+    is repaired by the cheapest swaps out of the cut squad. It then
+    repeatedly kicks two or three random slots out for random replacements
+    and climbs again, keeping the kick when the squad's exact lineup
+    objective does not get worse. Returns the best squad found with status
+    'Feasible', since optimality is not proven.
+    """
+
+    def __init__(self, optimizer, arrays, time_budget: float = 0.2, seed: int = 0):
+        super().__init__(optimizer, arrays)
+        self.time_budget = time_budget
+        self.seed = seed
+        self.iterations = 0
+
+    def _state(self, formation, candidates, budget, excluded):
+        """Cheapest squad respecting the team limit, as one slot per role"""
+        team_count = np.zeros(self.n_teams, dtype=int)
+        slots = []
+        for pos in POSITIONS:
+            s, b = formation[pos]
+            idx = candidates[pos][np.argsort(self.arrays.prices[candidates[pos]], kind='stable')]
+            taken = 0
+            for i in idx:
+                if taken == s + b:
+                    break
+                if team_count[self.team_codes[i]] < self.optimizer.max_per_team:
+                    team_count[self.team_codes[i]] += 1
+                    slots.append((pos, taken < s, int(i)))
+                    taken += 1
+            if taken < s + b:
+                return None
+        if self.arrays.prices[[i for _, _, i in slots]].sum() > budget + 1e-9:
+            return None
+        return slots
+
+    def _climb(self, slots, candidates, role_values, budget):
+        prices, teams = self.arrays.prices, self.team_codes
+        in_squad = np.zeros(self.n, dtype=bool)
+        in_squad[[i for _, _, i in slots]] = True
+        team_count = np.bincount(teams[in_squad], minlength=self.n_teams)
+        slack = budget - prices[in_squad].sum()
+        improved = True
+        while improved:
+            improved = False
+            for k, (pos, starting, out) in enumerate(slots):
+                idx = candidates[pos]
+                gain = role_values[pos][starting][idx] - role_values[pos][starting][out]
+                ok = (~in_squad[idx] & (prices[idx] <= slack + prices[out] + 1e-9)
+                      & ((team_count[teams[idx]] < self.optimizer.max_per_team) | (teams[idx] == teams[out])))
+                if not ok.any():
+                    continue
+                best = np.flatnonzero(ok)[np.argmax(np.where(ok, gain, -np.inf)[ok])]
+                if gain[best] <= 1e-9:
+                    continue
+                new = int(idx[best])
+                in_squad[out], in_squad[new] = False, True
+                team_count[teams[out]] -= 1
+                team_count[teams[new]] += 1
+                slack += prices[out] - prices[new]
+                slots[k] = (pos, starting, new)
+                improved = True
+        return slots
+
+    def _pair_move(self, slots, candidates, role_values, budget):
+        """Apply the best improving swap of two slots; returns whether one was found"""
+        prices, teams = self.arrays.prices, self.team_codes
+        squad = np.array([i for _, _, i in slots])
+        slack = budget - prices[squad].sum()
+        team_count = np.bincount(teams[squad], minlength=self.n_teams)
+
+        # Per (position, role): available players by price with the running best value, for the second slot
+        ladders = {}
+        for pos, starting, _ in slots:
+            if (pos, starting) in ladders:
+                continue
+            idx = candidates[pos][~np.isin(candidates[pos], squad)]
+            idx = idx[np.argsort(prices[idx], kind='stable')]
+            values = role_values[pos][starting][idx]
+            running = np.maximum.accumulate(values) if len(idx) else values
+            best_at = np.flatnonzero(values == running)
+            ladders[pos, starting] = idx, prices[idx], running, best_at[np.searchsorted(best_at, np.arange(len(idx)),
+                                                                                      side='right') - 1]
+
+        best_gain, best_move = 1e-9, None
+        for a, b in itertools.combinations(range(len(slots)), 2):
+            (pos_a, start_a, out_a), (pos_b, start_b, out_b) = slots[a], slots[b]
+            xs = ladders[pos_a, start_a][0]
+            idx_b, price_b, running_b, at_b = ladders[pos_b, start_b]
+            if not len(xs) or not len(idx_b):
+                continue
+            room = slack + prices[out_a] + prices[out_b] - prices[xs]
+            k = np.searchsorted(price_b, room + 1e-9, side='right') - 1
+            ok = k >= 0
+            if not ok.any():
+                continue
+            gain = np.full(len(xs), -np.inf)
+            gain[ok] = (role_values[pos_a][start_a][xs[ok]] + running_b[k[ok]]
+                        - role_values[pos_a][start_a][out_a] - role_values[pos_b][start_b][out_b])
+            for j in np.argsort(-gain)[:3]:
+                if gain[j] <= best_gain:
+                    break
+                x, y = int(xs[j]), int(idx_b[at_b[k[j]]])
+                counts = team_count.copy()
+                np.subtract.at(counts, teams[[out_a, out_b]], 1)
+                np.add.at(counts, teams[[x, y]], 1)
+                if x != y and counts.max() <= self.optimizer.max_per_team:
+                    best_gain, best_move = gain[j], (a, b, x, y)
+                    break
+
+        if best_move is None:
+            return False
+        a, b, x, y = best_move
+        slots[a] = (slots[a][0], slots[a][1], x)
+        slots[b] = (slots[b][0], slots[b][1], y)
+        return True
+
+    def _repair(self, slots, candidates, role_values, budget, cuts):
+        """Swap players out, least loss first, until the squad keeps no more of any cut squad than allowed"""
+        prices, teams = self.arrays.prices, self.team_codes
+        for selected, upper in cuts:
+            while np.isin([i for _, _, i in slots], selected).sum() > upper:
+                squad = [i for _, _, i in slots]
+                slack = budget - prices[squad].sum()
+                team_count = np.bincount(teams[squad], minlength=self.n_teams)
+                best_gain, best_move = -np.inf, None
+                for k, (pos, starting, out) in enumerate(slots):
+                    if out not in selected:
+                        continue
+                    idx = candidates[pos]
+                    ok = (~np.isin(idx, squad) & ~np.isin(idx, selected) & (prices[idx] <= slack + prices[out] + 1e-9)
+                          & ((team_count[teams[idx]] < self.optimizer.max_per_team) | (teams[idx] == teams[out])))
+                    if not ok.any():
+                        continue
+                    gain = role_values[pos][starting][idx[ok]] - role_values[pos][starting][out]
+                    if gain.max() > best_gain:
+                        best_gain, best_move = gain.max(), (k, int(idx[ok][np.argmax(gain)]))
+                if best_move is None:
+                    return slots
+                k, new = best_move
+                slots[k] = (slots[k][0], slots[k][1], new)
+        return slots
+
+    def _descend(self, slots, candidates, role_values, budget):
+        slots = self._climb(slots, candidates, role_values, budget)
+        while self._pair_move(slots, candidates, role_values, budget):
+            slots = self._climb(slots, candidates, role_values, budget)
+        return slots
+
+    def _kick(self, slots, candidates, budget, rng):
+        """Replace a few random slots with random players that keep the squad feasible"""
+        slots = list(slots)
+        prices, teams = self.arrays.prices, self.team_codes
+        for k in rng.choice(len(slots), size=int(rng.integers(2, 4)), replace=False):
+            pos, starting, out = slots[k]
+            squad = [i for _, _, i in slots]
+            slack = budget - prices[squad].sum() + prices[out]
+            team_count = np.bincount(teams[squad], minlength=self.n_teams)
+            idx = candidates[pos]
+            ok = (~np.isin(idx, squad) & (prices[idx] <= slack + 1e-9)
+                  & ((team_count[teams[idx]] < self.optimizer.max_per_team) | (teams[idx] == teams[out])))
+            if ok.any():
+                slots[k] = (pos, starting, int(rng.choice(idx[ok])))
+        return slots
+
+    def solve(self, budget: float, excluded: np.ndarray, starting_ranges: Dict[str, tuple], cuts=(),
+              start: Optional[np.ndarray] = None, time_limit: float = None):
+        """Returns (column values, status): 'Feasible' with the best squad found, or 'Failed'"""
+        seconds = min(self.time_budget, time_limit) if time_limit else self.time_budget
+        deadline = time.perf_counter() + seconds
+        rng = np.random.default_rng(self.seed)
+        formations = self.formations(starting_ranges)
+        candidates = self.candidates(excluded)
+        role_values = {pos: {True: self.start_value, False: self.bench_value(pos)} for pos in POSITIONS}
+
+        best_value, best_squad = NEG_INF, self.start_squad(start, budget, excluded, cuts)
+        if best_squad is not None:
+            best_value = self.best_lineup(best_squad, formations)[0]
+
+        def consider(squad, value):
+            nonlocal best_value, best_squad
+            if value > best_value + 1e-9 and self.feasible(squad, budget, excluded, cuts):
+                best_value, best_squad = value, squad
+
+        # One descent per formation, most promising first, for as long as the budget allows
+        states = []
+        for formation in sorted(formations, key=lambda f: -sum(f[pos][0] * self.start_value[candidates[pos][:f[pos][0]]].mean()
+                                                               for pos in POSITIONS if f[pos][0])):
+            slots = self._state(formation, candidates, budget, excluded)
+            if slots is not None:
+                slots = self._descend(slots, candidates, role_values, budget)
+                if cuts:
+                    slots = self._repair(slots, candidates, role_values, budget, cuts)
+                squad = [i for _, _, i in slots]
+                value = self.lineup(squad, formation)[0]
+                consider(squad, value)
+                states.append([formation, slots, value])
+            if states and time.perf_counter() > deadline:
+                break
+
+        # Then kick and descend again, round-robin over the formations
+        self.iterations = 0
+        while states and time.perf_counter() < deadline:
+            for state in states:
+                formation, slots, value = state
+                trial = self._descend(self._kick(slots, candidates, budget, rng), candidates, role_values, budget)
+                squad = [i for _, _, i in trial]
+                trial_value = self.lineup(squad, formation)[0]
+                if trial_value >= value - 1e-9:
+                    state[1], state[2] = trial, trial_value
+                consider(squad, trial_value)
+                self.iterations += 1
+                if time.perf_counter() > deadline:
+                    break
+
+        if best_squad is None:
+            return None, 'Failed'
+        return self.columns(best_squad, self.best_lineup(best_squad, formations)[1]), 'Feasible'
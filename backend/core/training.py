@@ -0,0 +1,219 @@
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+POSITION_NAMES = {1: 'GKP', 2: 'DEF', 3: 'MID', 4: 'FWD'}
+# Key of the model fit on every position, used for positions with too few rows of their own
+POOLED = 0
+
+# Candidates tried per position; the first is used as is when there are too few rounds to cross-validate.
+# Per-round points are noisy, so only well-regularised forests are worth their fit time.
+PARAM_GRID = (
+    {'n_estimators': 50, 'min_samples_leaf': 20, 'max_features': 0.3},
+    {'n_estimators': 50, 'min_samples_leaf': 50, 'max_features': 0.3},
+    {'n_estimators': 100, 'min_samples_leaf': 20, 'max_features': 0.5},
+)
+
+# Memory model for the ceiling: a fitted tree node plus its value entry, and a spawned worker once
+# numpy, pandas and sklearn are imported (measured peak RSS of a worker fitting one season: ~230MB)
+NODE_BYTES = 96
+WORKER_MB = 220.0
+# Resident pages of this process (Linux), sampled by rss_growth every RSS_INTERVAL seconds
+STATM = '/proc/self/statm'
+RSS_INTERVAL = 0.01
+
+
+def _rss_bytes() -> int:
+    with open(STATM) as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+@contextmanager
+def rss_growth():
+    """Yields a dict whose 'mb' is set on exit to the peak resident memory the block added over its entry level.
+
+    Sampled in a thread, which runs while sklearn's fit releases the GIL.
+    Without /proc it falls back to ru_maxrss, the process's lifetime peak.
+    """
+    result = {'mb': None}
+    if not os.path.exists(STATM):
+        yield result
+        result['mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        return
+    baseline = _rss_bytes()
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(RSS_INTERVAL):
+            peak[0] = max(peak[0], _rss_bytes())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield result
+    finally:
+        done.set()
+        sampler.join()
+        result['mb'] = round((max(peak[0], _rss_bytes()) - baseline) / 2 ** 20, 1)
+
+
+def walk_forward_splits(rounds: np.ndarray, n_folds: int = 3, min_train_rounds: int = 3) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """(train, test) row indices in gameweek order: each fold tests a block of rounds on a fit to every round before it"""
+    unique = np.unique(rounds)
+    if len(unique) <= min_train_rounds:
+        return []
+    blocks = np.array_split(unique[min_train_rounds:], min(n_folds, len(unique) - min_train_rounds))
+    return [(np.flatnonzero(rounds < block[0]), np.flatnonzero((rounds >= block[0]) & (rounds <= block[-1])))
+            for block in blocks]
+
+
+def make_model(params: Dict, max_samples: float = 1.0) -> RandomForestRegressor:
+    return RandomForestRegressor(random_state=42, n_jobs=1, max_samples=max_samples if max_samples < 1 else None,
+                                 **params)
+
+
+def forest_mb(n_rows: int, params: Dict, max_samples: float = 1.0) -> float:
+    """Upper estimate of a fitted forest's size: a bootstrap sample holds ~63% distinct rows, a tree ~2 nodes per leaf"""
+    leaves = max(n_rows * max_samples * 0.632 / params['min_samples_leaf'], 1.0)
+    return 2 * leaves * NODE_BYTES * params['n_estimators'] / 2 ** 20
+
+
+def fit_position(X: np.ndarray, y: np.ndarray, rounds: np.ndarray, param_grid: Sequence[Dict] = PARAM_GRID,
+                 n_folds: int = 3, min_train_rounds: int = 3, max_samples: float = 1.0):
+    """Best model from param_grid by walk-forward CV MAE, refit on every row; returns (model, metrics)"""
+    start = time.perf_counter()
+    with rss_growth() as rss:
+        splits = walk_forward_splits(rounds, n_folds, min_train_rounds)
+        scores = []
+        for params in (param_grid if splits else param_grid[:1]):
+            errors = [np.abs(make_model(params, max_samples).fit(X[train], y[train]).predict(X[test]) - y[test]).mean()
+                      for train, test in splits]
+            scores.append(float(np.mean(errors)) if errors else None)
+        best = int(np.argmin(scores)) if splits else 0
+        model = make_model(param_grid[best], max_samples).fit(X, y)
+
+    # Predicting the training mean is the bar a model has to clear
+    baseline = [np.abs(y[test] - y[train].mean()).mean() for train, test in splits]
+    metrics = {
+        'rows': int(len(y)),
+        'rounds': int(len(np.unique(rounds))),
+        'folds': len(splits),
+        'params': dict(param_grid[best]),
+        'max_samples': max_samples,
+        'cv_mae': scores[best],
+        'cv_mae_by_params': scores,
+        'baseline_mae': float(np.mean(baseline)) if baseline else None,
+        'fit_seconds': round(time.perf_counter() - start, 3),
+        # What this fit added to the process, comparable with estimate_mb() inline or in a worker
+        'fit_rss_mb': rss['mb'],
+    }
+    return model, metrics
+
+
+def _fit_job(key: int, X: np.ndarray, y: np.ndarray, rounds: np.ndarray, param_grid, n_folds: int,
+             min_train_rounds: int, max_samples: float):
+    model, metrics = fit_position(X, y, rounds, param_grid, n_folds, min_train_rounds, max_samples)
+    return key, model, metrics
+
+
+class PositionTrainer:
+    """Fits one model per element_type, in parallel worker processes, each tuned by walk-forward CV.
+
+    Positions with fewer than min_rows rows share a model fit on every
+    position. memory_limit_mb bounds the estimated memory the fit adds to
+    the calling process: it caps how many workers run at once and, when one
+    position's forest alone would not fit, bootstraps fewer rows per tree
+    (max_samples). With workers <= 1 everything runs in the calling process.
+    """
+
+    def __init__(self, workers: int = None, memory_limit_mb: float = 1024.0, param_grid: Sequence[Dict] = PARAM_GRID,
+                 n_folds: int = 3, min_train_rounds: int = 3, min_rows: int = 20):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.memory_limit_mb = memory_limit_mb
+        self.param_grid = tuple(param_grid)
+        self.n_folds = n_folds
+        self.min_train_rounds = min_train_rounds
+        self.min_rows = min_rows
+
+    @classmethod
+    def from_env(cls):
+        """Trainer configured from FPL_TRAIN_WORKERS and FPL_TRAIN_MEMORY_MB"""
+        workers = os.environ.get('FPL_TRAIN_WORKERS')
+        return cls(workers=int(workers) if workers else None,
+                   memory_limit_mb=float(os.environ.get('FPL_TRAIN_MEMORY_MB', 1024.0)))
+
+    def estimate_mb(self, n_rows: int, n_cols: int, max_samples: float = 1.0) -> float:
+        """Peak of one position's fit: its float32 matrix, sklearn's copy of it and the largest candidate forest"""
+        data = 2 * n_rows * n_cols * 4 / 2 ** 20
+        return data + max(forest_mb(n_rows, params, max_samples) for params in self.param_grid)
+
+    def plan(self, sizes: Dict[int, int], n_cols: int) -> Tuple[int, Dict[int, float]]:
+        """Concurrent workers and max_samples per job so the estimated peak stays under memory_limit_mb"""
+        parallel = self.workers > 1 and len(sizes) > 1
+        overhead = WORKER_MB if parallel else 0.0
+        max_samples = {}
+        for key, n_rows in sizes.items():
+            fraction = 1.0
+            while fraction > 0.05 and overhead + self.estimate_mb(n_rows, n_cols, fraction) > self.memory_limit_mb:
+                fraction /= 2
+            max_samples[key] = fraction
+        if not parallel:
+            return 1, max_samples
+        largest = max(self.estimate_mb(sizes[key], n_cols, max_samples[key]) for key in sizes)
+        concurrency = int(self.memory_limit_mb // (overhead + largest))
+        return max(1, min(self.workers, len(sizes), concurrency)), max_samples
+
+    def fit(self, features_df: pd.DataFrame, feature_cols: List[str]) -> Tuple[Dict, Dict]:
+        """(models keyed by element_type, metrics); features_df needs element_type, round and target"""
+        start = time.perf_counter()
+        jobs = {}
+        short = []
+        for element_type, group in features_df.groupby('element_type'):
+            if len(group) >= self.min_rows:
+                jobs[int(element_type)] = group
+            else:
+                short.append(int(element_type))
+        if short or not jobs:
+            jobs[POOLED] = features_df
+
+        sizes = {key: len(group) for key, group in jobs.items()}
+        concurrency, max_samples = self.plan(sizes, len(feature_cols))
+        args = [(key, group[feature_cols].fillna(0).to_numpy(dtype=np.float32), group['target'].to_numpy(dtype=np.float64),
+                 group['round'].to_numpy(), self.param_grid, self.n_folds, self.min_train_rounds, max_samples[key])
+                for key, group in sorted(jobs.items(), key=lambda kv: -len(kv[1]))]
+
+        if concurrency > 1:
+            with ProcessPoolExecutor(max_workers=concurrency, mp_context=multiprocessing.get_context('spawn')) as pool:
+                results = list(pool.map(_fit_job, *zip(*args)))
+        else:
+            results = [_fit_job(*job) for job in args]
+
+        fitted = {key: (model, metrics) for key, model, metrics in results}
+        models = {key: model for key, (model, _) in fitted.items() if key != POOLED}
+        positions = {POSITION_NAMES.get(key, 'ALL'): metrics for key, (_, metrics) in fitted.items()}
+        for element_type in short:
+            models[element_type] = fitted[POOLED][0]
+            positions[POSITION_NAMES.get(element_type, str(element_type))] = {'pooled': True, 'rows': int(
+                (features_df['element_type'] == element_type).sum())}
+
+        metrics = {
+            'train_seconds': round(time.perf_counter() - start, 3),
+            'rows': int(len(features_df)),
+            'workers': concurrency,
+            'memory_limit_mb': self.memory_limit_mb,
+            'estimated_peak_mb': round(concurrency * (WORKER_MB if concurrency > 1 else 0.0) + sum(sorted(
+                (self.estimate_mb(sizes[key], len(feature_cols), max_samples[key]) for key in sizes),
+                reverse=True)[:concurrency]), 1),
+            'positions': positions,
+        }
+        return models, metrics
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ('core', 'api', 'benchmarks'):
+    sys.path.insert(0, os.path.join(backend_dir, directory))
+
+# Solve inline on a thread instead of spawning workers when api/main.py is imported
+os.environ.setdefault('FPL_SOLVER_WORKERS', '0')
+
+from optimizer import FPLOptimizer  # noqa: E402
+from synthetic import synthetic_players  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def pool():
+    """A 300-player synthetic pool: (players, predictions)"""
+    return synthetic_players(300, seed=1)
+
+
+@pytest.fixture(scope='session')
+def arrays(pool):
+    players, predictions = pool
+    return FPLOptimizer().prepare(players, predictions)
@@ -0,0 +1,98 @@
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from optimizer import FPLOptimizer
+from refresh import ServingState
+from snapshot import ServingSnapshot
+
+
+def publish(players, predictions, key: str) -> ServingState:
+    """Publish a synthetic state the way the lifespan does, without collecting or training"""
+    snapshot = ServingSnapshot(key, None, pd.DataFrame(), predictions)
+    state = ServingState(players, pd.DataFrame(), snapshot, main.optimizer)
+    main.publish_data(state)
+    return state
+
+
+@pytest.fixture(scope='module')
+def players(pool):
+    """The synthetic pool with the remaining players.csv columns the serving table reads"""
+    players = pool[0]
+    return players.assign(first_name='First', second_name=players['web_name'], status='a',
+                          form=(players['total_points'] / 10).round(1), selected_by_percent=1.0)
+
+
+@pytest.fixture(scope='module')
+def client(pool, players):
+    main.optimizer = FPLOptimizer()
+    publish(players, pool[1], key='a' * 64)
+    # Without a with block the lifespan, which loads real data, does not run
+    yield TestClient(main.app)
+    main.solver_pool.shutdown()
+
+
+def pages(client, **params):
+    """Every page of a query, following next_cursor"""
+    params = {'fields': 'id,predicted_points', 'limit': 40, **params}
+    result = [client.get('/api/players', params=params).json()]
+    while result[-1]['next_cursor']:
+        result.append(client.get('/api/players', params={**params, 'cursor': result[-1]['next_cursor']}).json())
+    return result
+
+
+def test_cursor_pages_cover_every_player_once(client, players):
+    walked = pages(client)
+    ids = [player['id'] for page in walked for player in page['players']]
+    assert len(walked) == -(-len(players) // 40)
+    assert sorted(ids) == sorted(players['id'])
+    points = [player['predicted_points'] for page in walked for player in page['players']]
+    assert points == sorted(points, reverse=True)
+    assert all(page['total'] == len(players) for page in walked)
+
+
+def test_cursor_pages_of_a_filtered_query(client, players):
+    walked = pages(client, position='MID', sort='price', fields='id,position_name,price')
+    rows = [player for page in walked for player in page['players']]
+    assert len(rows) == (players['position_name'] == 'MID').sum()
+    assert {player['position_name'] for player in rows} == {'MID'}
+    assert [player['price'] for player in rows] == sorted(player['price'] for player in rows)
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get('/api/players', params={'cursor': 'not-a-cursor'}).status_code == 400
+
+
+def test_etag_revalidation(client):
+    first = client.get('/api/players', params={'limit': 5})
+    # Compressed bodies carry the weak form of the tag
+    etag = first.headers['etag']
+    strong = etag.removeprefix('W/')
+    assert first.status_code == 200
+
+    cached = client.get('/api/players', params={'limit': 5}, headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['etag'].removeprefix('W/') == strong
+    assert cached.content == b''
+    assert client.get('/api/players', params={'limit': 5}, headers={'If-None-Match': f'"x", W/{strong}'}).status_code == 304
+    assert client.get('/api/players', params={'limit': 5}, headers={'If-None-Match': strong}).status_code == 304
+
+    other = client.get('/api/players', params={'limit': 6}, headers={'If-None-Match': etag})
+    assert other.status_code == 200
+    assert other.headers['etag'].removeprefix('W/') != strong
+
+
+def test_new_data_version_invalidates_etags_and_cursors(client, pool, players):
+    predictions = pool[1]
+    first = client.get('/api/players', params={'limit': 40})
+    cursor = first.json()['next_cursor']
+
+    publish(players, {pid: points + 1 for pid, points in predictions.items()}, key='b' * 64)
+    try:
+        refreshed = client.get('/api/players', params={'limit': 40}, headers={'If-None-Match': first.headers['etag']})
+        assert refreshed.status_code == 200
+        assert refreshed.headers['etag'].removeprefix('W/') != first.headers['etag'].removeprefix('W/')
+        assert client.get('/api/players', params={'limit': 40, 'cursor': cursor}).status_code == 400
+    finally:
+        publish(players, predictions, key='a' * 64)
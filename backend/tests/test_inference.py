@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from inference import CompiledForest, CompiledPredictor
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 8))
+    y = X[:, 0] * 2 + np.sin(X[:, 1]) + rng.normal(0, 0.3, size=len(X))
+    return X.astype(np.float32), y
+
+
+@pytest.mark.parametrize('model', [
+    DecisionTreeRegressor(max_depth=12, random_state=0),
+    RandomForestRegressor(n_estimators=25, max_depth=8, random_state=0),
+    RandomForestRegressor(n_estimators=10, min_samples_leaf=1, random_state=0),
+])
+def test_compiled_forest_matches_sklearn(data, model):
+    X, y = data
+    model.fit(X, y)
+    # Unseen rows, plus rows sitting exactly on split thresholds
+    rng = np.random.default_rng(1)
+    rows = rng.normal(size=(3000, X.shape[1])).astype(np.float32)
+    tree = getattr(model, 'estimators_', [model])[0].tree_
+    split = tree.feature >= 0
+    rows[:split.sum(), tree.feature[split]] = tree.threshold[split].astype(np.float32)
+
+    np.testing.assert_allclose(CompiledForest(model).predict(rows, chunk_rows=256), model.predict(rows),
+                               rtol=1e-9, atol=1e-9)
+
+
+def test_compiled_predictor_routes_by_element_type(data):
+    X, y = data
+    small = DecisionTreeRegressor(max_depth=4, random_state=0).fit(X, y)
+    large = RandomForestRegressor(n_estimators=5, max_depth=6, random_state=0).fit(X, y)
+    element_types = np.resize([1, 2, 3, 4], len(X))
+    predictor = CompiledPredictor({1: small, 2: large, 3: large}, max_compiled_rows=400)
+
+    out = predictor.predict(X, element_types, np.full(len(X), -1.0))
+    for element_type, model in {1: small, 2: large, 3: large}.items():
+        rows = element_types == element_type
+        np.testing.assert_allclose(out[rows], model.predict(X[rows]), rtol=1e-9, atol=1e-9)
+    # Rows without a model keep their value
+    assert (out[element_types == 4] == -1.0).all()
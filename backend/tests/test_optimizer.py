@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from optimizer import FPLOptimizer, SquadModel
+
+
+def objective_value(optimizer, result):
+    """Squad objective of a solve result: starters, the captain again, weighted bench"""
+    value = 0.0
+    for player in result['players']:
+        points = player['predicted_points']
+        if player['is_starter']:
+            value += points * (2 if player['is_captain'] else 1)
+        elif player['bench_order']:
+            value += optimizer.bench_weights[player['bench_order'] - 1] * points
+    return value
+
+
+@pytest.mark.parametrize('budget', [80.0, 90.0, 100.0, 115.0])
+@pytest.mark.parametrize('formation', [None, '3-5-2', '5-4-1'])
+def test_pruning_keeps_optimal_objective(pool, budget, formation):
+    players, predictions = pool
+    pruned_optimizer, full_optimizer = FPLOptimizer(prune_dominated=True), FPLOptimizer(prune_dominated=False)
+    pruned = SquadModel(pruned_optimizer, pruned_optimizer.prepare(players, predictions), 'highs')
+    full = SquadModel(full_optimizer, full_optimizer.prepare(players, predictions), 'highs')
+
+    with_pruning = pruned.solve(budget, formation_preference=formation)
+    without_pruning = full.solve(budget, formation_preference=formation)
+    assert with_pruning['status'] == without_pruning['status'] == 'Optimal'
+    assert objective_value(pruned_optimizer, with_pruning) == pytest.approx(
+        objective_value(full_optimizer, without_pruning), abs=1e-6)
+
+
+def test_pruning_with_exclusions(pool):
+    players, predictions = pool
+    optimizer = FPLOptimizer()
+    arrays = optimizer.prepare(players, predictions)
+    full_optimizer = FPLOptimizer(prune_dominated=False)
+    pruned = SquadModel(optimizer, arrays, 'highs')
+    full = SquadModel(full_optimizer, full_optimizer.prepare(players, predictions), 'highs')
+
+    # Excluding the unpruned optimum's squad forces the pruned model onto players that dominate nobody
+    first = full.solve(100.0)
+    excluded = [player['id'] for player in first['players']][:8]
+    assert objective_value(optimizer, pruned.solve(100.0, excluded)) == pytest.approx(
+        objective_value(full_optimizer, full.solve(100.0, excluded)), abs=1e-6)
+
+
+def test_dominated_matches_pairwise_count(arrays):
+    """The sort-based mask agrees with counting dominators pair by pair"""
+    optimizer = FPLOptimizer()
+    pruned = optimizer.dominated(arrays)
+    n_teams = int(arrays.team_codes.max()) + 1
+    blocked = min((sum(optimizer.formation.values()) - 1) // optimizer.max_per_team, n_teams - 1)
+
+    expected = np.zeros(len(arrays), dtype=bool)
+    for position, slots in optimizer.formation.items():
+        idx = arrays.position_index[position]
+        for i in idx:
+            dominators = idx[(arrays.prices[idx] <= arrays.prices[i]) & (arrays.points[idx] >= arrays.points[i])
+                             & (idx != i)]
+            # Ties in price and points are broken by id
+            ties = (arrays.prices[dominators] == arrays.prices[i]) & (arrays.points[dominators] == arrays.points[i])
+            dominators = dominators[~ties | (arrays.ids[dominators] < arrays.ids[i])]
+            per_team = np.minimum(np.bincount(arrays.team_codes[dominators], minlength=n_teams), slots)
+            others = np.delete(per_team, arrays.team_codes[i])
+            expected[i] = per_team.sum() - np.sort(others)[len(others) - blocked:].sum() >= slots
+    np.testing.assert_array_equal(pruned, expected)
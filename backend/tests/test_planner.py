@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from optimizer import FPLOptimizer, SquadModel
+from planner import TransferPlanner
+
+
+@pytest.fixture(scope='module')
+def setup(arrays):
+    optimizer = FPLOptimizer()
+    squad = SquadModel(optimizer, arrays, 'highs').solve(92.0)
+    current = [player['id'] for player in squad['players']]
+    # Form swings week to week, so some transfers pay for their hits
+    rng = np.random.default_rng(3)
+    points = arrays.points[:, None] * rng.uniform(0.3, 1.7, size=(len(arrays), 4))
+    return optimizer, current, round(100.0 - squad['total_cost'], 1), points
+
+
+@pytest.mark.parametrize('free_transfers, hit_cost', [(1, 4.0), (2, 4.0), (1, 0.5)])
+def test_plan_is_feasible(arrays, setup, free_transfers, hit_cost):
+    optimizer, current, bank, points = setup
+    planner = TransferPlanner(optimizer, hit_cost=hit_cost)
+    plan = planner.plan(arrays, points, current, bank=bank, free_transfers=free_transfers, start_gameweek=10)
+    assert plan['status'] == 'Optimal'
+    assert [gw['gameweek'] for gw in plan['gameweeks']] == [10, 11, 12, 13]
+
+    squad, previous_bank, free = set(current), bank, free_transfers
+    for gw in plan['gameweeks']:
+        bought = {player['id']: player['price'] for player in gw['transfers_in']}
+        sold = {player['id']: player['price'] for player in gw['transfers_out']}
+        assert len(bought) == len(sold)
+        assert set(sold) <= squad and not set(bought) & squad
+        squad = (squad - set(sold)) | set(bought)
+        assert {player['id'] for player in gw['squad']} == squad
+
+        # Squad rules hold every gameweek
+        positions = [player['position'] for player in gw['squad']]
+        assert {pos: positions.count(pos) for pos in optimizer.formation} == optimizer.formation
+        teams = [player['team'] for player in gw['squad']]
+        assert max(teams.count(team) for team in teams) <= optimizer.max_per_team
+
+        # Bank: previous plus sales minus purchases, never negative
+        assert gw['bank'] >= 0
+        assert gw['bank'] == pytest.approx(previous_bank + sum(sold.values()) - sum(bought.values()), abs=0.051)
+        previous_bank = gw['bank']
+
+        # Only transfers beyond the free ones are hits
+        assert gw['free_transfers'] == free
+        assert gw['hits'] == max(0, len(bought) - free)
+        assert gw['hit_cost'] == pytest.approx(gw['hits'] * hit_cost)
+        free = min(planner.max_free_transfers, max(free - len(bought), 0) + 1)
+
+    held = points[np.isin(arrays.ids, current)].sum()
+    assert plan['net_points'] >= round(held, 1) - 0.1
+
+
+def test_plan_without_money_keeps_prices_balanced(arrays, setup):
+    """With an empty bank every purchase is paid for by the same week's sales"""
+    optimizer, current, _, points = setup
+    plan = TransferPlanner(optimizer).plan(arrays, points, current, bank=0.0, free_transfers=2)
+    spent = 0.0
+    for gw in plan['gameweeks']:
+        spent += sum(p['price'] for p in gw['transfers_in']) - sum(p['price'] for p in gw['transfers_out'])
+        assert spent <= 1e-6
+        assert gw['bank'] == pytest.approx(-spent, abs=0.051)
@@ -0,0 +1,21 @@
+from result_cache import OptimizationCache
+
+
+def test_make_key_keeps_budget_exact():
+    # Squads costing between 99.95 and 100.0 fit one budget and not the other
+    assert OptimizationCache.make_key(1, 99.96, []) != OptimizationCache.make_key(1, 100.0, [])
+    assert OptimizationCache.make_key(1, 100, []) == OptimizationCache.make_key(1, 100.0, [])
+
+
+def test_make_key_normalises_exclusions_and_formation():
+    key = OptimizationCache.make_key(1, 100.0, [3, 1, 2, 1], ' 3-4-3 ')
+    assert key == OptimizationCache.make_key(1, 100.0, [1, 2, 3], '3-4-3')
+    assert OptimizationCache.make_key(1, 100.0, [], '') == OptimizationCache.make_key(1, 100.0, [])
+    assert key != OptimizationCache.make_key(1, 100.0, [1, 2], '3-4-3')
+    assert key != OptimizationCache.make_key(2, 100.0, [1, 2, 3], '3-4-3')
+
+
+def test_make_key_separates_options():
+    assert OptimizationCache.make_key(1, 100.0, [], k=3) != OptimizationCache.make_key(1, 100.0, [], k=5)
+    assert OptimizationCache.make_key(1, 100.0, [], k=3, min_distance=1) == \
+        OptimizationCache.make_key(1, 100.0, [], min_distance=1, k=3)
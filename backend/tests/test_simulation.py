@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from optimizer import FPLOptimizer
+from simulation import Simulator, fit_outcomes
+
+
+@pytest.fixture(scope='module')
+def simulator(pool):
+    """Players predicted 6 points at 100/50/25/0% chance of playing, who appear in two gameweeks out of three"""
+    players, predictions = pool
+    players = players.assign(chance_of_playing_next_round=np.resize([100.0, 50.0, 25.0, 0.0], len(players)))
+    history = pd.DataFrame({'player_id': np.repeat(players['id'], 30),
+                            'minutes': np.tile(np.resize([90, 90, 0], 30), len(players)),
+                            'total_points': 3})
+    arrays = FPLOptimizer().prepare(players, dict.fromkeys(predictions, 6.0), fit_outcomes(players, history))
+    assert arrays.appearance == pytest.approx(2 / 3, abs=0.01)
+    return Simulator(arrays, seed=1)
+
+
+def test_expected_points_are_prediction_times_availability(simulator):
+    mean, _ = simulator.moments()
+    np.testing.assert_allclose(mean, 6.0 * simulator.arrays.availability, atol=1e-3)
+
+
+def test_sampled_points_are_prediction_times_availability(simulator):
+    players = np.arange(8)
+    outcomes = simulator.sample(players, 40_000)
+    points = np.maximum(outcomes.astype(np.int64) - 1, 0).mean(axis=1)
+    _, variance = simulator.moments()
+    np.testing.assert_allclose(points, 6.0 * simulator.arrays.availability[players],
+                               atol=5 * np.sqrt(variance[players].max() / 40_000))
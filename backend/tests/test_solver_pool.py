@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from solver_pool import SolverPool, SolverPoolSaturated
+
+
+class SlowModel:
+    """Inline model whose solves take `seconds`"""
+
+    def __init__(self, seconds: float, status: str = 'Optimal'):
+        self.seconds = seconds
+        self.status = status
+
+    def solve(self, *args):
+        time.sleep(self.seconds)
+        return {'status': self.status, 'timings': {}}
+
+
+def inline_pool(model, max_queue: int = 0, solve_timeout: float = 10.0) -> SolverPool:
+    pool = SolverPool(workers=0, max_queue=max_queue, solve_timeout=solve_timeout, solver='highs')
+    pool.activate((None, None, None, model))
+    return pool
+
+
+def test_saturated_pool_rejects():
+    async def run():
+        pool = inline_pool(SlowModel(0.3))
+        first = asyncio.ensure_future(pool.solve(100.0, []))
+        await asyncio.sleep(0.05)
+        with pytest.raises(SolverPoolSaturated) as rejected:
+            await pool.solve(100.0, [])
+        assert (rejected.value.queue_depth, rejected.value.max_pending) == (1, 1)
+        assert (await first)['status'] == 'Optimal'
+        await asyncio.sleep(0.05)
+        return pool
+    pool = asyncio.run(run())
+    assert (pool.completed, pool.rejected, pool.in_flight) == (1, 1, 0)
+    pool.shutdown()
+
+
+def test_timeout_holds_slot_until_solve_ends():
+    async def run():
+        pool = inline_pool(SlowModel(2.0), solve_timeout=0.1)
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.solve(100.0, [])
+        # The abandoned solve still occupies the thread
+        assert pool.in_flight == 1
+        with pytest.raises(SolverPoolSaturated):
+            await pool.solve(100.0, [])
+        await asyncio.sleep(1.2)
+        return pool
+    pool = asyncio.run(run())
+    assert (pool.timed_out, pool.in_flight) == (1, 0)
+    pool.shutdown()
+
+
+def test_time_limit_status_is_a_timeout():
+    async def run():
+        pool = inline_pool(SlowModel(0.0, status='TimeLimit'))
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.solve(100.0, [])
+        return pool
+    pool = asyncio.run(run())
+    assert pool.timed_out == 1
+    pool.shutdown()
+
+
+def test_api_maps_saturation_and_timeout():
+    import main
+
+    async def raising(error):
+        raise error
+
+    async def run(error):
+        with pytest.raises(HTTPException) as raised:
+            await main.solve_in_pool('optimize', raising, error)
+        return raised.value
+
+    saturated = asyncio.run(run(SolverPoolSaturated(3, 3)))
+    assert saturated.status_code == 429
+    assert saturated.headers == {'Retry-After': '1'}
+    assert saturated.detail['max_pending'] == 3
+    assert asyncio.run(run(asyncio.TimeoutError())).status_code == 504
@@ -1,10 +1,13 @@
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import { fplAPI } from '../services/api'
 
-export const usePlayers = () => {
-  return useQuery({
-    queryKey: ['players'],
-    queryFn: fplAPI.getPlayers,
+// Pages of players matching filters ({ position, team, min_price, max_price, sort, fields, limit })
+export const usePlayers = (filters = {}) => {
+  return useInfiniteQuery({
+    queryKey: ['players', filters],
+    queryFn: ({ pageParam }) => fplAPI.getPlayers(pageParam ? { ...filters, cursor: pageParam } : filters),
+    initialPageParam: null,
+    getNextPageParam: (lastPage) => lastPage.next_cursor,
     staleTime: 5 * 60 * 1000, // 5 minutes
   })
 }
@@ -21,6 +24,16 @@ export const useOptimizeTeam = () => {
   })
 }
 
+// Points-vs-budget curve for the budget slider, one request per range
+export const useBudgetFrontier = (request) => {
+  return useQuery({
+    queryKey: ['budgetFrontier', request],
+    queryFn: () => fplAPI.getBudgetFrontier(request),
+    enabled: !!request,
+    staleTime: 5 * 60 * 1000,
+  })
+}
+
 export const useAnalytics = () => {
   return useQuery({
     queryKey: ['analytics'],
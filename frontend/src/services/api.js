@@ -9,10 +9,26 @@ const api = axios.create({
   },
 })
 
+// Last ETag and body per players query, revalidated with If-None-Match
+const playerPages = new Map()
+
 export const fplAPI = {
-  // Get all players
-  getPlayers: async () => {
-    const response = await api.get('/api/players')
+  // Get one page of players
+  // params: fields, position, team, min_price, max_price, sort, limit, cursor
+  getPlayers: async (params = {}) => {
+    const key = JSON.stringify(params)
+    const cached = playerPages.get(key)
+    const response = await api.get('/api/players', {
+      params,
+      headers: cached ? { 'If-None-Match': cached.etag } : {},
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+    })
+    if (response.status === 304) {
+      return cached.data
+    }
+    if (response.headers.etag) {
+      playerPages.set(key, { etag: response.headers.etag, data: response.data })
+    }
     return response.data
   },
 
@@ -22,6 +38,13 @@ export const fplAPI = {
     return response.data
   },
 
+  // Best predicted points at every budget in a range
+  // request: { min_budget, max_budget, step, exclude_players, formation_preference }
+  getBudgetFrontier: async (request) => {
+    const response = await api.post('/api/optimize/frontier', request)
+    return response.data
+  },
+
   // Get analytics
   getAnalytics: async () => {
     const response = await api.get('/api/analytics/position-stats')